@@ -3,15 +3,20 @@ Alerts API Endpoints
 Alert management and notification system
 """
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from fastapi_cache.decorator import cache
+from typing import Optional, List
+import asyncio
 from services.alert_service import alert_service
 from core.utils.validators import AlertBase
 from core.utils.response import success_response
+from core.utils.cache import invalidate, etag
 
 router = APIRouter()
 
 
 @router.get("/")
+@etag
+@cache(expire=5, namespace="alerts")
 async def list_alerts(
     severity: Optional[str] = Query(None, pattern="^(low|medium|high|critical)$"),
     acknowledged: Optional[bool] = Query(None),
@@ -31,12 +36,18 @@ async def list_alerts(
         limit=limit
     )
     
+    # One counting pass over the rows actually returned (the cache fallback
+    # may not honour the filters)
+    unacknowledged = 0
+    for a in alerts:
+        unacknowledged += not a.get("acknowledged", False)
+    
     return success_response(
         data=alerts,
         message=f"Retrieved {len(alerts)} alerts",
         meta={
             "count": len(alerts),
-            "unacknowledged": sum(1 for a in alerts if not a.get("acknowledged", False))
+            "unacknowledged": unacknowledged
         }
     )
 
@@ -72,7 +83,8 @@ async def create_alert(alert: AlertBase):
         - message: Alert message (required)
         - satellite_id: Related satellite ID (optional)
     """
-    result = await alert_service.create_alert(alert.dict())
+    result = await alert_service.create_alert(alert.model_dump())
+    await invalidate("alerts")
     
     return success_response(
         data=result,
@@ -80,6 +92,24 @@ async def create_alert(alert: AlertBase):
     )
 
 
+@router.post("/bulk")
+async def create_alerts_bulk(alerts: List[AlertBase]):
+    """
+    Create many alerts in one request
+    
+    Request Body:
+        - List of alert objects (same fields as POST /)
+    """
+    result = await alert_service.bulk_create([a.model_dump() for a in alerts])
+    await invalidate("alerts")
+    
+    return success_response(
+        data=result,
+        message=f"Created {len(result)} alerts",
+        meta={"count": len(result)}
+    )
+
+
 @router.patch("/{alert_id}/acknowledge")
 async def acknowledge_alert(alert_id: str):
     """
@@ -93,6 +123,7 @@ async def acknowledge_alert(alert_id: str):
     if not result:
         raise HTTPException(status_code=404, detail="Alert not found")
     
+    await invalidate("alerts")
     return success_response(
         data=result,
         message="Alert acknowledged successfully"
@@ -100,28 +131,22 @@ async def acknowledge_alert(alert_id: str):
 
 
 @router.get("/unacknowledged/count")
+@cache(expire=5, namespace="alerts")
 async def count_unacknowledged_alerts():
     """
     Get count of unacknowledged alerts
     
     Useful for dashboard notification badges
     """
-    alerts = await alert_service.get_all_alerts(acknowledged=False)
-    
-    # Count by severity
-    severity_counts = {
-        "critical": sum(1 for a in alerts if a.get("severity") == "critical"),
-        "high": sum(1 for a in alerts if a.get("severity") == "high"),
-        "medium": sum(1 for a in alerts if a.get("severity") == "medium"),
-        "low": sum(1 for a in alerts if a.get("severity") == "low")
-    }
+    severity_counts = await alert_service.count_by_severity(acknowledged=False)
+    total = sum(severity_counts.values())
     
     return success_response(
         data={
-            "total": len(alerts),
+            "total": total,
             "by_severity": severity_counts
         },
-        message=f"{len(alerts)} unacknowledged alerts"
+        message=f"{total} unacknowledged alerts"
     )
 
 
@@ -133,8 +158,7 @@ async def get_satellite_alerts(satellite_id: str):
     Path Parameters:
         - satellite_id: Unique satellite identifier
     """
-    all_alerts = await alert_service.get_all_alerts()
-    satellite_alerts = [a for a in all_alerts if a.get("satellite_id") == satellite_id]
+    satellite_alerts = await alert_service.get_by_satellite(satellite_id)
     
     return success_response(
         data=satellite_alerts,
@@ -153,18 +177,13 @@ async def get_recent_high_priority_alerts():
     
     Returns most recent 10 alerts with high or critical severity
     """
-    all_alerts = await alert_service.get_all_alerts(limit=100)
-    
-    high_priority = [
-        a for a in all_alerts
-        if a.get("severity") in ["high", "critical"]
-    ]
-    
-    # Sort by creation time (most recent first)
-    high_priority.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    high_priority, total_high_priority = await asyncio.gather(
+        alert_service.get_recent_high_priority(limit=10),
+        alert_service.count_high_priority()
+    )
     
     return success_response(
-        data=high_priority[:10],
-        message=f"Retrieved {len(high_priority[:10])} high-priority alerts",
-        meta={"total_high_priority": len(high_priority)}
+        data=high_priority,
+        message=f"Retrieved {len(high_priority)} high-priority alerts",
+        meta={"total_high_priority": total_high_priority}
     )
@@ -3,11 +3,12 @@ Collision Events API Endpoints
 AI-powered collision risk calculation and event management
 """
 from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+from fastapi_cache.decorator import cache
 from services.collision_service import collision_service
 from core.utils.validators import CollisionEventBase
-from core.utils.response import success_response
-from config.supabase_client import supabase_client
-from config.local_cache import local_cache
+from core.utils.response import success_response, encoded_response
+from core.utils.cache import etag
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +16,11 @@ router = APIRouter()
 
 
 @router.get("/calculate")
-async def calculate_collision_risks():
+@etag
+@cache(expire=2, namespace="collision")
+async def calculate_collision_risks(
+    limit: Optional[int] = Query(None, ge=1, description="Return only the top N events by risk level")
+):
     """
     Calculate collision risks for all satellites
     
@@ -26,16 +31,17 @@ async def calculate_collision_risks():
     4. Calculate collision probabilities
     
     Returns list of all detected collision events sorted by risk level
+    (the top `limit` when given; meta counts always cover every event)
     """
     collision_events = await collision_service.calculate_collision_risks()
     
     # Separate by risk level
-    high_risk = [e for e in collision_events if e["risk_level"] == 3]
-    medium_risk = [e for e in collision_events if e["risk_level"] == 2]
-    low_risk = [e for e in collision_events if e["risk_level"] == 1]
+    high_risk = [e for e in collision_events if e.risk_level == 3]
+    medium_risk = [e for e in collision_events if e.risk_level == 2]
+    low_risk = [e for e in collision_events if e.risk_level == 1]
     
     return success_response(
-        data=collision_events,
+        data=collision_events[:limit] if limit else collision_events,
         message=f"Calculated {len(collision_events)} collision events",
         meta={
             "total_events": len(collision_events),
@@ -46,25 +52,6 @@ async def calculate_collision_risks():
     )
 
 
-@router.get("/{event_id}")
-async def get_collision_event(event_id: str):
-    """
-    Get specific collision event by ID
-    
-    Path Parameters:
-        - event_id: Unique event identifier
-    """
-    event = await collision_service.get_collision_event(event_id)
-    
-    if not event:
-        raise HTTPException(status_code=404, detail="Collision event not found")
-    
-    return success_response(
-        data=event,
-        message="Collision event retrieved successfully"
-    )
-
-
 @router.post("/log")
 async def log_collision_event(event: CollisionEventBase):
     """
@@ -79,14 +66,29 @@ async def log_collision_event(event: CollisionEventBase):
         - time_to_closest_approach_sec: Time to CA (optional)
         - probability: Collision probability (required)
     """
-    result = await collision_service.log_collision_event(event.dict())
-    
+    result = await collision_service.log_collision_event(event.model_dump())
     return success_response(
         data=result,
         message="Collision event logged successfully"
     )
 
 
+@router.post("/log/bulk")
+async def log_collision_events_bulk(events: List[CollisionEventBase]):
+    """
+    Log many collision events in one request
+    
+    Request Body:
+        - List of collision event objects (same fields as POST /log)
+    """
+    result = await collision_service.log_collision_events([e.model_dump() for e in events])
+    return success_response(
+        data=result,
+        message=f"Logged {len(result)} collision events",
+        meta={"count": len(result)}
+    )
+
+
 @router.get("/satellite/{satellite_id}")
 async def get_satellite_collision_risks(satellite_id: str):
     """
@@ -96,7 +98,7 @@ async def get_satellite_collision_risks(satellite_id: str):
         - satellite_id: Unique satellite identifier
     """
     all_events = await collision_service.calculate_collision_risks()
-    satellite_events = [e for e in all_events if e["satellite_id"] == satellite_id]
+    satellite_events = [e for e in all_events if e.satellite_id == satellite_id]
     
     if not satellite_events:
         return success_response(
@@ -104,18 +106,20 @@ async def get_satellite_collision_risks(satellite_id: str):
             message=f"No collision risks found for satellite {satellite_id}"
         )
     
-    return success_response(
+    return encoded_response(success_response(
         data=satellite_events,
         message=f"Found {len(satellite_events)} collision risks",
         meta={
             "satellite_id": satellite_id,
             "risk_count": len(satellite_events),
-            "highest_risk": max(e["risk_level"] for e in satellite_events)
+            "highest_risk": max(e.risk_level for e in satellite_events)
         }
-    )
+    ))
 
 
 @router.get("/high-risk/list")
+@etag
+@cache(expire=2, namespace="collision")
 async def list_high_risk_events():
     """
     Get all high-risk collision events (risk_level = 3)
@@ -123,7 +127,7 @@ async def list_high_risk_events():
     Returns events requiring immediate attention
     """
     all_events = await collision_service.calculate_collision_risks()
-    high_risk_events = [e for e in all_events if e["risk_level"] == 3]
+    high_risk_events = [e for e in all_events if e.risk_level == 3]
     
     return success_response(
         data=high_risk_events,
@@ -151,20 +155,7 @@ async def get_collision_events_for_simulator(
     Returns collision event with all fields needed for simulator visualization
     """
     try:
-        # Try Supabase first
-        filters = {"sat_id": sat_id}
-        if deb_id:
-            filters["deb_id"] = deb_id
-        
-        events = await supabase_client.select("collision_events", filters=filters, limit=10)
-        
-        if not events:
-            # Fallback to cache
-            logger.info(f"No Supabase collision_events for sat={sat_id}, checking cache...")
-            cache_events = local_cache.get_all("collision_events")
-            events = [e for e in cache_events if e.get("sat_id") == sat_id or e.get("satellite_id") == sat_id]
-            if deb_id:
-                events = [e for e in events if e.get("deb_id") == deb_id or e.get("debris_id") == deb_id]
+        events = await collision_service.get_events_for_simulator(sat_id, deb_id)
         
         if not events:
             return success_response(
@@ -172,9 +163,6 @@ async def get_collision_events_for_simulator(
                 message=f"No collision events found for satellite {sat_id}"
             )
         
-        # Sort by risk level (descending) and collision probability (descending)
-        events.sort(key=lambda x: (x.get("risk_level", 0), x.get("collision_probability", 0)), reverse=True)
-        
         return success_response(
             data=events,
             message=f"Found {len(events)} collision event(s)",
@@ -188,3 +176,23 @@ async def get_collision_events_for_simulator(
     except Exception as e:
         logger.error(f"Error fetching collision events for simulator: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch collision events: {str(e)}")
+
+
+@router.get("/{event_id}")
+@cache(expire=30, namespace="collision")
+async def get_collision_event(event_id: str):
+    """
+    Get specific collision event by ID
+    
+    Path Parameters:
+        - event_id: Unique event identifier
+    """
+    event = await collision_service.get_collision_event(event_id)
+    
+    if not event:
+        raise HTTPException(status_code=404, detail="Collision event not found")
+    
+    return success_response(
+        data=event,
+        message="Collision event retrieved successfully"
+    )
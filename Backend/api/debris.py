@@ -3,15 +3,21 @@ Debris API Endpoints
 Full CRUD operations for space debris tracking
 """
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from fastapi_cache.decorator import cache
+from typing import Optional, List
 from services.debris_service import debris_service
 from core.utils.validators import DebrisCreate
 from core.utils.response import success_response
+from core.utils.cache import etag
+import orjson
 
 router = APIRouter()
 
 
 @router.get("/")
+@etag
+@cache(expire=30, namespace="debris")
 async def list_debris(
     limit: Optional[int] = Query(100, ge=1, le=100000, description="Maximum number of debris to return"),
     object_type: Optional[str] = Query(None, pattern="^(rocket_body|payload|debris|unknown)$"),
@@ -26,11 +32,7 @@ async def list_debris(
         - all: If true, returns all debris
     """
     effective_limit = None if all else limit
-    debris_list = await debris_service.get_all_debris(limit=effective_limit)
-    
-    # Filter by type if provided
-    if object_type:
-        debris_list = [d for d in debris_list if d.get("object_type") == object_type]
+    debris_list = await debris_service.get_all_debris(limit=effective_limit, object_type=object_type)
     
     return success_response(
         data=debris_list,
@@ -43,6 +45,29 @@ async def list_debris(
     )
 
 
+@router.get("/stream")
+async def stream_debris(
+    object_type: Optional[str] = Query(None, pattern="^(rocket_body|payload|debris|unknown)$"),
+    page_size: int = Query(1000, ge=100, le=5000, description="Rows fetched per database page")
+):
+    """
+    Stream all debris objects as NDJSON (one JSON object per line)
+    
+    Use instead of list_debris with all=true for full-catalog exports:
+    rows are paged from the database and written as they arrive, so
+    memory stays bounded and clients can start processing immediately.
+    
+    Query Parameters:
+        - object_type: Filter by type (rocket_body, payload, debris, unknown)
+        - page_size: Rows fetched per database page
+    """
+    async def ndjson_rows():
+        async for deb in debris_service.iter_debris(page_size=page_size, object_type=object_type):
+            yield orjson.dumps(deb, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+    
+    return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+
+
 @router.get("/{debris_id}")
 async def get_debris(debris_id: str):
     """
@@ -76,7 +101,7 @@ async def create_debris(debris: DebrisCreate):
         - velocity_kmps: Velocity in km/s (required)
         - size_estimate_m: Size estimate in meters (optional)
     """
-    result = await debris_service.create_debris(debris.dict())
+    result = await debris_service.create_debris(debris.model_dump())
     
     return success_response(
         data=result,
@@ -84,6 +109,22 @@ async def create_debris(debris: DebrisCreate):
     )
 
 
+@router.post("/bulk")
+async def create_debris_bulk(debris: List[DebrisCreate]):
+    """
+    Create many debris entries in one request
+    
+    Request Body:
+        - List of debris objects (same fields as POST /)
+    """
+    result = await debris_service.bulk_create([d.model_dump() for d in debris])
+    return success_response(
+        data=result,
+        message=f"Created {len(result)} debris objects",
+        meta={"count": len(result)}
+    )
+
+
 @router.put("/{debris_id}")
 async def update_debris(debris_id: str, debris: DebrisCreate):
     """
@@ -92,12 +133,9 @@ async def update_debris(debris_id: str, debris: DebrisCreate):
     Path Parameters:
         - debris_id: Unique debris identifier
     """
-    existing = await debris_service.get_debris_by_id(debris_id)
-    if not existing:
+    result = await debris_service.update_debris(debris_id, debris.model_dump())
+    if not result:
         raise HTTPException(status_code=404, detail="Debris object not found")
-    
-    result = await debris_service.update_debris(debris_id, debris.dict())
-    
     return success_response(
         data=result,
         message="Debris object updated successfully"
@@ -112,14 +150,10 @@ async def delete_debris(debris_id: str):
     Path Parameters:
         - debris_id: Unique debris identifier
     """
-    existing = await debris_service.get_debris_by_id(debris_id)
-    if not existing:
-        raise HTTPException(status_code=404, detail="Debris object not found")
-    
     success = await debris_service.delete_debris(debris_id)
     
     if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete debris object")
+        raise HTTPException(status_code=404, detail="Debris object not found")
     
     return success_response(
         message="Debris object deleted successfully"
@@ -134,8 +168,7 @@ async def count_debris_by_type(object_type: str):
     Path Parameters:
         - object_type: Type of debris object
     """
-    all_debris = await debris_service.get_all_debris()
-    count = sum(1 for d in all_debris if d.get("object_type") == object_type)
+    count = await debris_service.count_by_type(object_type)
     
     return success_response(
         data={"object_type": object_type, "count": count},
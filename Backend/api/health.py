@@ -2,11 +2,25 @@
 Health Check API Endpoints
 """
 from fastapi import APIRouter
-from datetime import datetime
+from fastapi_cache.decorator import cache
+from datetime import datetime, timezone
+import time
 from core.utils.response import success_response
 
 router = APIRouter()
 
+# (epoch second, formatted) - health checks can arrive many times per second
+_last_ts = (0, "")
+
+
+def _health_timestamp() -> str:
+    """UTC timestamp with 1-second granularity, formatted once per second"""
+    global _last_ts
+    now = int(time.time())
+    if now != _last_ts[0]:
+        _last_ts = (now, datetime.fromtimestamp(now, timezone.utc).isoformat())
+    return _last_ts[1]
+
 
 @router.get("/health")
 async def health_check():
@@ -18,7 +32,7 @@ async def health_check():
         data={
             "status": "ok",
             "service": "Orbit Shield API",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _health_timestamp(),
             "version": "1.0.0"
         },
         message="Service is healthy"
@@ -26,6 +40,7 @@ async def health_check():
 
 
 @router.get("/status")
+@cache(expire=60, namespace="health")
 async def system_status():
     """
     Detailed system status
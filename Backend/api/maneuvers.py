@@ -3,11 +3,13 @@ Maneuvers API Endpoints
 AI-powered maneuver planning using RL agent
 """
 from fastapi import APIRouter, HTTPException, Body
+from fastapi_cache.decorator import cache
 from typing import Dict
 from services.maneuver_service import maneuver_service
 from core.ai.rl_maneuver_agent import simulate_maneuver_effect
 from services.satellite_service import satellite_service
 from core.utils.response import success_response
+from core.utils.cache import invalidate
 
 router = APIRouter()
 
@@ -36,6 +38,7 @@ async def plan_maneuver(
     - Safety evaluation
     """
     maneuver_plan = await maneuver_service.plan_maneuver(satellite_id, threat_data)
+    await invalidate("maneuvers")
     
     return success_response(
         data=maneuver_plan,
@@ -64,6 +67,7 @@ async def plan_multi_burn_maneuver(
         satellite_id,
         threat_data
     )
+    await invalidate("maneuvers")
     
     return success_response(
         data=maneuver_sequence,
@@ -77,6 +81,7 @@ async def plan_multi_burn_maneuver(
 
 
 @router.get("/satellite/{satellite_id}")
+@cache(expire=10, namespace="maneuvers")
 async def get_satellite_maneuvers(satellite_id: str):
     """
     Get all maneuvers planned for a satellite
@@ -112,6 +117,7 @@ async def update_maneuver_status(
     if not result:
         raise HTTPException(status_code=404, detail="Maneuver not found")
     
+    await invalidate("maneuvers")
     return success_response(
         data=result,
         message=f"Maneuver status updated to {status}"
@@ -138,6 +144,7 @@ async def emergency_maneuver_plan(
     threat_data["distance_km"] = min(threat_data.get("distance_km", 10), 5.0)
     
     maneuver_plan = await maneuver_service.plan_maneuver(satellite_id, threat_data)
+    await invalidate("maneuvers")
     
     return success_response(
         data=maneuver_plan,
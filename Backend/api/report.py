@@ -3,7 +3,10 @@ from fastapi import APIRouter, HTTPException
 from services.satellite_service import satellite_service
 from .satellite_analysis import handle_satellite_click, debris_service
 from core.utils.response import success_response, error_response
+from fpdf import FPDF
+import asyncio
 import base64
+import math
 
 router = APIRouter()
 
@@ -11,15 +14,15 @@ router = APIRouter()
 async def generate_mission_report(satellite_id: str):
     """Generate PDF mission report (base64) with risk snapshot and horizon curve."""
     try:
-        sat = await satellite_service.get_satellite_by_id(satellite_id)
+        sat, debris = await asyncio.gather(
+            satellite_service.get_satellite_by_id(satellite_id),
+            debris_service.get_all_debris_soa(limit=1000)
+        )
         if not sat:
             raise HTTPException(status_code=404, detail="Satellite not found")
-        debris_list = await debris_service.get_all_debris(limit=1000)
-        debris_with_coords = [d for d in debris_list if all(f in d for f in ["x","y","z","vx","vy","vz"])]
-        analysis = handle_satellite_click(sat=sat, debris_list=debris_with_coords, top_n=3, include_maneuver=True) if debris_with_coords else {"nearest": []}
+        analysis = await asyncio.to_thread(handle_satellite_click, sat=sat, debris_list=debris.records, top_n=3, include_maneuver=True, positions=debris.positions, velocities=debris.velocities, sq_norms=debris.sq_norms) if debris.records else {"nearest": []}
 
         # Build simple risk horizon (reuse endpoint logic inline)
-        import math
         base_prob = analysis.get("nearest", [{}])[0].get("model1_risk", {}).get("probability", 0.0)
         curve = []
         for h in range(0, 25, 5):
@@ -27,7 +30,6 @@ async def generate_mission_report(satellite_id: str):
             curve.append((h, prob))
 
         # Create PDF using fpdf
-        from fpdf import FPDF
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=16)
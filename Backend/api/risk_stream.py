@@ -1,10 +1,8 @@
 """
 Real-time Risk Stream WebSocket
-Provides periodic broadcast of top collision risk events for live UI updates.
+Provides broadcast of top collision risk events for live UI updates.
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import asyncio
-import time
 from services.collision_service import collision_service
 
 router = APIRouter()
@@ -12,7 +10,7 @@ router = APIRouter()
 
 @router.websocket("/ws/risks")
 async def risks_socket(websocket: WebSocket):
-    """Stream top collision risks every few seconds.
+    """Stream top collision risks whenever the shared broadcaster publishes.
 
     Message schema:
     {
@@ -33,31 +31,16 @@ async def risks_socket(websocket: WebSocket):
     }
     """
     await websocket.accept()
+    queue = collision_service.broadcaster.subscribe()
     try:
         while True:
-            events = await collision_service.calculate_collision_risks()
-            top_events = events[:10]
-            payload = {
-                "timestamp": time.time(),
-                "events": [
-                    {
-                        "satellite_id": e.get("satellite_id"),
-                        "satellite_name": e.get("satellite_name"),
-                        "debris_id": e.get("debris_id"),
-                        "distance_km": e.get("distance_km"),
-                        "risk_score": e.get("risk_score"),
-                        "risk_level": e.get("risk_level"),
-                        "time_to_closest_approach_sec": e.get("time_to_closest_approach_sec"),
-                        "minimum_distance_km": e.get("minimum_distance_km"),
-                        "collision_probability": e.get("collision_probability")
-                    } for e in top_events
-                ]
-            }
-            await websocket.send_json(payload)
-            await asyncio.sleep(5)
+            message = await queue.get()
+            await websocket.send_text(message)
     except WebSocketDisconnect:
         # Client disconnected normally
         pass
     except Exception:
         # On unexpected errors, close connection gracefully
         await websocket.close(code=1011)
+    finally:
+        collision_service.broadcaster.unsubscribe(queue)
@@ -4,20 +4,75 @@ API endpoints for satellite click analysis using physics-based AI models.
 Provides comprehensive collision risk assessment and maneuver recommendations.
 """
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import heapq
+from operator import itemgetter
 import uuid
-from core.utils.response import success_response, error_response
-from core.ai.on_click_handler import handle_satellite_click
-from services.satellite_service import SatelliteService
-from services.debris_service import DebrisService
+import numpy as np
+from core.utils.response import success_response, error_response, encoded_response
+from core.ai.on_click_handler import handle_satellite_click, handle_satellite_batch
+from core.orbital.coord_transforms import latlonalt_to_state
+from services.satellite_service import satellite_service
+from services.debris_service import debris_service
+from config.supabase_client import supabase_client
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-satellite_service = SatelliteService()
-debris_service = DebrisService()
+_REQUIRED_COORD_KEYS = frozenset(("x", "y", "z", "vx", "vy", "vz"))
+
+
+def _build_collision_record(sat: Dict, primary: Dict) -> Dict:
+    """Map the most critical nearest-debris result to a collision_events row"""
+    features = primary.get("features") or {}
+    debris = primary["debris"]
+    # Calculate time to closest approach (TCA) from tca_seconds
+    tca_seconds = features.get("tca_seconds")
+    tca_timestamp = None
+    time_until_tca_hours = None
+    if tca_seconds:
+        tca_timestamp = (datetime.utcnow() + timedelta(seconds=tca_seconds)).isoformat()
+        time_until_tca_hours = tca_seconds / 3600.0
+    
+    # Get proper IDs - prefer string IDs over UUIDs for foreign key refs
+    sat_ref_id = sat.get("sat_id") or sat.get("norad_id") or str(sat.get("id", ""))
+    deb_ref_id = debris.get("deb_id") or str(debris.get("id", ""))
+    
+    return {
+        "sat_id": sat_ref_id,
+        "deb_id": deb_ref_id,
+        "distance": primary.get("distance_now_km"),
+        "rel_velocity": features.get("relative_speed") or 7.5,
+        "angle": features.get("approach_angle"),
+        "altitude_diff": abs((sat.get("altitude") or 0) - (debris.get("altitude") or 0)),
+        "collision_probability": primary.get("model1_risk", {}).get("probability"),
+        "risk_level": primary.get("model2_class", {}).get("risk_level"),
+        "tca": tca_timestamp,
+        "time_until_tca": time_until_tca_hours,
+        "status": "monitoring"
+    }
+
+
+async def _persist_primary_collisions(pairs: List[Tuple[Dict, Dict]]) -> List[Dict]:
+    """
+    Persist the primary threat of each (satellite, nearest item) pair
+    
+    Single and batch analysis share this one bulk path; insert_many falls
+    back to the local cache on its own when Supabase rejects the rows.
+    """
+    # Ids are assigned up front because the cache write-through keys on them.
+    # Keep the dashed form: Postgres returns uuids dashed, and cache_sync
+    # would otherwise store a second copy of each row under a different key.
+    records = [
+        {**_build_collision_record(sat, primary), "id": str(uuid.uuid4())}
+        for sat, primary in pairs
+    ]
+    if records:
+        await supabase_client.insert_many("collision_events", records)
+    return records
 
 
 @router.get("/analyze/{satellite_id}")
@@ -36,93 +91,59 @@ async def analyze_satellite(
     - Optimal avoidance maneuvers (RL Agent)
     """
     try:
-        # Get satellite data
-        sat = await satellite_service.get_satellite_by_id(satellite_id)
+        # Get satellite data and all debris (rows without coordinates
+        # already dropped) concurrently
+        sat, debris = await asyncio.gather(
+            satellite_service.get_satellite_by_id(satellite_id),
+            debris_service.get_all_debris_soa(limit=1000)
+        )
         if not sat:
             raise HTTPException(status_code=404, detail=f"Satellite {satellite_id} not found")
         
         # Debug: Check if satellite has required coordinates
-        required_fields = ['x', 'y', 'z', 'vx', 'vy', 'vz']
-        missing_fields = [f for f in required_fields if f not in sat]
-        if missing_fields:
+        if not _REQUIRED_COORD_KEYS <= sat.keys():
+            missing_fields = sorted(_REQUIRED_COORD_KEYS - sat.keys())
             logger.error(f"Satellite {satellite_id} missing fields: {missing_fields}")
             logger.error(f"Satellite data: lat={sat.get('latitude')}, lon={sat.get('longitude')}, alt={sat.get('altitude_km')}")
         
-        # Get all debris
-        debris_list = await debris_service.get_all_debris(limit=1000)
-        if not debris_list:
-            return success_response({
+        if not debris.total:
+            return encoded_response(success_response({
                 "sat": sat,
                 "nearest": [],
                 "message": "No debris data available"
-            })
+            }))
         
-        # Check debris also have coordinates
-        debris_with_coords = [d for d in debris_list if all(f in d for f in required_fields)]
-        logger.info(f"Found {len(debris_with_coords)} debris with coordinates out of {len(debris_list)} total")
+        logger.info(f"Found {len(debris.records)} debris with coordinates out of {debris.total} total")
         
-        if not debris_with_coords:
-            return success_response({
+        if not debris.records:
+            return encoded_response(success_response({
                 "sat": sat,
                 "nearest": [],
                 "message": "No debris with valid coordinates"
-            })
+            }))
         
         # Run AI analysis
-        result = handle_satellite_click(
+        result = await asyncio.to_thread(
+            handle_satellite_click,
             sat=sat,
-            debris_list=debris_with_coords,
+            debris_list=debris.records,
             top_n=top_n,
-            include_maneuver=include_maneuver
+            include_maneuver=include_maneuver,
+            positions=debris.positions,
+            velocities=debris.velocities,
+            sq_norms=debris.sq_norms
         )
 
         # Persist nearest debris collision event for first (most critical) threat
         if result.get("nearest"):
             try:
-                primary = result["nearest"][0]
-                # Calculate time to closest approach (TCA) from tca_seconds
-                tca_seconds = primary.get("features", {}).get("tca_seconds")
-                tca_timestamp = None
-                time_until_tca_hours = None
-                if tca_seconds:
-                    tca_timestamp = (datetime.utcnow() + timedelta(seconds=tca_seconds)).isoformat()
-                    time_until_tca_hours = tca_seconds / 3600.0
-                
-                # Get proper IDs - prefer string IDs over UUIDs for foreign key refs
-                sat_ref_id = sat.get("sat_id") or sat.get("norad_id") or str(sat.get("id", ""))
-                deb_ref_id = primary["debris"].get("deb_id") or str(primary["debris"].get("id", ""))
-                
-                collision_record = {
-                    "sat_id": sat_ref_id,
-                    "deb_id": deb_ref_id,
-                    "distance": primary.get("distance_now_km"),
-                    "rel_velocity": primary.get("features", {}).get("relative_speed") or 7.5,
-                    "angle": primary.get("features", {}).get("approach_angle"),
-                    "altitude_diff": abs((sat.get("altitude") or 0) - (primary["debris"].get("altitude") or 0)),
-                    "collision_probability": primary.get("model1_risk", {}).get("probability"),
-                    "risk_level": primary.get("model2_class", {}).get("risk_level"),
-                    "tca": tca_timestamp,
-                    "time_until_tca": time_until_tca_hours,
-                    "status": "monitoring"
-                }
-                
-                # Try inserting into Supabase (non-blocking)
-                from config.supabase_client import supabase_client
-                try:
-                    await supabase_client.insert("collision_events", collision_record)
-                    logger.info(f"✅ Collision event saved to Supabase for sat={sat_ref_id}, deb={deb_ref_id}")
-                except Exception as insert_err:
-                    logger.warning(f"⚠️ Supabase collision_events insert failed (foreign key constraint or schema issue): {insert_err}")
-                    # Store in cache as fallback
-                    from config.local_cache import local_cache
-                    collision_record["id"] = str(uuid.uuid4())
-                    local_cache.upsert("collision_events", collision_record)
-                    logger.info(f"💾 Collision event saved to cache instead for sat={sat_ref_id}")
+                record, = await _persist_primary_collisions([(sat, result["nearest"][0])])
+                logger.info(f"✅ Collision event saved for sat={record['sat_id']}, deb={record['deb_id']}")
             except Exception as persist_err:
                 logger.error(f"❌ Collision event persistence completely failed for satellite {satellite_id}: {persist_err}")
         
         logger.info(f"Analysis completed for satellite {satellite_id}: {len(result['nearest'])} threats identified")
-        return success_response(result)
+        return encoded_response(success_response(result))
         
     except HTTPException:
         raise
@@ -143,66 +164,40 @@ async def analyze_multiple_satellites(
     """
     try:
         # Get all debris once for efficiency
-        debris_list = await debris_service.get_all_debris(limit=1000)
-        if not debris_list:
-            return success_response({
+        debris = await debris_service.get_all_debris_soa(limit=1000)
+        if not debris.records:
+            return encoded_response(success_response({
                 "results": [],
                 "message": "No debris data available"
-            })
+            }))
+        
+        # Fan out satellite lookups concurrently
+        sats = await asyncio.gather(
+            *(satellite_service.get_satellite_by_id(sat_id) for sat_id in satellite_ids),
+            return_exceptions=True
+        )
         
         results = []
-        for sat_id in satellite_ids:
-            sat = await satellite_service.get_satellite_by_id(sat_id)
+        primaries = []
+        for sat_id, sat in zip(satellite_ids, sats):
+            if isinstance(sat, Exception):
+                logger.error(f"Batch lookup failed for satellite {sat_id}: {sat}")
+                sat = None
             if sat:
-                analysis = handle_satellite_click(
+                analysis = await asyncio.to_thread(
+                    handle_satellite_click,
                     sat=sat,
-                    debris_list=debris_list,
+                    debris_list=debris.records,
                     top_n=top_n,
-                    include_maneuver=include_maneuver
+                    include_maneuver=include_maneuver,
+                    positions=debris.positions,
+                    velocities=debris.velocities,
+                    sq_norms=debris.sq_norms
                 )
                 results.append(analysis)
                 # Persist first threat for each satellite
                 if analysis.get("nearest"):
-                    try:
-                        primary = analysis["nearest"][0]
-                        # Calculate TCA
-                        tca_seconds = primary.get("features", {}).get("tca_seconds")
-                        tca_timestamp = None
-                        time_until_tca_hours = None
-                        if tca_seconds:
-                            tca_timestamp = (datetime.utcnow() + timedelta(seconds=tca_seconds)).isoformat()
-                            time_until_tca_hours = tca_seconds / 3600.0
-                        
-                        # Get proper IDs
-                        sat_ref_id = sat.get("sat_id") or sat.get("norad_id") or str(sat.get("id", ""))
-                        deb_ref_id = primary["debris"].get("deb_id") or str(primary["debris"].get("id", ""))
-                        
-                        collision_record = {
-                            "sat_id": sat_ref_id,
-                            "deb_id": deb_ref_id,
-                            "distance": primary.get("distance_now_km"),
-                            "rel_velocity": primary.get("features", {}).get("relative_speed") or 7.5,
-                            "angle": primary.get("features", {}).get("approach_angle"),
-                            "altitude_diff": abs((sat.get("altitude") or 0) - (primary["debris"].get("altitude") or 0)),
-                            "collision_probability": primary.get("model1_risk", {}).get("probability"),
-                            "risk_level": primary.get("model2_class", {}).get("risk_level"),
-                            "tca": tca_timestamp,
-                            "time_until_tca": time_until_tca_hours,
-                            "status": "monitoring"
-                        }
-                        from config.supabase_client import supabase_client
-                        from config.local_cache import local_cache
-                        try:
-                            await supabase_client.insert("collision_events", collision_record)
-                            logger.info(f"✅ Collision event saved to Supabase for sat={sat_ref_id}, deb={deb_ref_id}")
-                        except Exception as insert_err:
-                            logger.warning(f"⚠️ Supabase collision_events insert failed (foreign key constraint): {insert_err}")
-                            # Fallback to cache
-                            collision_record["id"] = str(uuid.uuid4())
-                            local_cache.upsert("collision_events", collision_record)
-                            logger.info(f"💾 Collision event saved to cache instead for sat={sat_ref_id}")
-                    except Exception as persist_err:
-                        logger.error(f"❌ Batch collision event persistence failed for satellite {sat_id}: {persist_err}")
+                    primaries.append((sat, analysis["nearest"][0]))
             else:
                 results.append({
                     "sat": {"id": sat_id},
@@ -210,8 +205,16 @@ async def analyze_multiple_satellites(
                     "error": "Satellite not found"
                 })
         
+        # One bulk insert for all primary threats
+        if primaries:
+            try:
+                saved = await _persist_primary_collisions(primaries)
+                logger.info(f"✅ Saved {len(saved)} collision events from batch analysis")
+            except Exception as persist_err:
+                logger.error(f"❌ Batch collision event persistence failed: {persist_err}")
+        
         logger.info(f"Batch analysis completed for {len(results)} satellites")
-        return success_response({"results": results})
+        return encoded_response(success_response({"results": results}))
         
     except Exception as e:
         logger.error(f"Error in batch analysis: {str(e)}")
@@ -228,27 +231,30 @@ async def get_high_risk_satellites(
     Scans entire satellite catalog and returns high-risk items.
     """
     try:
-        satellites = await satellite_service.get_all_satellites(limit=100)
-        debris_list = await debris_service.get_all_debris(limit=1000)
+        satellites, debris = await asyncio.gather(
+            satellite_service.get_all_satellites_cached(limit=100),
+            debris_service.get_all_debris_soa(limit=1000)
+        )
         
-        if not satellites or not debris_list:
-            return success_response({
+        if not satellites or not debris.records:
+            return encoded_response(success_response({
                 "high_risk_satellites": [],
                 "message": "Insufficient data for analysis"
-            })
+            }))
+        
+        # Top-1 threat for every satellite in one batched pass
+        primaries = await asyncio.to_thread(
+            handle_satellite_batch,
+            satellites,
+            debris.records,
+            positions=debris.positions,
+            velocities=debris.velocities,
+            sq_norms=debris.sq_norms
+        )
         
         high_risk = []
-        for sat in satellites:
-            # Quick analysis with top 1 threat only
-            analysis = handle_satellite_click(
-                sat=sat,
-                debris_list=debris_list,
-                top_n=1,
-                include_maneuver=False
-            )
-            
-            if analysis["nearest"]:
-                nearest = analysis["nearest"][0]
+        for sat, nearest in zip(satellites, primaries):
+            if nearest:
                 risk_prob = nearest["model1_risk"]["probability"]
                 
                 if risk_prob >= risk_threshold:
@@ -261,16 +267,15 @@ async def get_high_risk_satellites(
                         "tca_seconds": nearest["features"]["tca_seconds"]
                     })
         
-        # Sort by risk probability descending
-        high_risk.sort(key=lambda x: x["risk_probability"], reverse=True)
-        high_risk = high_risk[:limit]
+        # Top `limit` by risk probability, descending (same order as sort + slice)
+        high_risk = heapq.nlargest(limit, high_risk, key=itemgetter("risk_probability"))
         
         logger.info(f"High-risk scan complete: {len(high_risk)} satellites exceed threshold {risk_threshold}")
-        return success_response({
+        return encoded_response(success_response({
             "high_risk_satellites": high_risk,
             "total_scanned": len(satellites),
             "threshold": risk_threshold
-        })
+        }))
         
     except Exception as e:
         logger.error(f"Error in high-risk scan: {str(e)}")
@@ -291,7 +296,10 @@ async def analyze_sandbox_scenario(
     Allows UI sandbox to explore 'what-if' risk outcomes.
     """
     try:
-        sat = await satellite_service.get_satellite_by_id(satellite_id)
+        sat, debris = await asyncio.gather(
+            satellite_service.get_satellite_by_id(satellite_id),
+            debris_service.get_all_debris_soa(limit=1000)
+        )
         if not sat:
             raise HTTPException(status_code=404, detail=f"Satellite {satellite_id} not found")
 
@@ -307,29 +315,30 @@ async def analyze_sandbox_scenario(
         # Recompute Cartesian from modified lat/lon/alt if provided
         if any(v is not None for v in [altitude_km, latitude, longitude]):
             try:
-                import math
-                r = 6371.0 + float(sat_mod.get("altitude_km", 0))
-                lat_r = math.radians(float(sat_mod.get("latitude", 0)))
-                lon_r = math.radians(float(sat_mod.get("longitude", 0)))
-                sat_mod["x"] = r * math.cos(lat_r) * math.cos(lon_r)
-                sat_mod["y"] = r * math.sin(lat_r)
-                sat_mod["z"] = r * math.cos(lat_r) * math.sin(lon_r)
+                sat_mod["x"], sat_mod["y"], sat_mod["z"] = latlonalt_to_state(
+                    float(sat_mod.get("latitude", 0)),
+                    float(sat_mod.get("longitude", 0)),
+                    float(sat_mod.get("altitude_km", 0)),
+                    0.0
+                )[:3]
             except Exception:
                 pass
 
-        debris_list = await debris_service.get_all_debris(limit=1000)
-        debris_with_coords = [d for d in debris_list if all(f in d for f in ["x","y","z","vx","vy","vz"])]
-        if not debris_with_coords:
-            return success_response({"scenario": sat_mod, "nearest": [], "message": "No debris coordinates"})
+        if not debris.records:
+            return encoded_response(success_response({"scenario": sat_mod, "nearest": [], "message": "No debris coordinates"}))
 
-        analysis = handle_satellite_click(
+        analysis = await asyncio.to_thread(
+            handle_satellite_click,
             sat=sat_mod,
-            debris_list=debris_with_coords,
+            debris_list=debris.records,
             top_n=top_n,
-            include_maneuver=include_maneuver
+            include_maneuver=include_maneuver,
+            positions=debris.positions,
+            velocities=debris.velocities,
+            sq_norms=debris.sq_norms
         )
 
-        return success_response({"scenario": {"original": sat, "modified": sat_mod}, **analysis})
+        return encoded_response(success_response({"scenario": {"original": sat, "modified": sat_mod}, **analysis}))
     except HTTPException:
         raise
     except Exception as e:
@@ -347,27 +356,30 @@ async def get_risk_horizon(
     Uses current nearest debris risk as baseline then applies exponential decay over time.
     """
     try:
-        sat = await satellite_service.get_satellite_by_id(satellite_id)
+        sat, debris = await asyncio.gather(
+            satellite_service.get_satellite_by_id(satellite_id),
+            debris_service.get_all_debris_soa(limit=1000)
+        )
         if not sat:
             raise HTTPException(status_code=404, detail="Satellite not found")
-        debris_list = await debris_service.get_all_debris(limit=1000)
-        debris_with_coords = [d for d in debris_list if all(f in d for f in ["x","y","z","vx","vy","vz"])]
-        if not debris_with_coords:
-            return success_response({"curve": [], "message": "No debris coordinates"})
-        analysis = handle_satellite_click(sat=sat, debris_list=debris_with_coords, top_n=1, include_maneuver=False)
+        if not debris.records:
+            return encoded_response(success_response({"curve": [], "message": "No debris coordinates"}))
+        analysis = await asyncio.to_thread(handle_satellite_click, sat=sat, debris_list=debris.records, top_n=1, include_maneuver=False, positions=debris.positions, velocities=debris.velocities, sq_norms=debris.sq_norms)
         base_prob = 0.0
         base_distance = None
         if analysis.get("nearest"):
             base_prob = analysis["nearest"][0]["model1_risk"]["probability"]
             base_distance = analysis["nearest"][0]["distance_now_km"]
-        curve = []
         decay_scale = 36.0  # hours characteristic
-        for h in range(0, hours + 1, step_hours):
-            # Simple model: probability decays with time; include slight oscillation
-            import math
-            prob = base_prob * math.exp(- h / decay_scale) * (1.0 + 0.05 * math.sin(h / 3.0))
-            curve.append({"hour": h, "probability": round(max(prob, 0.0), 4)})
-        return success_response({"curve": curve, "baseline_probability": base_prob, "baseline_distance_km": base_distance})
+        # Simple model: probability decays with time; include slight oscillation
+        h = np.arange(0, hours + 1, step_hours)
+        prob = base_prob * np.exp(-h / decay_scale) * (1.0 + 0.05 * np.sin(h / 3.0))
+        prob = np.round(np.clip(prob, 0.0, None), 4)
+        curve = [
+            {"hour": hour, "probability": p}
+            for hour, p in zip(h.tolist(), prob.tolist())
+        ]
+        return encoded_response(success_response({"curve": curve, "baseline_probability": base_prob, "baseline_distance_km": base_distance}))
     except HTTPException:
         raise
     except Exception as e:
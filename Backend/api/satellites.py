@@ -3,10 +3,12 @@ Satellites API Endpoints
 Full CRUD operations for satellite management
 """
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from services.satellite_service import satellite_service
 from core.utils.validators import SatelliteCreate, SatelliteUpdate
-from core.utils.response import success_response, error_response
+from core.utils.response import success_response, error_response, encoded_response
+import orjson
 
 router = APIRouter()
 
@@ -15,7 +17,8 @@ router = APIRouter()
 async def list_satellites(
     limit: Optional[int] = Query(100, ge=1, le=100000, description="Maximum number of satellites to return"),
     status: Optional[str] = Query(None, pattern="^(active|inactive|deorbited)$"),
-    all: bool = Query(False, description="If true, ignores limit and returns all satellites")
+    all: bool = Query(False, description="If true, ignores limit and returns all satellites"),
+    precision: str = Query("full", pattern="^(full|low)$", description="low: Cartesian state from 1-degree trig tables (globe view)")
 ):
     """
     List all satellites
@@ -23,15 +26,18 @@ async def list_satellites(
     Query Parameters:
         - limit: Maximum number of satellites to return
         - status: Filter by status (active, inactive, deorbited)
+        - precision: full (default) or low
     """
     effective_limit = None if all else limit
-    satellites = await satellite_service.get_all_satellites(limit=effective_limit)
-    
-    # Filter by status if provided
-    if status:
-        satellites = [s for s in satellites if s.get("status") == status]
-    
-    return success_response(
+    # Status is filtered in the query so the limit applies to matching rows;
+    # the unfiltered full-precision list is served from the shared snapshot
+    if status or precision != "full":
+        satellites = await satellite_service.get_all_satellites(limit=effective_limit, status=status, precision=precision)
+    else:
+        satellites = await satellite_service.get_all_satellites_cached(limit=effective_limit)
+    
+    # Thousands of rows: straight to orjson, without the jsonable_encoder pass
+    return encoded_response(success_response(
         data=satellites,
         message=f"Retrieved {len(satellites)} satellites",
         meta={
@@ -39,7 +45,29 @@ async def list_satellites(
             "all": all,
             "limit_used": effective_limit
         }
-    )
+    ))
+
+
+@router.get("/stream")
+async def stream_satellites(
+    status: Optional[str] = Query(None, pattern="^(active|inactive|deorbited)$"),
+    page_size: int = Query(1000, ge=100, le=5000, description="Rows fetched per database page")
+):
+    """
+    Stream all satellites as NDJSON (one JSON object per line)
+    
+    Use instead of list_satellites with all=true for full-catalog exports:
+    rows are paged from the database and written as they arrive.
+    
+    Query Parameters:
+        - status: Filter by status (active, inactive, deorbited)
+        - page_size: Rows fetched per database page
+    """
+    async def ndjson_rows():
+        async for sat in satellite_service.iter_satellites(page_size=page_size, status=status):
+            yield orjson.dumps(sat, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+    
+    return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
 
 
 @router.get("/{satellite_id}")
@@ -76,7 +104,7 @@ async def create_satellite(satellite: SatelliteCreate):
         - velocity_kmps: Velocity in km/s (required)
         - status: Operational status (optional, default: active)
     """
-    result = await satellite_service.create_satellite(satellite.dict())
+    result = await satellite_service.create_satellite(satellite.model_dump())
     
     return success_response(
         data=result,
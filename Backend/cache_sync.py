@@ -4,6 +4,7 @@ Run manually or schedule (e.g., cron / Windows Task Scheduler).
 """
 from config.supabase_client import supabase_client, SupabaseUnavailable
 from config.local_cache import local_cache
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,8 +17,7 @@ async def sync_table(table: str):
         if not records:
             logger.info(f"No remote records for table {table}")
             return
-        for r in records:
-            local_cache.upsert(table, r)
+        local_cache.upsert_many(table, records)
         logger.info(f"Synced {len(records)} records for {table}")
     except SupabaseUnavailable:
         logger.warning("Supabase unavailable - skipping sync")
@@ -25,10 +25,9 @@ async def sync_table(table: str):
         logger.error(f"Error syncing {table}: {e}")
 
 async def run_sync():
-    for t in TABLES:
-        await sync_table(t)
+    # Tables are independent; fetch them concurrently
+    await asyncio.gather(*(sync_table(t) for t in TABLES))
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(run_sync())
     print("Cache sync complete.")
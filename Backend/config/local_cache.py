@@ -3,14 +3,24 @@
 Provides lightweight persistence when Supabase is unavailable.
 Implements minimal CRUD for satellites, debris, alerts, maneuvers, collision_events.
 """
+import logging
 import sqlite3
 import threading
 import time
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 
+logger = logging.getLogger(__name__)
+
 DB_PATH = Path(__file__).parent.parent / "space_cache.db"
-_lock = threading.Lock()
+
+# Per-connection settings; journal_mode is a property of the file (see _ensure_db)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
 
 TABLE_DEFINITIONS = {
     "satellites": """
@@ -19,6 +29,7 @@ TABLE_DEFINITIONS = {
             name TEXT,
             x REAL, y REAL, z REAL,
             vx REAL, vy REAL, vz REAL,
+            status TEXT,
             updated_at REAL
         )
     """,
@@ -62,103 +73,191 @@ TABLE_DEFINITIONS = {
             tca_seconds REAL,
             probability REAL,
             risk_level INTEGER,
-            created_at REAL
+            created_at REAL,
+            sat_id TEXT,
+            deb_id TEXT,
+            distance REAL,
+            rel_velocity REAL,
+            angle REAL,
+            altitude_diff REAL,
+            collision_probability REAL,
+            tca TEXT,
+            time_until_tca REAL,
+            status TEXT
         )
     """
 }
 
+# Columns added after the first release; ALTERed into existing cache files
+ADDED_COLUMNS = {
+    "satellites": {"status": "TEXT"},
+    "collision_events": {
+        "sat_id": "TEXT",
+        "deb_id": "TEXT",
+        "distance": "REAL",
+        "rel_velocity": "REAL",
+        "angle": "REAL",
+        "altitude_diff": "REAL",
+        "collision_probability": "REAL",
+        "tca": "TEXT",
+        "time_until_tca": "REAL",
+        "status": "TEXT",
+    },
+}
+
+INDEX_DEFINITIONS = (
+    "CREATE INDEX IF NOT EXISTS idx_satellites_status ON satellites(status)",
+    "CREATE INDEX IF NOT EXISTS idx_collision_events_sat_deb ON collision_events(sat_id, deb_id)",
+)
+
 class LocalCache:
     def __init__(self, path: Path = DB_PATH):
         self.path = path
+        self._tls = threading.local()
+        # (table, column tuple) -> INSERT ... ON CONFLICT statement
+        self._upsert_sql: Dict[tuple, str] = {}
+        # table -> {col_name: col_type}, and the REAL columns, read once at startup
+        self._schema: Dict[str, Dict[str, str]] = {}
+        self._real_cols: Dict[str, set] = {}
         self._ensure_db()
 
-    def _connect(self):
-        return sqlite3.connect(self.path)
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            # Autocommit; each statement is its own transaction unless BEGIN is issued
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._tls.conn = conn
+        return conn
 
     def _ensure_db(self):
-        with _lock:
-            conn = self._connect()
-            cur = conn.cursor()
-            for ddl in TABLE_DEFINITIONS.values():
-                cur.execute(ddl)
-            conn.commit()
-            conn.close()
-
-    def upsert(self, table: str, record: Dict[str, Any]):
-        # Get existing columns for this table
-        with _lock:
-            conn = self._connect()
-            cur = conn.cursor()
+        conn = self._connect()
+        cur = conn.cursor()
+        # WAL lets readers run alongside a writer; it persists in the file,
+        # so it is switched once here like the other schema changes
+        if cur.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+            cur.execute("PRAGMA journal_mode=WAL")
+        for ddl in TABLE_DEFINITIONS.values():
+            cur.execute(ddl)
+        for table in TABLE_DEFINITIONS:
             cur.execute(f"PRAGMA table_info({table})")
-            schema_info = {row[1]: row[2] for row in cur.fetchall()}  # {col_name: col_type}
-            
-            # Only include fields that exist in the table schema
-            filtered_record = {}
-            for k, v in record.items():
-                if k not in schema_info:
-                    continue
-                    
-                # Convert datetime strings to Unix timestamps for REAL columns
-                if schema_info[k] == 'REAL' and isinstance(v, str):
-                    try:
-                        from datetime import datetime
-                        dt = datetime.fromisoformat(v.replace('Z', '+00:00'))
-                        filtered_record[k] = dt.timestamp()
-                    except Exception:
-                        # If conversion fails, skip this field
-                        continue
-                else:
-                    filtered_record[k] = v
-            
-            if not filtered_record or 'id' not in filtered_record:
-                conn.close()
-                return
-            
-            keys = list(filtered_record.keys())
+            schema_info = {row[1]: row[2] for row in cur.fetchall()}
+            for column, col_type in ADDED_COLUMNS.get(table, {}).items():
+                if column not in schema_info:
+                    cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+                    schema_info[column] = col_type
+            self._schema[table] = schema_info
+            self._real_cols[table] = {k for k, v in schema_info.items() if v == 'REAL'}
+        for ddl in INDEX_DEFINITIONS:
+            cur.execute(ddl)
+
+    def columns(self, table: str) -> set:
+        """Column names of a cache table"""
+        return set(self._schema.get(table, ()))
+
+    def _get_upsert_sql(self, table: str, keys: tuple) -> str:
+        sql = self._upsert_sql.get((table, keys))
+        if sql is None:
             placeholders = ",".join(["?"] * len(keys))
             updates = ",".join([f"{k}=excluded.{k}" for k in keys if k != "id"])
-            sql = f"INSERT INTO {table} ({','.join(keys)}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {updates}"
-            values = [filtered_record[k] for k in keys]
-            
-            try:
-                cur.execute(sql, values)
-                conn.commit()
-            except Exception as e:
-                import logging
-                logging.error(f"SQLite upsert error for table {table}: {e}")
-                logging.error(f"Record: {filtered_record}")
-            finally:
-                conn.close()
-
-    def get_all(self, table: str, limit: int = 100) -> List[Dict[str, Any]]:
-        with _lock:
-            conn = self._connect()
-            cur = conn.cursor()
-            cur.execute(f"SELECT * FROM {table} LIMIT ?", (limit,))
-            rows = cur.fetchall()
-            columns = [c[0] for c in cur.description]
-            conn.close()
+            conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+            sql = f"INSERT INTO {table} ({','.join(keys)}) VALUES ({placeholders}) ON CONFLICT(id) {conflict}"
+            self._upsert_sql[(table, keys)] = sql
+        return sql
+
+    def _filter_record(self, table: str, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Keep only schema columns, converting ISO timestamps in REAL columns"""
+        schema_info = self._schema.get(table)
+        if not schema_info:
+            return None
+        real_cols = self._real_cols[table]
+        
+        # Only include fields that exist in the table schema
+        filtered_record = {}
+        for k, v in record.items():
+            if k not in schema_info:
+                continue
+                
+            # Convert datetime strings to Unix timestamps for REAL columns
+            if k in real_cols and isinstance(v, str):
+                try:
+                    dt = datetime.fromisoformat(v[:-1] + '+00:00' if v.endswith('Z') else v)
+                    filtered_record[k] = dt.timestamp()
+                except ValueError:
+                    # If conversion fails, skip this field
+                    continue
+            else:
+                filtered_record[k] = v
+        
+        if not filtered_record or 'id' not in filtered_record:
+            return None
+        return filtered_record
+
+    def upsert(self, table: str, record: Dict[str, Any]):
+        filtered_record = self._filter_record(table, record)
+        if filtered_record is None:
+            return
+        
+        keys = tuple(filtered_record.keys())
+        try:
+            self._connect().execute(self._get_upsert_sql(table, keys), [filtered_record[k] for k in keys])
+        except Exception as e:
+            logger.error(f"SQLite upsert error for table {table}: {e}")
+            logger.error(f"Record: {filtered_record}")
+
+    def upsert_many(self, table: str, records: List[Dict[str, Any]]):
+        """Upsert many records in one transaction (one executemany per column set)"""
+        batches: Dict[tuple, List[list]] = {}
+        for record in records:
+            filtered_record = self._filter_record(table, record)
+            if filtered_record is not None:
+                keys = tuple(filtered_record.keys())
+                batches.setdefault(keys, []).append([filtered_record[k] for k in keys])
+        if not batches:
+            return
+        
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            for keys, rows in batches.items():
+                conn.executemany(self._get_upsert_sql(table, keys), rows)
+            conn.execute("COMMIT")
+        except Exception as e:
+            # BEGIN itself may have failed (e.g. database locked); keep that error
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            logger.error(f"SQLite bulk upsert error for table {table} ({len(records)} records): {e}")
+
+    def get_all(self, table: str, limit: int = 100, offset: int = 0, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Rows of a table; filters are column = value conditions (on schema columns)"""
+        where, params = "", []
+        if filters:
+            where = " WHERE " + " AND ".join(f"{k} = ?" for k in filters)
+            params = list(filters.values())
+        cur = self._connect().execute(f"SELECT * FROM {table}{where} LIMIT ? OFFSET ?", (*params, limit, offset))
+        rows = cur.fetchall()
+        columns = [c[0] for c in cur.description]
         return [dict(zip(columns, r)) for r in rows]
 
+    def count(self, table: str, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Number of rows matching column = value filters (no row limit)"""
+        where, params = "", []
+        if filters:
+            where = " WHERE " + " AND ".join(f"{k} = ?" for k in filters)
+            params = list(filters.values())
+        return self._connect().execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+
     def get_by_id(self, table: str, record_id: str) -> Optional[Dict[str, Any]]:
-        with _lock:
-            conn = self._connect()
-            cur = conn.cursor()
-            cur.execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,))
-            row = cur.fetchone()
-            columns = [c[0] for c in cur.description] if cur.description else []
-            conn.close()
+        cur = self._connect().execute(f"SELECT * FROM {table} WHERE id = ?", (record_id,))
+        row = cur.fetchone()
+        columns = [c[0] for c in cur.description] if cur.description else []
         return dict(zip(columns, row)) if row else None
 
     def delete(self, table: str, record_id: str) -> bool:
-        with _lock:
-            conn = self._connect()
-            cur = conn.cursor()
-            cur.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
-            conn.commit()
-            affected = cur.rowcount
-            conn.close()
-        return affected > 0
+        cur = self._connect().execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
+        return cur.rowcount > 0
 
     # Convenience wrappers
     def upsert_satellite(self, sat: Dict[str, Any]):
@@ -2,48 +2,88 @@
 Configuration Settings
 Environment variables and application configuration
 """
-from pydantic_settings import BaseSettings
-from typing import List
+from dataclasses import dataclass, fields
+from typing import Tuple
+import json
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
 
+def _parse_bool(value: str) -> bool:
+    return value.lower() == "true"
+
+
+def _parse_list(value: str) -> Tuple[str, ...]:
+    """JSON array (as pydantic-settings accepted) or comma-separated list"""
+    value = value.strip()
+    if value.startswith("["):
+        return tuple(json.loads(value))
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+# field annotation -> parser for its environment value
+_PARSERS = {
+    str: str,
+    int: int,
+    float: float,
+    bool: _parse_bool,
+    Tuple[str, ...]: _parse_list,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Application settings; any field can be overridden by an environment variable of the same name"""
 
-class Settings(BaseSettings):
-    """Application settings from environment variables"""
-    
     # Application
     APP_NAME: str = "Orbit Shield"
-    ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
-    DEBUG: bool = os.getenv("DEBUG", "True").lower() == "true"
-    HOST: str = os.getenv("HOST", "0.0.0.0")
-    PORT: int = int(os.getenv("PORT", "8000"))
-    
+    ENVIRONMENT: str = "development"
+    DEBUG: bool = True
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    # uvicorn worker processes when not reloading. Keep 1: the response cache and
+    # the service snapshots/select memo live in each process, and a write only
+    # invalidates the worker that handled it
+    WORKERS: int = 1
+
     # CORS
-    CORS_ORIGINS: List[str] = [
+    CORS_ORIGINS: Tuple[str, ...] = (
         "http://localhost:3000",
         "http://localhost:5173",
         "http://localhost:8000",
-    ]
-    
+    )
+
     # Supabase
-    SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
-    SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
-    
+    SUPABASE_URL: str = ""
+    SUPABASE_KEY: str = ""
+    SUPABASE_POOL_MAX_CONNECTIONS: int = 100
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 100
+    SUPABASE_POOL_KEEPALIVE_SECONDS: float = 300.0
+    SUPABASE_HTTP2: bool = True
+
     # AI Model Settings
     COLLISION_THRESHOLD_KM: float = 10.0
     HIGH_RISK_THRESHOLD_KM: float = 5.0
     MEDIUM_RISK_THRESHOLD_KM: float = 7.5
-    
+
     # Orbital Mechanics
     EARTH_RADIUS_KM: float = 6371.0
     LEO_ALTITUDE_MIN_KM: float = 160.0
     LEO_ALTITUDE_MAX_KM: float = 2000.0
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from os.environ (case-sensitive names)"""
+        overrides = {}
+        for f in fields(cls):
+            value = os.environ.get(f.name)
+            if value is not None:
+                try:
+                    overrides[f.name] = _PARSERS[f.type](value)
+                except ValueError as e:
+                    raise ValueError(f"Invalid value for {f.name}: {value!r}") from e
+        return cls(**overrides)
 
 
-settings = Settings()
+load_dotenv()
+settings = Settings.from_env()
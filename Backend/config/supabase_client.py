@@ -3,11 +3,20 @@ Supabase Client Configuration
 Async database operations wrapper
 """
 from supabase import create_client, Client
+from postgrest.utils import SyncClient
 from config.settings import settings
+import httpx
 from typing import Optional, Dict, List, Any
+from collections import OrderedDict
+import asyncio
+import functools
+import importlib.util
+import heapq
 import time
 import logging
+import orjson
 from .local_cache import local_cache
+from core.utils.cache import SingleFlight
 
 class SupabaseUnavailable(Exception):
     """Raised when Supabase cannot be initialized or queried."""
@@ -16,18 +25,46 @@ class SupabaseUnavailable(Exception):
 logger = logging.getLogger(__name__)
 
 
+def _filter_key_default(obj):
+    """orjson fallback for select cache keys: set-valued filters (e.g. "in" lists) as sorted lists"""
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    raise TypeError
+
+
+def _invalidates_table(method):
+    """Drop the table's memoized selects once a write method finishes"""
+    @functools.wraps(method)
+    async def wrapper(self, table: str, *args, **kwargs):
+        try:
+            return await method(self, table, *args, **kwargs)
+        finally:
+            self.invalidate_table(table)
+    return wrapper
+
+
 class SupabaseClient:
     """Async wrapper for Supabase operations"""
     
+    SELECT_TTL_SECONDS = 30.0
+    SELECT_CACHE_SIZE = 256
+    
     def __init__(self):
         self.url = settings.SUPABASE_URL
         self.key = settings.SUPABASE_KEY
         self._client: Optional[Client] = None
         self._last_error_time: Optional[float] = None
+        # select key -> (fetched_at, rows), LRU-bounded; only successful remote reads
+        self._select_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # select key -> task fetching it (coalesces concurrent misses and refreshes)
+        self._selects = SingleFlight("Background select")
+        # bumped per table on writes so reads that started earlier are not stored
+        self._table_generation: Dict[str, int] = {}
         
     def reset_client(self):
         """Reset client to force reconnection"""
-        self._client = None
+        # Release the pooled connections too; the next client opens a fresh pool
+        self.close()
         logger.info("Supabase client reset - will reconnect on next request")
         
     @property
@@ -44,56 +81,290 @@ class SupabaseClient:
                     supabase_url=self.url,
                     supabase_key=self.key
                 )
+                self._configure_pool(self._client)
                 logger.info("✅ Supabase client initialized successfully")
             except Exception as e:
                 logger.warning(f"❌ Supabase initialization failed: {e}. Using local cache.")
                 raise SupabaseUnavailable(f"Supabase init failed: {e}")
         return self._client
     
-    async def select(self, table: str, filters: Optional[Dict] = None, limit: Optional[int] = None, columns: Optional[str] = None) -> List[Dict]:
+    @staticmethod
+    def _configure_pool(client: Client):
+        """
+        Swap the PostgREST HTTP session for one with a sized keep-alive pool
+        
+        httpx drops idle connections after 5 s by default, so intermittent
+        traffic paid a fresh TCP/TLS handshake to Supabase on most requests.
+        With HTTP/2 (needs the h2 package) bursts of concurrent requests
+        multiplex over the kept-alive connections instead of opening more.
+        """
+        postgrest = client.postgrest
+        default_session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=default_session.timeout,
+            http2=settings.SUPABASE_HTTP2 and importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.SUPABASE_POOL_KEEPALIVE_SECONDS
+            )
+        )
+        default_session.close()
+    
+    def init_pool(self) -> bool:
+        """Create the client and its connection pool up front (called at startup)"""
+        try:
+            self.client
+            return True
+        except SupabaseUnavailable:
+            return False
+    
+    def close(self):
+        """Close pooled connections (called at shutdown)"""
+        if self._client is not None:
+            self._client.postgrest.session.close()
+            self._client = None
+    
+    @staticmethod
+    async def _execute(query):
+        """
+        Run a built PostgREST request off the event loop
+        
+        supabase-py's ``execute()`` is a blocking HTTP call; on the loop it
+        stalled every other request for the whole round-trip. The pooled
+        httpx session is thread-safe, so concurrent requests now overlap.
+        """
+        return await asyncio.to_thread(query.execute)
+    
+    @staticmethod
+    def _apply_filters(query, filters: Optional[Dict]):
+        """Apply column filters to a query builder.
+
+        Plain values become ``eq`` filters; dict values map operator -> operand,
+        e.g. ``{"severity": {"in": ["high", "critical"]}}``.
         """
-        Select records from table
+        if not filters:
+            return query
+        for key, value in filters.items():
+            if isinstance(value, dict):
+                for op, operand in value.items():
+                    # postgrest-py exposes `in` as `in_` (reserved word)
+                    query = getattr(query, "in_" if op == "in" else op)(key, operand)
+            else:
+                query = query.eq(key, value)
+        return query
+
+    @staticmethod
+    def _matches(record: Dict, filters: Optional[Dict]) -> bool:
+        """Evaluate the same filters in Python (used for local cache fallback)."""
+        for key, value in (filters or {}).items():
+            if isinstance(value, dict):
+                operand = value.get("in")
+                if operand is not None and record.get(key) not in operand:
+                    return False
+            elif record.get(key) != value:
+                return False
+        return True
+
+    async def select(self, table: str, filters: Optional[Dict] = None, limit: Optional[int] = None, columns: Optional[str] = None, order: Optional[str] = None, offset: Optional[int] = None, memoize: bool = True) -> List[Dict]:
+        """
+        Select records from table (stale-while-revalidate)
+        
+        Successful reads are memoized for SELECT_TTL_SECONDS. Entries past
+        half the TTL are still served while one background task refreshes
+        them; concurrent misses for the same query share one round-trip.
+        Writes through this client drop the table's entries.
         
         Args:
             table: Table name
-            filters: Dict of column: value filters
+            filters: Dict of column: value filters (dict values for operators, e.g. {"in": [...]})
             limit: Maximum number of records
+            order: Sort spec as "column.asc" / "column.desc"; comma-separate for multiple keys
+            offset: Number of rows to skip (for paging)
+            memoize: False for one-off reads (e.g. export paging) that should
+                neither hit nor fill the memo, so their rows are not kept alive
             
         Returns:
-            List of records
+            List of records (fresh dicts; callers may mutate them)
         """
+        if not memoize:
+            # Rows straight from PostgREST or the local cache are already unshared
+            return await self._select_uncached(None, table, filters, limit, columns, order, offset)
+        key = (table, orjson.dumps(filters, default=_filter_key_default, option=orjson.OPT_SORT_KEYS) if filters else None, limit, columns, order, offset)
+        fetch = lambda: self._select_uncached(key, table, filters, limit, columns, order, offset)
+        entry = self._select_cache.get(key)
+        if entry is not None:
+            fetched_at, rows = entry
+            age = time.monotonic() - fetched_at
+            if age < self.SELECT_TTL_SECONDS:
+                self._select_cache.move_to_end(key)
+                if age >= self.SELECT_TTL_SECONDS / 2:
+                    self._selects.start(key, fetch)
+                return [dict(r) for r in rows]
+        
+        rows = await self._selects.run(key, fetch)
+        return [dict(r) for r in rows]
+    
+    def invalidate_table(self, table: str):
+        """Drop memoized selects for a table (called after writes)"""
+        self._table_generation[table] = self._table_generation.get(table, 0) + 1
+        for key in [k for k in self._select_cache if k[0] == table]:
+            del self._select_cache[key]
+        # reads already in flight may predate the write; later callers start afresh
+        self._selects.forget(lambda key: key[0] == table)
+    
+    def _store_select(self, key: tuple, generation: int, rows: List[Dict]):
+        if generation != self._table_generation.get(key[0], 0):
+            return
+        self._select_cache[key] = (time.monotonic(), rows)
+        self._select_cache.move_to_end(key)
+        while len(self._select_cache) > self.SELECT_CACHE_SIZE:
+            self._select_cache.popitem(last=False)
+    
+    async def _select_uncached(self, key: tuple, table: str, filters: Optional[Dict], limit: Optional[int], columns: Optional[str], order: Optional[str], offset: Optional[int]) -> List[Dict]:
+        """One PostgREST round-trip, memoized under key unless it is None; falls back to the local cache on failure (not memoized)"""
+        generation = self._table_generation.get(table, 0)
         start = time.time()
         try:
             select_cols = columns if columns else "*"
-            query = self.client.table(table).select(select_cols)
+            query = self._apply_filters(self.client.table(table).select(select_cols), filters)
             
-            if filters:
-                for key, value in filters.items():
-                    query = query.eq(key, value)
+            for column, descending in self._parse_order(order):
+                query = query.order(column, desc=descending)
             
             if limit:
                 query = query.limit(limit)
+            
+            if offset:
+                query = query.offset(offset)
                 
-            response = query.execute()
+            response = await self._execute(query)
             took_ms = int((time.time() - start) * 1000)
-            if not response.data:
+            rows = response.data or []
+            if key is not None:
+                self._store_select(key, generation, rows)
+            if not rows:
                 logger.warning(f"Supabase select returned empty set table={table} cols={select_cols} filters={filters} limit={limit} ({took_ms}ms)")
-                return []
-            logger.info(f"Supabase select ok table={table} count={len(response.data)} cols={select_cols} ({took_ms}ms)")
-            return response.data
+                return rows
+            logger.info(f"Supabase select ok table={table} count={len(rows)} cols={select_cols} ({took_ms}ms)")
+            return rows
             
         except SupabaseUnavailable:
             # Fallback to local cache
-            return local_cache.get_all(table, limit=limit or 100)
+            return self._select_cached(table, filters, limit, offset, order)
         except Exception as e:
             took_ms = int((time.time() - start) * 1000)
             logger.error(f"Supabase select error table={table} cols={columns or '*'} filters={filters} limit={limit} ({took_ms}ms): {e}. Falling back to cache")
-            return local_cache.get_all(table, limit=limit or 100)
+            return self._select_cached(table, filters, limit, offset, order)
+
+    @staticmethod
+    def _parse_order(order: Optional[str]) -> List[tuple]:
+        """Split "a.desc,b.asc" into [(column, descending), ...]"""
+        specs = []
+        for part in (order or "").split(","):
+            if part:
+                column, _, direction = part.strip().partition(".")
+                specs.append((column, direction == "desc"))
+        return specs
+
+    @staticmethod
+    def _split_cache_filters(table: str, filters: Optional[Dict]) -> tuple:
+        """Split filters into plain equalities SQLite can apply (and index) and the rest"""
+        columns = local_cache.columns(table)
+        sql_filters, rest = {}, {}
+        for key, value in (filters or {}).items():
+            if key in columns and value is not None and not isinstance(value, dict):
+                sql_filters[key] = value
+            else:
+                rest[key] = value
+        return sql_filters, rest
+
+    def _select_cached(self, table: str, filters: Optional[Dict], limit: Optional[int], offset: Optional[int] = None, order: Optional[str] = None) -> List[Dict]:
+        """Local cache fallback honoring the same filters and ordering as the remote query"""
+        sql_filters, filters = self._split_cache_filters(table, filters)
+        specs = self._parse_order(order)
+        if not specs:
+            if not filters:
+                return local_cache.get_all(table, limit=limit or 100, offset=offset or 0, filters=sql_filters)
+            # Python-side filters must run before paging
+            rows = [r for r in local_cache.get_all(table, limit=-1, filters=sql_filters) if self._matches(r, filters)]
+            start = offset or 0
+            return rows[start:start + (limit or 100)]
+        
+        rows = (r for r in local_cache.get_all(table, limit=-1, filters=sql_filters) if self._matches(r, filters))
+        keys = [
+            lambda r, c=column: (r.get(c) is not None, r.get(c) or 0)
+            for column, _ in specs
+        ]
+        start = offset or 0
+        
+        if len({descending for _, descending in specs}) > 1:
+            # Mixed directions: stable sort from the least significant key
+            rows = list(rows)
+            for key, (_, descending) in reversed(list(zip(keys, specs))):
+                rows.sort(key=key, reverse=descending)
+            return rows[start:start + (limit or 100)]
+        
+        # Ordered top-N: filter lazily and keep only offset+limit rows in a heap
+        # instead of sorting every cached row
+        pick = heapq.nlargest if specs[0][1] else heapq.nsmallest
+        top = pick(
+            start + (limit or 100),
+            rows,
+            key=lambda r: tuple(key(r) for key in keys)
+        )
+        return top[start:]
+    
+    async def select_remote(self, table: str, filters: Optional[Dict] = None, columns: Optional[str] = None) -> Optional[List[Dict]]:
+        """
+        Select from a Postgres-only relation (e.g. a materialized view)
+        
+        There is no local cache copy of such relations, so instead of falling
+        back this returns None when Supabase cannot answer; callers then
+        compute the result from the base tables.
+        """
+        try:
+            query = self._apply_filters(self.client.table(table).select(columns or "*"), filters)
+            return (await self._execute(query)).data or []
+        except SupabaseUnavailable:
+            return None
+        except Exception as e:
+            logger.error(f"Supabase select error table={table} filters={filters}: {e}")
+            return None
+    
+    async def count(self, table: str, filters: Optional[Dict] = None) -> int:
+        """
+        Count records matching filters without transferring rows
+        
+        Uses PostgREST ``count=exact`` so the aggregation happens in Postgres;
+        at most one row is transferred alongside the Content-Range count.
+        """
+        start = time.time()
+        try:
+            query = self._apply_filters(self.client.table(table).select("id", count="exact"), filters).limit(1)
+            response = await self._execute(query)
+            took_ms = int((time.time() - start) * 1000)
+            logger.info(f"Supabase count ok table={table} filters={filters} count={response.count} ({took_ms}ms)")
+            return response.count or 0
+        except SupabaseUnavailable:
+            return self._count_cached(table, filters)
+        except Exception as e:
+            logger.error(f"Supabase count error table={table} filters={filters}: {e}. Falling back to cache")
+            return self._count_cached(table, filters)
+    
+    def _count_cached(self, table: str, filters: Optional[Dict]) -> int:
+        """Local cache count over every matching row (SQL COUNT unless a filter needs Python)"""
+        sql_filters, filters = self._split_cache_filters(table, filters)
+        if not filters:
+            return local_cache.count(table, sql_filters)
+        return sum(1 for r in local_cache.get_all(table, limit=-1, filters=sql_filters) if self._matches(r, filters))
     
     async def select_by_id(self, table: str, record_id: str) -> Optional[Dict]:
         """Get single record by ID"""
         try:
-            response = self.client.table(table).select("*").eq("id", record_id).execute()
+            response = await self._execute(self.client.table(table).select("*").eq("id", record_id))
             return response.data[0] if response.data else None
         except SupabaseUnavailable:
             return local_cache.get_by_id(table, record_id)
@@ -101,6 +372,7 @@ class SupabaseClient:
             logger.error(f"Supabase select_by_id error: {e}. Falling back to cache")
             return local_cache.get_by_id(table, record_id)
     
+    @_invalidates_table
     async def insert(self, table: str, data: Dict) -> Optional[Dict]:
         """
         Insert record into table
@@ -113,7 +385,7 @@ class SupabaseClient:
             Inserted record
         """
         try:
-            response = self.client.table(table).insert(data).execute()
+            response = await self._execute(self.client.table(table).insert(data))
             inserted = response.data[0] if response.data else None
             if inserted:
                 # write-through to cache
@@ -127,6 +399,39 @@ class SupabaseClient:
             local_cache.upsert(table, data)
             return data
     
+    @_invalidates_table
+    async def insert_many(self, table: str, records: List[Dict], chunk_size: int = 500) -> List[Dict]:
+        """
+        Insert records in chunks, one request per chunk
+        
+        The chunk requests run concurrently, so a large batch costs about one
+        round-trip of wall-clock time instead of one per chunk.
+        
+        Args:
+            table: Table name
+            records: Records to insert (must already carry their ids)
+            chunk_size: Rows per INSERT (keeps payloads under PostgREST limits)
+            
+        Returns:
+            The records as submitted
+        """
+        async def insert_chunk(chunk: List[Dict]):
+            try:
+                # Skip echoing rows back; callers already hold them
+                await self._execute(self.client.table(table).insert(chunk, returning="minimal"))
+            except SupabaseUnavailable:
+                pass
+            except Exception as e:
+                logger.error(f"Supabase bulk insert error table={table} rows={len(chunk)}: {e}. Using cache only")
+            # write-through to cache
+            local_cache.upsert_many(table, chunk)
+        
+        await asyncio.gather(*(
+            insert_chunk(records[i:i + chunk_size]) for i in range(0, len(records), chunk_size)
+        ))
+        return records
+    
+    @_invalidates_table
     async def update(self, table: str, record_id: str, data: Dict) -> Optional[Dict]:
         """
         Update record by ID
@@ -137,23 +442,34 @@ class SupabaseClient:
             data: Updated data
             
         Returns:
-            Updated record
+            Updated record, or None if no row has the ID
         """
         try:
-            response = self.client.table(table).update(data).eq("id", record_id).execute()
+            response = await self._execute(self.client.table(table).update(data).eq("id", record_id))
             updated = response.data[0] if response.data else None
             if updated:
                 local_cache.upsert(table, updated)
             return updated
         except SupabaseUnavailable:
             # update cache directly
-            local_cache.upsert(table, {"id": record_id, **data})
-            return {"id": record_id, **data}
+            return self._update_cached(table, record_id, data)
         except Exception as e:
             logger.error(f"Supabase update error: {e}. Updating cache only")
-            local_cache.upsert(table, {"id": record_id, **data})
+            return self._update_cached(table, record_id, data)
+    
+    @staticmethod
+    def _update_cached(table: str, record_id: str, data: Dict) -> Optional[Dict]:
+        """Cache-only update; like the remote UPDATE, it never creates a missing row"""
+        if not local_cache.columns(table):
+            # Not mirrored locally: nothing to check against
             return {"id": record_id, **data}
+        existing = local_cache.get_by_id(table, record_id)
+        if existing is None:
+            return None
+        local_cache.upsert(table, {"id": record_id, **data})
+        return {**existing, **data}
     
+    @_invalidates_table
     async def delete(self, table: str, record_id: str) -> bool:
         """
         Delete record by ID
@@ -163,12 +479,12 @@ class SupabaseClient:
             record_id: Record ID
             
         Returns:
-            Success status
+            True if a row was deleted
         """
         try:
-            self.client.table(table).delete().eq("id", record_id).execute()
+            response = await self._execute(self.client.table(table).delete().eq("id", record_id))
             local_cache.delete(table, record_id)
-            return True
+            return bool(response.data)
         except SupabaseUnavailable:
             return local_cache.delete(table, record_id)
         except Exception as e:
@@ -4,6 +4,7 @@ Advanced collision risk predictor using physics-based algorithms.
 Analyzes orbital dynamics, relative velocities, and approach geometry.
 """
 import math
+import numpy as np
 from .physics_utils import compute_physics_features
 
 def predict_risk_from_features(distance, rel_velocity, angle, altitude_diff, distance_at_tca=None, tca_seconds=None):
@@ -14,34 +15,31 @@ def predict_risk_from_features(distance, rel_velocity, angle, altitude_diff, dis
     - altitude_diff reduces risk if huge.
     - tca_seconds: if very near future -> increases risk
     """
+    # the TCA override needs both values; without them take the branch-free path
+    if distance_at_tca is None or tca_seconds is None:
+        return _predict_no_tca(distance, rel_velocity, angle, altitude_diff)
+
     # Base by inverse distance (km): saturate
     d = max(distance, 0.001)
     base = math.exp(-d / 30.0)   # 30 km characteristic scale
 
-    # tca override: use closest approach distance if available
-    if distance_at_tca is not None:
-        base_tca = math.exp(- max(distance_at_tca, 0.001) / 20.0) * 0.8
-        # if TCA soon (within 72 hours ~ 259200 sec) amplify
-        if tca_seconds is not None:
-            # prefer future TCAs
-            if tca_seconds >= 0:
-                time_factor = 1.0 + max(0.0, (72*3600 - tca_seconds) / (72*3600)) * 0.5
-            else:
-                # past event - don't amplify
-                time_factor = 1.0
-            base = max(base, base_tca * time_factor)
+    # tca override: use closest approach distance
+    base_tca = math.exp(- max(distance_at_tca, 0.001) / 20.0) * 0.8
+    # if TCA soon (within 72 hours ~ 259200 sec) amplify
+    # prefer future TCAs
+    if tca_seconds >= 0:
+        time_factor = 1.0 + max(0.0, (72*3600 - tca_seconds) / (72*3600)) * 0.5
+    else:
+        # past event - don't amplify
+        time_factor = 1.0
+    base = max(base, base_tca * time_factor)
 
     # relative velocity factor (km/s) — normalize with plausible LEO 7.5
     rv = rel_velocity
     vel_factor = min(rv / 12.0, 1.0) * 0.4  # up to +0.4
 
     # angle factor: head-on (180 deg) is more dangerous than co-moving (0 deg)
-    # make 180->1.0, 0->0.2
-    ang_norm = (abs(angle - 180.0) / 180.0)  # 0..1 with 0 at 180? fix:
-    # better: angle closeness to 180
-    ang_factor = ((angle) / 180.0)  # angle near 180 -> 1.0
-
-    angle_contrib = ang_factor * 0.2
+    angle_contrib = (angle / 180.0) * 0.2  # angle near 180 -> +0.2
 
     # altitude difference reduces risk
     alt_factor = max(0.0, 1.0 - min(altitude_diff / 50.0, 1.0)) * 0.3
@@ -52,12 +50,25 @@ def predict_risk_from_features(distance, rel_velocity, angle, altitude_diff, dis
     prob = max(0.0, min(1.0, prob))
     return float(prob)
 
-def predict_for_sat_debris(sat, deb):
+def _predict_no_tca(distance, rel_velocity, angle, altitude_diff):
+    """
+    predict_risk_from_features specialized for no TCA override (the legacy
+    predict_risk path): same terms, no None checks and no unused TCA exp()
+    """
+    prob = (math.exp(-max(distance, 0.001) / 30.0) * 0.7
+            + min(rel_velocity / 12.0, 1.0) * 0.4 * 1.0
+            + (angle / 180.0) * 0.2
+            + max(0.0, 1.0 - min(altitude_diff / 50.0, 1.0)) * 0.3 * 0.5)
+    return float(max(0.0, min(1.0, prob)))
+
+def predict_for_sat_debris(sat, deb, feats=None):
     """
     High-level: accept sat & deb dicts {x,y,z,vx,vy,vz}
+    feats: precomputed compute_physics_features(sat, deb), if available
     Returns dict with risk probability + feature breakdown.
     """
-    feats = compute_physics_features(sat, deb)
+    if feats is None:
+        feats = compute_physics_features(sat, deb)
     prob = predict_risk_from_features(
         feats["distance"],
         feats["rel_velocity"],
@@ -85,12 +96,60 @@ def predict_risk(distance: float, relative_velocity: float, angle: float, altitu
     Returns:
         Risk probability (0.0 = no risk, 1.0 = certain collision)
     """
-    # Use new physics-based predictor
-    return predict_risk_from_features(
-        distance=distance,
-        rel_velocity=relative_velocity,
-        angle=angle,
-        altitude_diff=0.0,  # Not provided in legacy interface
-        distance_at_tca=distance,
-        tca_seconds=None
-    )
+    # Use new physics-based predictor; with tca_seconds=None the TCA
+    # override never applies, so call the specialized variant directly
+    return _predict_no_tca(distance, relative_velocity, angle, 0.0)  # altitude_diff not provided in legacy interface
+
+def predict_risk_batch(distance: np.ndarray, relative_velocity: np.ndarray, angle: np.ndarray, altitude_diff: np.ndarray,
+                       distance_at_tca: np.ndarray = None, tca_seconds: np.ndarray = None) -> np.ndarray:
+    """
+    Vectorized risk scoring for many encounters at once.
+    
+    Same terms as predict_risk_from_features, evaluated over arrays so a
+    whole conjunction screen costs one call. The TCA override applies when
+    both distance_at_tca and tca_seconds are given.
+    
+    Args:
+        distance: Separation distances (km)
+        relative_velocity: Relative velocity magnitudes (km/s)
+        angle: Approach angles (degrees)
+        altitude_diff: Altitude differences (km)
+        distance_at_tca: Distances at closest approach (km), optional
+        tca_seconds: Times to closest approach (s), optional
+    
+    Returns:
+        Array of risk probabilities in [0, 1]
+    """
+    # Terms accumulate into one buffer (in-place ufuncs) instead of a fresh
+    # temporary per operator
+    prob = np.maximum(distance, 0.001)
+    prob *= -1.0 / 30.0
+    np.exp(prob, out=prob)
+    if distance_at_tca is not None and tca_seconds is not None:
+        base_tca = np.maximum(distance_at_tca, 0.001)
+        base_tca *= -1.0 / 20.0
+        np.exp(base_tca, out=base_tca)
+        # future TCAs within 72 hours amplify (x1.0..1.5); past events don't.
+        # Masking by multiplication keeps this a straight ufunc pass instead
+        # of a boolean scatter
+        time_factor = np.maximum(0.0, (72*3600 - tca_seconds) / (72*3600))
+        time_factor *= tca_seconds >= 0
+        time_factor *= 0.5
+        time_factor += 1.0
+        base_tca *= 0.8
+        base_tca *= time_factor
+        np.maximum(prob, base_tca, out=prob)
+    prob *= 0.7
+    
+    term = np.minimum(relative_velocity / 12.0, 1.0)  # velocity, up to +0.4
+    term *= 0.4
+    prob += term
+    np.multiply(angle, 0.2 / 180.0, out=term)  # head-on approach, up to +0.2
+    prob += term
+    np.divide(altitude_diff, 50.0, out=term)  # altitude separation, up to +0.15
+    np.minimum(term, 1.0, out=term)
+    np.subtract(1.0, term, out=term)
+    np.maximum(term, 0.0, out=term)
+    term *= 0.3 * 0.5
+    prob += term
+    return np.clip(prob, 0.0, 1.0, out=prob)
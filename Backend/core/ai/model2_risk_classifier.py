@@ -3,9 +3,18 @@
 Multi-class risk classifier using advanced pattern recognition.
 Categorizes collision scenarios into discrete risk levels.
 """
+import numpy as np
 from .physics_utils import compute_physics_features
 from typing import Dict
 
+# risk_level -> (label, color, recommended action)
+RISK_LABELS = {
+    0: ("No Risk", "green", "Continue monitoring"),
+    1: ("Low Risk", "yellow", "Increase monitoring frequency"),
+    2: ("Medium Risk", "orange", "Prepare avoidance maneuver"),
+    3: ("High Risk", "red", "Execute immediate avoidance maneuver")
+}
+
 def classify_distance(distance):
     """
     Simple rule-based classifier:
@@ -23,12 +32,14 @@ def classify_distance(distance):
     else:
         return 3
 
-def classify_for_sat_debris(sat, deb):
+def classify_for_sat_debris(sat, deb, feats=None):
     """
     High-level classifier accepting sat & deb dicts {x,y,z,vx,vy,vz}.
+    feats: precomputed compute_physics_features(sat, deb), if available
     Returns dict with risk_level and features.
     """
-    feats = compute_physics_features(sat, deb)
+    if feats is None:
+        feats = compute_physics_features(sat, deb)
     cls = classify_distance(feats["distance"])
     return {
         "risk_level": int(cls),
@@ -56,19 +67,12 @@ def classify_risk_advanced(distance: float, relative_velocity: float, angle: flo
     risk_level = classify_distance(distance)
     
     # Map to labels
-    labels = {
-        0: ("No Risk", "green", "Continue monitoring"),
-        1: ("Low Risk", "yellow", "Increase monitoring frequency"),
-        2: ("Medium Risk", "orange", "Prepare avoidance maneuver"),
-        3: ("High Risk", "red", "Execute immediate avoidance maneuver")
-    }
-    
-    label, color, action = labels.get(risk_level, labels[0])
+    label, color, action = RISK_LABELS.get(risk_level, RISK_LABELS[0])
     
     # Adjust for velocity and angle
     if relative_velocity > 10.0 and angle > 150:
         risk_level = min(risk_level + 1, 3)
-        label, color, action = labels.get(risk_level, labels[3])
+        label, color, action = RISK_LABELS.get(risk_level, RISK_LABELS[3])
     
     return {
         "risk_level": risk_level,
@@ -76,3 +80,24 @@ def classify_risk_advanced(distance: float, relative_velocity: float, angle: flo
         "color": color,
         "action": action
     }
+
+def classify_distance_batch(distance: np.ndarray) -> np.ndarray:
+    """Vectorized classify_distance: same thresholds, integer array of levels 0-3"""
+    # (50, inf) -> 0, (20, 50] -> 1, (5, 20] -> 2, [0, 5] -> 3
+    return (3 - np.searchsorted([5.0, 20.0, 50.0], distance, side="left")).astype(int)
+
+def classify_risk_batch(distance: np.ndarray, relative_velocity: np.ndarray, angle: np.ndarray) -> np.ndarray:
+    """
+    Vectorized classify_risk_advanced: risk levels (0-3) for many encounters.
+    
+    Args:
+        distance: Separation distances (km)
+        relative_velocity: Relative velocity magnitudes (km/s)
+        angle: Approach angles (degrees)
+    
+    Returns:
+        Integer array of risk levels; map to text with RISK_LABELS
+    """
+    risk_level = classify_distance_batch(distance)
+    bump = (relative_velocity > 10.0) & (angle > 150)
+    return np.minimum(risk_level + bump, 3).astype(int)
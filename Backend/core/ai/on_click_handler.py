@@ -1,14 +1,72 @@
 # backend/core/ai/on_click_handler.py
-from .physics_utils import compute_physics_features
-from .model1_risk_predictor import predict_for_sat_debris
-from .model2_risk_classifier import classify_for_sat_debris
+import numpy as np
+from .physics_utils import compute_physics_features_batch
+from .model1_risk_predictor import predict_risk_batch
+from .model2_risk_classifier import classify_distance_batch
 from .rl_maneuver_agent import suggest_maneuver_simple
 
-def handle_satellite_click(sat, debris_list, top_n=1, include_maneuver=True):
+STATE_FIELDS = ("x", "y", "z", "vx", "vy", "vz")
+
+def _score_pairs(sat_pos, sat_vel, deb_pos, deb_vel):
+    """Features, Model 1 probabilities and Model 2 levels for N pairs in one batch."""
+    feats = compute_physics_features_batch(sat_pos, sat_vel, deb_pos, deb_vel)
+    probs = predict_risk_batch(
+        feats["distance"], feats["rel_velocity"], feats["angle"], feats["altitude_diff"],
+        distance_at_tca=feats["distance_at_tca"], tca_seconds=feats["tca_seconds"]
+    )
+    levels = classify_distance_batch(feats["distance"])
+    return feats, probs, levels
+
+def _nearest_indices(sat_pos, positions, k, sq_norms=None):
+    """Indices of the k debris rows closest to sat_pos, nearest first.
+
+    Ranks on squared distance (einsum, no sqrt or norm temporaries); the
+    reported distance is recomputed from the features of the k survivors.
+    With precomputed sq_norms (|p|^2 per row) the ranking key is a single
+    mat-vec: |p|^2 - 2 p.s (|s|^2 is the same for every row).
+    """
+    if sq_norms is not None:
+        d2 = sq_norms - 2.0 * (positions @ sat_pos)
+    else:
+        diff = positions - sat_pos
+        d2 = np.einsum("ij,ij->i", diff, diff)
+    k = min(k, len(d2))
+    idx = np.argpartition(d2, k - 1)[:k] if 0 < k < len(d2) else np.arange(k)
+    return idx[np.argsort(d2[idx], kind="stable")]
+
+def _nearest_each(sat_pos, positions, sq_norms=None):
+    """Nearest debris row for each of S satellites.
+
+    Uses |s|^2 + |p|^2 - 2 s.p so the (S, D) matrix comes from one BLAS
+    matmul instead of an (S, D, 3) difference tensor. |s|^2 is constant per
+    row and drops out of the argmin; |p|^2 can be precomputed per debris
+    snapshot (DebrisArrays.sq_norms).
+    """
+    if sq_norms is None:
+        sq_norms = np.einsum("ij,ij->i", positions, positions)
+    return (sq_norms[None, :] - 2.0 * (sat_pos @ positions.T)).argmin(axis=1)
+
+def _nearest_item(deb, row, feats, probs, levels, maneuver=None):
+    """One entry of the "nearest" list for row `row` of a scored batch."""
+    pair_feats = {k: float(v[row]) for k, v in feats.items()}
+    return {
+        "debris": deb,
+        "distance_now_km": pair_feats["distance"],
+        "features": pair_feats,
+        "model1_risk": {"probability": float(probs[row]), "features": pair_feats},
+        "model2_class": {"risk_level": int(levels[row]), "features": pair_feats},
+        "maneuver": maneuver
+    }
+
+def handle_satellite_click(sat, debris_list, top_n=1, include_maneuver=True, positions=None, velocities=None, sq_norms=None):
     """
     sat: dict with keys x,y,z,vx,vy,vz and metadata
     debris_list: iterable of debris dicts each with x,y,z,vx,vy,vz and metadata
     top_n: number of nearest debris to return predictions for (default 1)
+    positions, velocities: optional (N, 3) arrays of debris x,y,z / vx,vy,vz
+      row-aligned with debris_list (e.g. DebrisArrays); skips rebuilding them
+      from the dicts
+    sq_norms: optional (N,) squared position norms from the same snapshot
     Returns:
       {
         "sat": sat,
@@ -23,32 +81,78 @@ def handle_satellite_click(sat, debris_list, top_n=1, include_maneuver=True):
         ]
       }
     """
-    # find nearest debris by current distance
-    dists = []
-    for d in debris_list:
-        feats = compute_physics_features(sat, d)
-        dists.append((feats["distance"], d, feats))
+    if not isinstance(debris_list, (list, tuple)):
+        debris_list = list(debris_list)
+    if positions is None:
+        positions = np.array([[d["x"], d["y"], d["z"]] for d in debris_list], dtype=float).reshape(-1, 3)
+        sq_norms = None
 
-    # sort ascending
-    dists.sort(key=lambda x: x[0])
+    # find nearest debris by current distance (one vectorized pass)
+    sat_pos = np.array([sat["x"], sat["y"], sat["z"]], dtype=float)
+    nearest_idx = _nearest_indices(sat_pos, positions, top_n, sq_norms)
 
-    out_items = []
-    for i in range(min(top_n, len(dists))):
-        dist, deb, feats = dists[i]
-        m1 = predict_for_sat_debris(sat, deb)
-        m2 = classify_for_sat_debris(sat, deb)
-        man = suggest_maneuver_simple(sat, deb) if include_maneuver else None
+    # Score the top_n pairs as one batch (features computed once, shared by both models)
+    if velocities is not None:
+        deb_vel = velocities[nearest_idx]
+    else:
+        deb_vel = np.array([[debris_list[i][f] for f in STATE_FIELDS[3:]] for i in nearest_idx], dtype=float).reshape(-1, 3)
+    sat_state = np.array([sat[f] for f in STATE_FIELDS], dtype=float)
+    # The satellite's (3,) state broadcasts against every selected debris row
+    feats, probs, levels = _score_pairs(
+        sat_state[:3], sat_state[3:],
+        positions[nearest_idx], deb_vel
+    )
 
-        out_items.append({
-            "debris": deb,
-            "distance_now_km": float(dist),
-            "features": feats,
-            "model1_risk": m1,
-            "model2_class": m2,
-            "maneuver": man
-        })
+    out_items = []
+    for row, i in enumerate(nearest_idx.tolist()):
+        deb = debris_list[i]
+        item = _nearest_item(deb, row, feats, probs, levels)
+        if include_maneuver:
+            # reuse the batch features instead of recomputing them per pair
+            item["maneuver"] = suggest_maneuver_simple(sat, deb, feats=item["features"])
+        out_items.append(item)
 
     return {
         "sat": sat,
         "nearest": out_items
     }
+
+def handle_satellite_batch(sats, debris_list, positions=None, velocities=None, sq_norms=None):
+    """
+    Nearest-debris risk for many satellites in one vectorized pass.
+    sats: list of satellite dicts with x,y,z,vx,vy,vz
+    debris_list: debris dicts; positions/velocities optionally give them as
+      row-aligned (N, 3) arrays (e.g. DebrisArrays), and sq_norms their
+      precomputed squared norms
+    Returns a list aligned with sats: the same item shape as one entry of
+    handle_satellite_click(...)["nearest"] (without maneuver), or None when
+    the satellite lacks a state vector or there is no debris.
+    """
+    if not isinstance(debris_list, (list, tuple)):
+        debris_list = list(debris_list)
+    if positions is None or velocities is None:
+        state = np.array([[d[f] for f in STATE_FIELDS] for d in debris_list], dtype=float).reshape(-1, 6)
+        positions, velocities = state[:, :3], state[:, 3:]
+        sq_norms = None
+    results = [None] * len(sats)
+    if not len(debris_list):
+        return results
+
+    sat_state = np.array(
+        [[s.get(f) for f in STATE_FIELDS] for s in sats],
+        dtype=float
+    ).reshape(-1, 6)
+    valid = np.flatnonzero(np.isfinite(sat_state).all(axis=1))
+    if not valid.size:
+        return results
+    sat_pos, sat_vel = sat_state[valid, :3], sat_state[valid, 3:]
+
+    # (S, D) distance matrix -> nearest debris per satellite
+    nearest = _nearest_each(sat_pos, positions, sq_norms)
+
+    # Physics features and both models on the S primary pairs only
+    feats, probs, levels = _score_pairs(sat_pos, sat_vel, positions[nearest], velocities[nearest])
+
+    for row, (sat_i, deb_i) in enumerate(zip(valid.tolist(), nearest.tolist())):
+        results[sat_i] = _nearest_item(debris_list[deb_i], row, feats, probs, levels)
+    return results
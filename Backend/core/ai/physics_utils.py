@@ -1,8 +1,13 @@
 # backend/core/ai/physics_utils.py
+import math
+from operator import itemgetter
 import numpy as np
 
 EARTH_RADIUS_KM = 6371.0
 
+# x, y, z, vx, vy, vz out of a sat/debris dict in one C-level call
+_state_of = itemgetter("x", "y", "z", "vx", "vy", "vz")
+
 def norm(vec):
     return float(np.linalg.norm(vec))
 
@@ -13,33 +18,30 @@ def unit(vec):
     return vec / n
 
 def compute_distance(r1, r2):
-    """Euclidean distance (km) between position vectors r1, r2 (arrays of length 3)."""
-    r1 = np.asarray(r1, dtype=float)
-    r2 = np.asarray(r2, dtype=float)
-    return float(np.linalg.norm(r1 - r2))
+    """Euclidean distance (km) between position vectors r1, r2 (sequences of length 3)."""
+    x1, y1, z1 = r1
+    x2, y2, z2 = r2
+    return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
 
 def compute_relative_velocity(v1, v2):
     """Relative speed (km/s)"""
-    v1 = np.asarray(v1, dtype=float)
-    v2 = np.asarray(v2, dtype=float)
-    return float(np.linalg.norm(v1 - v2))
+    return compute_distance(v1, v2)
 
 def compute_angle_between(v1, v2):
     """Angle between velocity vectors in degrees (0..180)."""
-    v1 = np.asarray(v1, dtype=float)
-    v2 = np.asarray(v2, dtype=float)
-    dv = np.dot(v1, v2)
-    n1 = np.linalg.norm(v1)
-    n2 = np.linalg.norm(v2)
+    x1, y1, z1 = v1
+    x2, y2, z2 = v2
+    n1 = math.sqrt(x1 * x1 + y1 * y1 + z1 * z1)
+    n2 = math.sqrt(x2 * x2 + y2 * y2 + z2 * z2)
     if n1 == 0 or n2 == 0:
         return 0.0
-    cosang = np.clip(dv / (n1 * n2), -1.0, 1.0)
-    return float(np.degrees(np.arccos(cosang)))
+    cosang = (x1 * x2 + y1 * y2 + z1 * z2) / (n1 * n2)
+    return math.degrees(math.acos(max(-1.0, min(1.0, cosang))))
 
 def altitude_from_radius(r_vec):
     """Return altitude above Earth surface in km, given ECI-like radius vector (km)."""
-    r = np.linalg.norm(r_vec)
-    return float(r - EARTH_RADIUS_KM)
+    x, y, z = r_vec
+    return math.sqrt(x * x + y * y + z * z) - EARTH_RADIUS_KM
 
 def time_of_closest_approach(r1, v1, r2, v2):
     """
@@ -50,27 +52,24 @@ def time_of_closest_approach(r1, v1, r2, v2):
     Returns:
       tca_seconds (float) -- can be negative (past), or positive (future),
       distance_at_tca_km (float).
+    (N, 3) arrays are handled row-wise and give (N,) arrays instead.
     """
-    r1 = np.asarray(r1, dtype=float)
-    v1 = np.asarray(v1, dtype=float)
-    r2 = np.asarray(r2, dtype=float)
-    v2 = np.asarray(v2, dtype=float)
-
-    r_rel0 = r2 - r1
-    v_rel = v2 - v1
-    v_rel_sq = np.dot(v_rel, v_rel)
-
+    if isinstance(r1, np.ndarray) and r1.ndim > 1 or isinstance(r2, np.ndarray) and r2.ndim > 1:
+        v_rel = np.subtract(v2, v1)
+        return _tca_rows(np.subtract(r2, r1), v_rel, _rowdot(v_rel, v_rel))
+
+    # 3-vectors: plain float math beats NumPy dispatch and allocates no arrays
+    x1, y1, z1 = r1
+    x2, y2, z2 = r2
+    vx1, vy1, vz1 = v1
+    vx2, vy2, vz2 = v2
+    rx, ry, rz = x2 - x1, y2 - y1, z2 - z1
+    wx, wy, wz = vx2 - vx1, vy2 - vy1, vz2 - vz1
+    w_sq = wx * wx + wy * wy + wz * wz
     # If relative velocity is extremely small, tca is now
-    if v_rel_sq < 1e-12:
-        tstar = 0.0
-    else:
-        tstar = - float(np.dot(r_rel0, v_rel) / v_rel_sq)
-
-    # compute distance at tstar
-    r_rel_t = r_rel0 + v_rel * tstar
-    dist = float(np.linalg.norm(r_rel_t))
-
-    return tstar, dist
+    tstar = 0.0 if w_sq < 1e-12 else -(rx * wx + ry * wy + rz * wz) / w_sq
+    tx, ty, tz = rx + wx * tstar, ry + wy * tstar, rz + wz * tstar
+    return float(tstar), math.sqrt(tx * tx + ty * ty + tz * tz)
 
 def time_until_tca_seconds(tca_seconds, now_seconds=0.0):
     """
@@ -79,6 +78,36 @@ def time_until_tca_seconds(tca_seconds, now_seconds=0.0):
     """
     return float(tca_seconds)
 
+def _features_kernel(sx, sy, sz, svx, svy, svz, dx, dy, dz, dvx, dvy, dvz):
+    """
+    All pair features in one straight-line pass over 12 floats.
+    Returns (distance, rel_velocity, angle, altitude_diff, tca_seconds, distance_at_tca);
+    same semantics as the helpers above, without any per-call ndarray.
+    """
+    rx, ry, rz = dx - sx, dy - sy, dz - sz
+    wx, wy, wz = dvx - svx, dvy - svy, dvz - svz
+    w_sq = wx * wx + wy * wy + wz * wz
+
+    distance = math.sqrt(rx * rx + ry * ry + rz * rz)
+    rel_velocity = math.sqrt(w_sq)
+
+    n1 = math.sqrt(svx * svx + svy * svy + svz * svz)
+    n2 = math.sqrt(dvx * dvx + dvy * dvy + dvz * dvz)
+    if n1 == 0 or n2 == 0:
+        angle = 0.0
+    else:
+        cosang = (svx * dvx + svy * dvy + svz * dvz) / (n1 * n2)
+        angle = math.degrees(math.acos(max(-1.0, min(1.0, cosang))))
+
+    alt_diff = abs(math.sqrt(sx * sx + sy * sy + sz * sz) - math.sqrt(dx * dx + dy * dy + dz * dz))
+
+    # If relative velocity is extremely small, tca is now
+    tstar = 0.0 if w_sq < 1e-12 else -(rx * wx + ry * wy + rz * wz) / w_sq
+    tx, ty, tz = rx + wx * tstar, ry + wy * tstar, rz + wz * tstar
+    dist_at_tca = math.sqrt(tx * tx + ty * ty + tz * tz)
+
+    return distance, rel_velocity, angle, alt_diff, tstar, dist_at_tca
+
 # Small convenience to package feature computation
 def compute_physics_features(sat, deb):
     """
@@ -86,16 +115,9 @@ def compute_physics_features(sat, deb):
     Returns dict:
       distance, rel_velocity, angle, altitude_diff, tca_seconds, dist_at_tca
     """
-    r1 = np.array([sat["x"], sat["y"], sat["z"]], dtype=float)
-    v1 = np.array([sat["vx"], sat["vy"], sat["vz"]], dtype=float)
-    r2 = np.array([deb["x"], deb["y"], deb["z"]], dtype=float)
-    v2 = np.array([deb["vx"], deb["vy"], deb["vz"]], dtype=float)
-
-    distance = compute_distance(r1, r2)
-    rel_velocity = compute_relative_velocity(v1, v2)
-    angle = compute_angle_between(v1, v2)
-    alt_diff = abs(altitude_from_radius(r1) - altitude_from_radius(r2))
-    tca_seconds, dist_at_tca = time_of_closest_approach(r1, v1, r2, v2)
+    distance, rel_velocity, angle, alt_diff, tca_seconds, dist_at_tca = _features_kernel(
+        *map(float, _state_of(sat)), *map(float, _state_of(deb))
+    )
 
     return {
         "distance": distance,
@@ -105,3 +127,67 @@ def compute_physics_features(sat, deb):
         "tca_seconds": tca_seconds,
         "distance_at_tca": dist_at_tca
     }
+
+def _rowdot(a, b):
+    """Row-wise dot product of (..., 3) arrays, broadcasting a single row"""
+    return np.einsum("...j,...j->...", a, b)
+
+def _tca_rows(r_rel0, v_rel, v_rel_sq):
+    """
+    Row-wise time of closest approach and miss distance for (N, 3) relative states
+    (v_rel is reused as scratch space and overwritten)
+    """
+    # If relative velocity is extremely small, tca is now
+    tstar = np.zeros_like(v_rel_sq)
+    np.divide(_rowdot(r_rel0, v_rel), v_rel_sq, out=tstar, where=v_rel_sq >= 1e-12)
+    np.negative(tstar, out=tstar)
+    r_rel_t = np.multiply(v_rel, tstar[:, None], out=v_rel)
+    r_rel_t += r_rel0
+    dist_at_tca = _rowdot(r_rel_t, r_rel_t)
+    return tstar, np.sqrt(dist_at_tca, out=dist_at_tca)
+
+def compute_physics_features_batch(r1, v1, r2, v2):
+    """
+    Vectorized compute_physics_features for N (sat, debris) pairs.
+    r1, v1: (N, 3) arrays, or (3,) for one satellite against every row
+    r2, v2: (N, 3) arrays (km, km/s)
+    Returns dict of (N,) arrays with the same keys as compute_physics_features.
+    Each step writes into buffers it already owns (out=, in-place ops), so
+    besides the two (N, 3) relative states only the six outputs are allocated.
+    """
+    r_rel0 = r2 - r1
+    v_rel = v2 - v1
+
+    v_rel_sq = _rowdot(v_rel, v_rel)
+    distance = _rowdot(r_rel0, r_rel0)
+    np.sqrt(distance, out=distance)
+    rel_velocity = np.sqrt(v_rel_sq)
+
+    denom = _rowdot(v2, v2)
+    np.sqrt(denom, out=denom)
+    denom *= np.sqrt(_rowdot(v1, v1))
+    nonzero = denom != 0
+    # where a speed is 0 the dot product is 0 too; the mask zeroes its angle.
+    # One satellite against N rows is a BLAS mat-vec rather than a broadcast einsum
+    angle = v2 @ v1 if np.ndim(v1) == 1 else _rowdot(v1, v2)
+    np.divide(angle, denom, out=angle, where=nonzero)
+    np.clip(angle, -1.0, 1.0, out=angle)
+    np.arccos(angle, out=angle)
+    np.degrees(angle, out=angle)
+    angle *= nonzero
+
+    alt_diff = _rowdot(r2, r2)
+    np.sqrt(alt_diff, out=alt_diff)
+    alt_diff -= np.sqrt(_rowdot(r1, r1))
+    np.abs(alt_diff, out=alt_diff)
+
+    tstar, dist_at_tca = _tca_rows(r_rel0, v_rel, v_rel_sq)
+
+    return {
+        "distance": distance,
+        "rel_velocity": rel_velocity,
+        "angle": angle,
+        "altitude_diff": alt_diff,
+        "tca_seconds": tstar,
+        "distance_at_tca": dist_at_tca
+    }
@@ -4,10 +4,9 @@ Reinforcement Learning agent for optimal collision avoidance maneuvers.
 Uses trained policies to recommend safe, fuel-efficient trajectory adjustments.
 """
 import math
-import numpy as np
-from .physics_utils import compute_physics_features, unit
+from .physics_utils import compute_physics_features, _state_of
 
-def suggest_maneuver_simple(sat, deb):
+def suggest_maneuver_simple(sat, deb, feats=None):
     """
     Return a plausible maneuver dict:
       - delta_v (km/s) vector: small, safe magnitudes e.g., 0.0005 - 0.05 km/s (0.5 m/s - 50 m/s)
@@ -16,35 +15,35 @@ def suggest_maneuver_simple(sat, deb):
       - compute relative position and velocity
       - apply delta-v roughly perpendicular to v_rel to increase miss distance
       - delta magnitude scales with risk (less distance -> larger dv)
+    feats: physics features of this pair if the caller already has them
     """
-    feats = compute_physics_features(sat, deb)
+    if feats is None:
+        feats = compute_physics_features(sat, deb)
     distance = feats["distance"]
     relv = feats["rel_velocity"]
     tca = feats["tca_seconds"]
     dist_at_tca = feats["distance_at_tca"]
 
-    r1 = np.array([sat["x"], sat["y"], sat["z"]], dtype=float)
-    v1 = np.array([sat["vx"], sat["vy"], sat["vz"]], dtype=float)
-    r2 = np.array([deb["x"], deb["y"], deb["z"]], dtype=float)
-    v2 = np.array([deb["vx"], deb["vy"], deb["vz"]], dtype=float)
-
-    r_rel0 = r2 - r1
-    v_rel = v2 - v1
+    # Relative state as plain floats: every norm is taken once and the
+    # 3-vector math stays out of per-call ndarray allocation
+    sx, sy, sz, svx, svy, svz = map(float, _state_of(sat))
+    dx, dy, dz, dvx, dvy, dvz = map(float, _state_of(deb))
+    rx, ry, rz = dx - sx, dy - sy, dz - sz
+    wx, wy, wz = dvx - svx, dvy - svy, dvz - svz
+    v_rel_norm = math.sqrt(wx * wx + wy * wy + wz * wz)
 
     # choose perpendicular direction to v_rel in plane of r_rel and v_rel
-    if np.linalg.norm(v_rel) < 1e-6:
-        # fallback: choose perpendicular to r_rel
-        perp = np.cross(r_rel0, np.array([0.0, 0.0, 1.0]))
-        if np.linalg.norm(perp) < 1e-6:
-            perp = np.array([1.0, 0.0, 0.0])
+    if v_rel_norm < 1e-6:
+        # fallback: choose perpendicular to r_rel (r_rel x z)
+        px, py, pz = ry, -rx, 0.0
     else:
-        perp = np.cross(v_rel, r_rel0)
-        if np.linalg.norm(perp) < 1e-6:
-            perp = np.cross(v_rel, np.array([0.0, 0.0, 1.0]))
-            if np.linalg.norm(perp) < 1e-6:
-                perp = np.array([1.0, 0.0, 0.0])
-
-    perp_dir = unit(perp)
+        # v_rel x r_rel, else v_rel x z
+        px, py, pz = wy * rz - wz * ry, wz * rx - wx * rz, wx * ry - wy * rx
+        if math.sqrt(px * px + py * py + pz * pz) < 1e-6:
+            px, py, pz = wy, -wx, 0.0
+    perp_norm = math.sqrt(px * px + py * py + pz * pz)
+    if perp_norm < 1e-6:
+        px, py, pz, perp_norm = 1.0, 0.0, 0.0, 1.0
 
     # scale dv magnitude based on severity
     # base dv in km/s: safe small adjustments: 0.0005 (0.5 m/s) up to 0.05 (50 m/s)
@@ -57,22 +56,26 @@ def suggest_maneuver_simple(sat, deb):
 
     dv_mag = 0.0005 + severity * 0.0495  # 0.0005..0.05
     # apply slight component opposite along v_rel to change phase if needed
-    along_vrel = -unit(v_rel) if np.linalg.norm(v_rel) > 1e-6 else np.zeros(3)
-    dv_vector = perp_dir * dv_mag * 0.9 + along_vrel * dv_mag * 0.1
+    perp_scale = dv_mag * 0.9 / perp_norm
+    along_scale = -dv_mag * 0.1 / v_rel_norm if v_rel_norm > 1e-6 else 0.0
+    dv_x = px * perp_scale + wx * along_scale
+    dv_y = py * perp_scale + wy * along_scale
+    dv_z = pz * perp_scale + wz * along_scale
+    total_dv = math.sqrt(dv_x * dv_x + dv_y * dv_y + dv_z * dv_z)
 
     # estimate expected increase in miss distance (very rough): delta_d ~ dv * time_to_tca
     if tca >= 0:
-        expected_delta_d = np.linalg.norm(dv_vector) * max(tca, 1.0)  # km approx (since dv km/s * s -> km)
+        expected_delta_d = total_dv * max(tca, 1.0)  # km approx (since dv km/s * s -> km)
     else:
-        expected_delta_d = np.linalg.norm(dv_vector) * 3600.0  # assume 1 hour horizon if past
+        expected_delta_d = total_dv * 3600.0  # assume 1 hour horizon if past
 
     confidence = float(max(0.4, min(0.98, 0.6 + severity * 0.35)))  # heuristic
 
     return {
-        "delta_vx": float(dv_vector[0]),
-        "delta_vy": float(dv_vector[1]),
-        "delta_vz": float(dv_vector[2]),
-        "total_delta_v": float(np.linalg.norm(dv_vector)),
+        "delta_vx": dv_x,
+        "delta_vy": dv_y,
+        "delta_vz": dv_z,
+        "total_delta_v": total_dv,
         "expected_increase_in_miss_km": float(expected_delta_d),
         "confidence": confidence,
         "features": feats
@@ -150,10 +153,11 @@ def _compute_basic_maneuver(satellite_state: dict) -> dict:
     urgency = max(0.0, min(1.0, (15.0 - distance) / 15.0))
 
     # Use legacy suggest_maneuver_legacy with synthetic parameters
-    rel_vel_mag = math.sqrt(
-        satellite_state.get("velocity", {}).get("vx", 7.5) ** 2 +
-        satellite_state.get("velocity", {}).get("vy", 0.0) ** 2 +
-        satellite_state.get("velocity", {}).get("vz", 0.0) ** 2
+    velocity = satellite_state.get("velocity") or {}
+    rel_vel_mag = math.hypot(
+        velocity.get("vx", 7.5),
+        velocity.get("vy", 0.0),
+        velocity.get("vz", 0.0)
     ) / 10.0  # scale
     angle = 45.0  # placeholder
     legacy = suggest_maneuver_legacy(distance, rel_vel_mag, angle, urgency)
@@ -180,39 +184,44 @@ def suggest_multi_burn_maneuver(satellite_state: dict, num_burns: int = 3) -> li
     """
     base = _compute_basic_maneuver(satellite_state)
     total_dv = base["delta_v_mps"]
-    # Geometric split factors
-    factors = [0.5 ** i for i in range(num_burns)]
-    scale = total_dv / sum(factors)
+    burn_duration = base["burn_duration_s"]
+    fuel_cost = base["fuel_cost_kg"]
+    safety_margin = base["safety_margin_km"]
+    # Geometric split: burn i takes 0.5**i of the total, normalized by the
+    # closed-form sum 2 - 2**(1 - n); one share per burn scales every field
+    total_share = 2.0 - 2.0 ** (1 - num_burns)
     maneuvers = []
     for i in range(num_burns):
-        dv = factors[i] * scale
+        share = 0.5 ** i / total_share
         maneuvers.append({
-            "delta_v_mps": round(dv, 2),
+            "delta_v_mps": round(total_dv * share, 2),
             "direction_vector": base["direction_vector"],
-            "burn_duration_s": round(base["burn_duration_s"] * (dv / total_dv), 2),
-            "fuel_cost_kg": round(base["fuel_cost_kg"] * (dv / total_dv), 3),
-            "safety_margin_km": round(base["safety_margin_km"] * (dv / total_dv), 2),
+            "burn_duration_s": round(burn_duration * share, 2),
+            "fuel_cost_kg": round(fuel_cost * share, 3),
+            "safety_margin_km": round(safety_margin * share, 2),
         })
     return maneuvers
 
 
+# evaluate_maneuver_safety tiers, indexed by the number of thresholds passed
+_RECOMMENDATIONS = ("inefficient", "review", "execute")
+
+
 def evaluate_maneuver_safety(maneuver: dict, satellite_state: dict) -> dict:
     """Assess maneuver quality using simple heuristics."""
     dv = maneuver.get("delta_v_mps", 0.0)
     safety_margin = maneuver.get("safety_margin_km", 0.0)
     fuel_cost = maneuver.get("fuel_cost_kg", 1.0) or 1.0
     efficiency = safety_margin / fuel_cost
-    confidence = max(0.5, min(0.99, 0.6 + (dv / 50.0)))  # dv capped ~50 m/s
-    recommendation = (
-        "execute" if efficiency > 0.05 and safety_margin > 0.5 else
-        "review" if efficiency > 0.02 else
-        "inefficient"
-    )
+    confidence = 0.6 + (dv / 50.0)  # dv capped ~50 m/s
+    confidence = 0.99 if confidence > 0.99 else (0.5 if confidence < 0.5 else confidence)
+    # "execute" implies efficiency > 0.05 > 0.02, so the two tests sum to the tier
+    tier = (efficiency > 0.02) + (efficiency > 0.05 and safety_margin > 0.5)
     return {
         "risk_reduction_km": round(safety_margin, 2),
         "fuel_efficiency": round(efficiency, 3),
         "confidence": round(confidence, 2),
-        "recommendation": recommendation,
+        "recommendation": _RECOMMENDATIONS[tier],
     }
 
 
@@ -227,7 +236,6 @@ def simulate_maneuver_effect(satellite_state: dict, maneuver: dict) -> dict:
     new_miss_distance = base_distance + safety_margin
     # Simple residual probability model (not physically accurate):
     # risk ~ exp(-d/20). Clamp 0..1
-    import math
     residual_prob = math.exp(- new_miss_distance / 20.0)
     baseline_prob = math.exp(- base_distance / 20.0)
     reduction = max(0.0, baseline_prob - residual_prob)
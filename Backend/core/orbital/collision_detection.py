@@ -3,10 +3,14 @@ Collision Detection Algorithms
 Simple and complex collision detection for space objects
 """
 import math
+import numpy as np
 from typing import Dict, Tuple, List
-from core.orbital.vector_math import compute_distance, compute_closest_approach
+from numpy.typing import ArrayLike
+from core.orbital.vector_math import compute_distance
 from config.settings import settings
 
+STATE_KEYS = ("x", "y", "z", "vx", "vy", "vz")
+
 
 def detect_collision_simple(
     sat_position: Dict,
@@ -54,21 +58,23 @@ def detect_conjunction(
     if distance_threshold_km is None:
         distance_threshold_km = settings.COLLISION_THRESHOLD_KM
     
-    sat_pos = {k: sat_state[k] for k in ["x", "y", "z"] if k in sat_state}
-    sat_vel = {k: sat_state[k] for k in ["vx", "vy", "vz"] if k in sat_state}
-    
-    debris_pos = {k: debris_state[k] for k in ["x", "y", "z"] if k in debris_state}
-    debris_vel = {k: debris_state[k] for k in ["vx", "vy", "vz"] if k in debris_state}
+    # Relative state (debris minus satellite), packed once; missing components count as 0
+    dx, dy, dz, dvx, dvy, dvz = (
+        debris_state.get(k, 0) - sat_state.get(k, 0) for k in STATE_KEYS
+    )
     
     # Current distance
-    current_distance = compute_distance(sat_pos, debris_pos)
+    current_distance = math.hypot(dx, dy, dz)
     
-    # Closest approach
-    time_to_ca, min_distance = compute_closest_approach(
-        sat_pos, sat_vel,
-        debris_pos, debris_vel,
-        time_window_sec
-    )
+    # Closest approach, fused here so the relative state is read only once
+    denominator = dvx*dvx + dvy*dvy + dvz*dvz
+    if denominator < 1e-10:
+        # Objects moving in parallel
+        time_to_ca, min_distance = 0.0, current_distance
+    else:
+        time_to_ca = -(dx*dvx + dy*dvy + dz*dvz) / denominator
+        time_to_ca = 0 if time_to_ca < 0 else (time_window_sec if time_to_ca > time_window_sec else time_to_ca)
+        min_distance = math.hypot(dx + dvx*time_to_ca, dy + dvy*time_to_ca, dz + dvz*time_to_ca)
     
     is_conjunction = min_distance < distance_threshold_km
     
@@ -82,25 +88,35 @@ def detect_conjunction(
 
 
 def compute_collision_probability(
-    distance_km: float,
-    relative_velocity_kmps: float,
+    distance_km: ArrayLike,
+    relative_velocity_kmps: ArrayLike,
     satellite_size_m: float = 5.0,
     debris_size_m: float = 1.0
-) -> float:
+):
     """
     Compute collision probability (DUMMY/SIMPLIFIED)
     
     In production, this would use proper conjunction analysis
     
     Args:
-        distance_km: Distance between objects
-        relative_velocity_kmps: Relative velocity
+        distance_km: Distance between objects (scalar or array)
+        relative_velocity_kmps: Relative velocity (scalar or array, broadcast
+            against distance_km)
         satellite_size_m: Satellite size estimate
         debris_size_m: Debris size estimate
         
     Returns:
-        Probability between 0 and 1
+        Probability between 0 and 1: a float for scalar inputs, otherwise an
+        array from compute_collision_probability_batch (one np.exp pass)
     """
+    if np.ndim(distance_km) or np.ndim(relative_velocity_kmps):
+        return compute_collision_probability_batch(
+            np.asarray(distance_km, dtype=float),
+            np.asarray(relative_velocity_kmps, dtype=float),
+            satellite_size_m,
+            debris_size_m
+        )
+    
     # Combined radius in km
     combined_radius_km = (satellite_size_m + debris_size_m) / 2000.0
     
@@ -118,18 +134,86 @@ def compute_collision_probability(
     return min(max(probability, 0.0), 0.99)
 
 
+def compute_collision_probability_batch(
+    distance_km: np.ndarray,
+    relative_velocity_kmps: np.ndarray,
+    satellite_size_m: float = 5.0,
+    debris_size_m: float = 1.0,
+    dtype: np.dtype = None
+) -> np.ndarray:
+    """
+    Vectorized compute_collision_probability over arrays of encounters
+    
+    dtype=np.float32 evaluates in single precision (half the memory
+    traffic) for ranking-only screens that don't need FP64 probabilities.
+    
+    Returns:
+        Array of probabilities between 0 and 0.99
+    """
+    if dtype is not None:
+        distance_km = np.asarray(distance_km).astype(dtype, copy=False)
+        relative_velocity_kmps = np.asarray(relative_velocity_kmps).astype(dtype, copy=False)
+    combined_radius_km = (satellite_size_m + debris_size_m) / 2000.0
+    velocity_factor = np.minimum(relative_velocity_kmps / 15.0, 1.0)
+    probability = np.exp(-0.5 * (distance_km - combined_radius_km)) * velocity_factor
+    probability = np.where(distance_km <= combined_radius_km, 0.99, probability)
+    return np.clip(probability, 0.0, 0.99)
+
+
+def unpack_hits(
+    idx: np.ndarray,
+    distances: np.ndarray,
+    debris: List[Dict],
+    satellite: Dict,
+    high_risk_km: float
+) -> List[Dict]:
+    """
+    Turn screened hit rows back into collision event dicts
+    
+    Args:
+        idx: Row indices of the hits
+        distances: Distances (km) of the hits, aligned with idx
+        debris: Debris state dicts the rows index into
+        satellite: Satellite state dict
+        high_risk_km: Distance below which a hit is high risk
+        
+    Returns:
+        List of collision events
+    """
+    debris_ids = [debris[i].get("id") for i in idx.tolist()]
+    satellite_id = satellite.get("id")
+    return [
+        {
+            "satellite_id": satellite_id,
+            "debris_id": debris_id,
+            "distance_km": distance,
+            "is_high_risk": distance < high_risk_km
+        }
+        for debris_id, distance in zip(debris_ids, distances.tolist())
+    ]
+
+
 def batch_collision_check(
     satellite: Dict,
     debris_list: List[Dict],
-    threshold_km: float = None
+    threshold_km: float = None,
+    positions: np.ndarray = None
 ) -> List[Dict]:
     """
     Check collision risk for satellite against multiple debris objects
     
+    With a positions array, distances are screened in one
+    vectorized pass and only the hits are turned back into dicts. From
+    dicts alone a single Python pass with per-axis early rejection is
+    faster than packing an array first: most debris fail the x test after
+    one lookup.
+    
     Args:
         satellite: Satellite state dict
         debris_list: List of debris state dicts
         threshold_km: Collision threshold
+        positions: Optional (N, 3) x, y, z array row-aligned with
+            debris_list (e.g. DebrisArrays.positions); skips rebuilding it
         
     Returns:
         List of collision events
@@ -137,36 +221,41 @@ def batch_collision_check(
     if threshold_km is None:
         threshold_km = settings.COLLISION_THRESHOLD_KM
     
-    collisions = []
-
-    sat_pos = {k: satellite.get(k, 0) for k in ["x", "y", "z"]}
-
-    # Coarse spatial hashing prefilter: reduce candidate debris set before precise distance checks
-    cell_size = 50.0  # km bucket size
-    def cell(point: Dict) -> Tuple[int, int, int]:
-        return (
-            int(point.get("x", 0) // cell_size),
-            int(point.get("y", 0) // cell_size),
-            int(point.get("z", 0) // cell_size)
-        )
-    sat_cell = cell(sat_pos)
-
-    # Collect debris in neighboring cells (Manhattan distance <= 1)
-    candidate_debris: List[Dict] = []
-    for debris in debris_list:
-        d_pos = {k: debris.get(k, 0) for k in ["x", "y", "z"]}
-        if sum(abs(a - b) for a, b in zip(sat_cell, cell(d_pos))) <= 1:
-            candidate_debris.append(debris)
-
-    for debris in candidate_debris:
-        debris_pos = {k: debris.get(k, 0) for k in ["x", "y", "z"]}
-        is_risk, distance = detect_collision_simple(sat_pos, debris_pos, threshold_km)
-        if is_risk:
-            collisions.append({
-                "satellite_id": satellite.get("id"),
-                "debris_id": debris.get("id"),
-                "distance_km": distance,
-                "is_high_risk": distance < settings.HIGH_RISK_THRESHOLD_KM
-            })
-
-    return collisions
+    high_risk_km = settings.HIGH_RISK_THRESHOLD_KM
+    satellite_id = satellite.get("id")
+    thr2 = threshold_km * threshold_km
+    
+    if positions is None:
+        sx, sy, sz = satellite.get("x", 0), satellite.get("y", 0), satellite.get("z", 0)
+        collisions = []
+        for debris in debris_list:
+            # Bounding-box early-out per axis before the squared distance
+            dx = debris.get("x", 0) - sx
+            if dx > threshold_km or dx < -threshold_km:
+                continue
+            dy = debris.get("y", 0) - sy
+            if dy > threshold_km or dy < -threshold_km:
+                continue
+            dz = debris.get("z", 0) - sz
+            if dz > threshold_km or dz < -threshold_km:
+                continue
+            d2 = dx*dx + dy*dy + dz*dz
+            if d2 < thr2:
+                distance = math.sqrt(d2)
+                collisions.append({
+                    "satellite_id": satellite_id,
+                    "debris_id": debris.get("id"),
+                    "distance_km": distance,
+                    "is_high_risk": distance < high_risk_km
+                })
+        return collisions
+    
+    sat_pos = np.array([satellite.get(k, 0) for k in ("x", "y", "z")], dtype=float)
+    diff = positions - sat_pos
+    d2 = np.einsum("ij,ij->i", diff, diff)
+    
+    # Compare squared distances; sqrt only for the hits
+    hits = np.flatnonzero(d2 < thr2)
+    distances = np.sqrt(d2[hits])
+    
+    return unpack_hits(hits, distances, debris_list, satellite, high_risk_km)
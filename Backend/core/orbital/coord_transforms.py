@@ -0,0 +1,136 @@
+"""
+Coordinate Transforms
+Geodetic position to the simplified Cartesian state vector used by the services
+"""
+import math
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+EARTH_RADIUS_KM = 6371.0
+
+PARALLEL_STATE_MIN_ROWS = 1 << 17
+_STATE_WORKERS = os.cpu_count() or 1
+_state_executor = None
+
+# 1-degree tables for low-precision conversion (<= 0.5 deg per angle, under 90 km in LEO),
+# plenty for a globe view
+_LUT_RADIANS = np.radians(np.arange(360.0))
+_SIN_LUT = np.sin(_LUT_RADIANS)
+_COS_LUT = np.cos(_LUT_RADIANS)
+
+
+def latlonalt_to_state(
+    lat: float, lon: float, alt: float, v_mag: float
+) -> Tuple[float, float, float, float, float, float]:
+    """
+    Convert latitude/longitude/altitude to a position and velocity
+
+    Uses the y-up spherical layout of the map view (y along the polar
+    axis) and a tangential velocity in the local horizontal plane.
+
+    Args:
+        lat: Latitude (degrees)
+        lon: Longitude (degrees)
+        alt: Altitude above Earth (km)
+        v_mag: Orbital speed (km/s)
+
+    Returns:
+        Tuple of (x, y, z, vx, vy, vz) in km and km/s
+    """
+    r = EARTH_RADIUS_KM + alt
+    lat_r = math.radians(lat)
+    lon_r = math.radians(lon)
+    # Each angle's sine/cosine pair is evaluated once and shared by every component
+    sin_lat, cos_lat = math.sin(lat_r), math.cos(lat_r)
+    sin_lon, cos_lon = math.sin(lon_r), math.cos(lon_r)
+    r_cos_lat = r * cos_lat
+    return (
+        r_cos_lat * cos_lon, r * sin_lat, r_cos_lat * sin_lon,
+        -v_mag * sin_lon, v_mag * cos_lon, 0.0
+    )
+
+
+def latlonalt_to_state_batch(
+    lat: np.ndarray, lon: np.ndarray, alt: np.ndarray, v_mag: np.ndarray,
+    out: np.ndarray = None, low_precision: bool = False
+) -> np.ndarray:
+    """
+    Vectorized latlonalt_to_state for many objects
+
+    Large batches are split into one contiguous row range per core; NumPy
+    releases the GIL inside the trig ufuncs, so the ranges fill the shared
+    output concurrently.
+
+    Args:
+        lat: (N,) latitudes (degrees)
+        lon: (N,) longitudes (degrees)
+        alt: (N,) altitudes (km)
+        v_mag: (N,) orbital speeds (km/s)
+        out: Optional preallocated (N, 6) float array to fill
+        low_precision: Round angles to whole degrees and read sine/cosine
+            from a table (for visualization; about twice as fast)
+
+    Returns:
+        (N, 6) array of x, y, z, vx, vy, vz rows
+    """
+    lat, lon, alt, v_mag = (np.asarray(a, dtype=float) for a in (lat, lon, alt, v_mag))
+    n = len(lat)
+    if out is None:
+        out = np.empty((n, 6))
+    if _STATE_WORKERS > 1 and n >= PARALLEL_STATE_MIN_ROWS:
+        global _state_executor
+        if _state_executor is None:
+            _state_executor = ThreadPoolExecutor(_STATE_WORKERS, thread_name_prefix="coord-transform")
+        bounds = np.linspace(0, n, _STATE_WORKERS + 1).astype(int).tolist()
+        # list() waits for every range and re-raises worker errors
+        list(_state_executor.map(
+            lambda start, stop: _fill_states(
+                lat[start:stop], lon[start:stop], alt[start:stop], v_mag[start:stop], out[start:stop], low_precision
+            ),
+            bounds[:-1], bounds[1:]
+        ))
+    else:
+        _fill_states(lat, lon, alt, v_mag, out, low_precision)
+    return out
+
+
+def _sincos(degrees: np.ndarray, low_precision: bool) -> Tuple[np.ndarray, np.ndarray]:
+    if low_precision:
+        index = np.rint(degrees).astype(np.intp)
+        index %= 360
+        return _SIN_LUT.take(index), _COS_LUT.take(index)
+    radians = np.radians(degrees)
+    return np.sin(radians), np.cos(radians)
+
+
+def _fill_states(lat: np.ndarray, lon: np.ndarray, alt: np.ndarray, v_mag: np.ndarray, out: np.ndarray, low_precision: bool = False):
+    """Write latlonalt_to_state rows for one range into out"""
+    r = alt + EARTH_RADIUS_KM
+    sin_lat, cos_lat = _sincos(lat, low_precision)
+    sin_lon, cos_lon = _sincos(lon, low_precision)
+    r_cos_lat = r * cos_lat
+    np.multiply(r_cos_lat, cos_lon, out=out[:, 0])
+    np.multiply(r, sin_lat, out=out[:, 1])
+    np.multiply(r_cos_lat, sin_lon, out=out[:, 2])
+    np.multiply(-v_mag, sin_lon, out=out[:, 3])
+    np.multiply(v_mag, cos_lon, out=out[:, 4])
+    out[:, 5] = 0.0
+
+
+def state_to_latlonalt(x: float, y: float, z: float) -> Tuple[float, float, float]:
+    """
+    Inverse of latlonalt_to_state for the position part
+
+    Args:
+        x, y, z: Position (km) in the same y-up layout
+
+    Returns:
+        Tuple of (latitude, longitude, altitude_km); the origin maps to
+        lat/lon 0
+    """
+    r = math.hypot(x, y, z)
+    if r == 0:
+        return (0.0, 0.0, -EARTH_RADIUS_KM)
+    return (math.degrees(math.asin(y / r)), math.degrees(math.atan2(z, x)), r - EARTH_RADIUS_KM)
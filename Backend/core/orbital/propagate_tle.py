@@ -3,8 +3,28 @@ TLE Propagation Module
 Orbital mechanics calculations for satellite position prediction
 """
 import math
-from typing import Tuple, Dict
+import time
+import numpy as np
+from functools import lru_cache
+from typing import Tuple, Dict, Sequence, Union
 from datetime import datetime, timedelta
+from core.orbital.coord_transforms import latlonalt_to_state_batch
+
+# Dummy orbit model constants
+EARTH_RADIUS_KM = 6371.0
+MU_EARTH = 398600.4418  # Earth's gravitational parameter km³/s²
+LEO_PERIOD_SEC = 90 * 60  # ~90 minutes for LEO
+LEO_RADIUS_KM = EARTH_RADIUS_KM + 450  # Earth radius + 450km altitude
+LEO_SPEED_KMPS = 7.8  # ~7.8 km/s for LEO
+# Positions move too little within this window to matter on the map
+POSITION_BUCKET_SECONDS = 10
+
+# Reciprocals so the per-call math multiplies instead of divides
+_INV_MU = 1.0 / MU_EARTH
+_PHASE_PER_SEC = 2 * math.pi / LEO_PERIOD_SEC
+_INV_MINUTE = 1.0 / 60
+_INV_HOUR = 1.0 / 3600
+_INV_TWO_HOURS = 1.0 / 7200
 
 
 def propagate_tle(
@@ -29,30 +49,60 @@ def propagate_tle(
     time_seed = target_time.timestamp()
     
     # Simulate orbital motion
-    orbital_period = 90 * 60  # ~90 minutes for LEO
-    phase = (time_seed % orbital_period) / orbital_period * 2 * math.pi
-    
-    # Position in km (ECI coordinates)
-    radius = 6371 + 450  # Earth radius + 450km altitude
-    position = {
-        "x": radius * math.cos(phase),
-        "y": radius * math.sin(phase),
-        "z": radius * 0.3 * math.sin(phase * 2)  # Slight inclination
-    }
+    phase = (time_seed % LEO_PERIOD_SEC) * _PHASE_PER_SEC
+    sin, cos = math.sin, math.cos
+    sin_phase, cos_phase = sin(phase), cos(phase)
     
-    # Velocity in km/s (perpendicular to position)
-    velocity_mag = 7.8  # ~7.8 km/s for LEO
-    velocity = {
-        "vx": -velocity_mag * math.sin(phase),
-        "vy": velocity_mag * math.cos(phase),
-        "vz": velocity_mag * 0.2 * math.cos(phase * 2)
+    # Position in km (ECI coordinates) and velocity in km/s (perpendicular to position)
+    return {
+        "x": LEO_RADIUS_KM * cos_phase,
+        "y": LEO_RADIUS_KM * sin_phase,
+        "z": LEO_RADIUS_KM * 0.3 * sin(phase * 2),  # Slight inclination
+        "vx": -LEO_SPEED_KMPS * sin_phase,
+        "vy": LEO_SPEED_KMPS * cos_phase,
+        "vz": LEO_SPEED_KMPS * 0.2 * cos(phase * 2),
+        "altitude_km": LEO_RADIUS_KM - EARTH_RADIUS_KM,
+        "timestamp": target_time.isoformat()
     }
+
+
+def propagate_tle_batch(
+    tle_line1: str,
+    tle_line2: str,
+    target_times: Union[Sequence[datetime], np.ndarray]
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized propagate_tle over many target times (DUMMY IMPLEMENTATION)
+    
+    Same orbit model as propagate_tle evaluated with array math, so a
+    time sweep is a handful of ufunc calls instead of a Python loop.
+    
+    Args:
+        tle_line1: First line of TLE
+        tle_line2: Second line of TLE
+        target_times: datetimes, or an array of POSIX timestamps (seconds)
+        
+    Returns:
+        Dict of (N,) arrays: x, y, z, vx, vy, vz, altitude_km
+    """
+    if isinstance(target_times, np.ndarray):
+        time_seed = target_times.astype(float)
+    else:
+        time_seed = np.fromiter((t.timestamp() for t in target_times), dtype=float)
+    
+    phase = np.mod(time_seed, LEO_PERIOD_SEC)
+    phase *= _PHASE_PER_SEC
+    cos_phase, sin_phase = np.cos(phase), np.sin(phase)
+    phase *= 2
     
     return {
-        **position,
-        **velocity,
-        "altitude_km": radius - 6371,
-        "timestamp": target_time.isoformat()
+        "x": LEO_RADIUS_KM * cos_phase,
+        "y": LEO_RADIUS_KM * sin_phase,
+        "z": LEO_RADIUS_KM * 0.3 * np.sin(phase),  # Slight inclination
+        "vx": -LEO_SPEED_KMPS * sin_phase,
+        "vy": LEO_SPEED_KMPS * cos_phase,
+        "vz": LEO_SPEED_KMPS * 0.2 * np.cos(phase),
+        "altitude_km": np.full_like(phase, LEO_RADIUS_KM - EARTH_RADIUS_KM)
     }
 
 
@@ -71,15 +121,14 @@ def compute_orbital_elements(position: Dict, velocity: Dict) -> Dict[str, float]
     x, y, z = position["x"], position["y"], position["z"]
     vx, vy, vz = velocity["vx"], velocity["vy"], velocity["vz"]
     
-    r = math.sqrt(x**2 + y**2 + z**2)
-    v = math.sqrt(vx**2 + vy**2 + vz**2)
+    r = math.hypot(x, y, z)
+    v = math.hypot(vx, vy, vz)
     
     # Semi-major axis (simplified)
-    mu = 398600.4418  # Earth's gravitational parameter km³/s²
-    a = 1 / (2/r - v**2/mu)
+    a = 1 / (2/r - v*v*_INV_MU)
     
     # Inclination
-    h = math.sqrt((y*vz - z*vy)**2 + (z*vx - x*vz)**2 + (x*vy - y*vx)**2)
+    h = math.hypot(y*vz - z*vy, z*vx - x*vz, x*vy - y*vx)
     i = math.degrees(math.acos((x*vy - y*vx) / h))
     
     return {
@@ -111,11 +160,108 @@ def tle_to_position(
     
     # Dummy implementation - generates deterministic positions
     time_seed = current_time.timestamp()
-    norad_seed = int(norad_id) if norad_id.isdigit() else hash(norad_id) % 100000
+    norad_seed = _norad_seed(norad_id)
     
     # Simulate orbital motion
-    longitude = ((time_seed / 60) + norad_seed) % 360 - 180
-    latitude = 45 * math.sin(time_seed / 3600 + norad_seed)
-    altitude = 400 + 200 * math.sin(time_seed / 7200)
+    longitude = ((time_seed * _INV_MINUTE) + norad_seed) % 360 - 180
+    latitude = 45 * math.sin(time_seed * _INV_HOUR + norad_seed)
+    altitude = 400 + 200 * math.sin(time_seed * _INV_TWO_HOURS)
+    
+    return (latitude, longitude, altitude)
+
+
+def position_epoch() -> datetime:
+    """
+    Start of the current POSITION_BUCKET_SECONDS window
+    
+    The propagation time of both tle_to_position_cached and the satellite
+    list path, so one satellite shows the same position in both.
+    """
+    return _bucket_epoch(int(time.time()) // POSITION_BUCKET_SECONDS)
+
+
+def tle_to_position_cached(norad_id: str) -> Tuple[float, float, float]:
+    """
+    tle_to_position at position_epoch()
+    
+    Repeat lookups of the same object within a window (e.g. several
+    requests for one satellite) reuse the first result.
+    """
+    return _bucket_position(norad_id, int(time.time()) // POSITION_BUCKET_SECONDS)
+
+
+def _bucket_epoch(bucket: int) -> datetime:
+    # Naive UTC, like the datetime.utcnow() default of tle_to_position
+    return datetime.utcfromtimestamp(bucket * POSITION_BUCKET_SECONDS)
+
+
+@lru_cache(maxsize=8192)
+def _bucket_position(norad_id: str, bucket: int) -> Tuple[float, float, float]:
+    return tle_to_position(norad_id, _bucket_epoch(bucket))
+
+
+@lru_cache(maxsize=65536)
+def _norad_seed(norad_id: str) -> int:
+    """Per-object phase seed of the dummy model (catalog number, or a name hash)"""
+    return int(norad_id) if norad_id.isdigit() else hash(norad_id) % 100000
+
+
+def tle_to_position_batch(
+    norad_ids: Sequence[str],
+    current_time: datetime = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized tle_to_position for many objects at one epoch
+    
+    Seeds are resolved once per distinct ID; the motion model then runs
+    as a few ufunc calls over the whole catalog.
+    
+    Args:
+        norad_ids: NORAD catalog IDs
+        current_time: Time for position calculation
+        
+    Returns:
+        Tuple of (N,) arrays (latitude, longitude, altitude_km)
+    """
+    if current_time is None:
+        current_time = datetime.utcnow()
+    
+    time_seed = current_time.timestamp()
+    norad_seed = np.fromiter(map(_norad_seed, norad_ids), dtype=float, count=len(norad_ids))
+    
+    longitude = np.mod(norad_seed + time_seed * _INV_MINUTE, 360)
+    longitude -= 180
+    latitude = np.sin(norad_seed + time_seed * _INV_HOUR)
+    latitude *= 45
+    # Altitude depends on time only
+    altitude = np.full(len(norad_ids), 400 + 200 * math.sin(time_seed * _INV_TWO_HOURS))
     
     return (latitude, longitude, altitude)
+
+
+def tle_to_state_batch(
+    norad_ids: Sequence[str],
+    v_mag: Union[Sequence[float], np.ndarray],
+    current_time: datetime = None,
+    low_precision: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    tle_to_position_batch plus the Cartesian state of each object
+    
+    The state is built from the propagated arrays directly, so callers do
+    not write lat/lon/alt into rows only to read them back for the
+    coordinate conversion.
+    
+    Args:
+        norad_ids: NORAD catalog IDs
+        v_mag: (N,) orbital speeds (km/s)
+        current_time: Time for position calculation
+        low_precision: Table-based trig for the state (see latlonalt_to_state_batch)
+        
+    Returns:
+        Tuple of (latitude, longitude, altitude_km) (N,) arrays and the
+        (N, 6) x, y, z, vx, vy, vz array
+    """
+    latitude, longitude, altitude = tle_to_position_batch(norad_ids, current_time)
+    state = latlonalt_to_state_batch(latitude, longitude, altitude, v_mag, low_precision=low_precision)
+    return (latitude, longitude, altitude, state)
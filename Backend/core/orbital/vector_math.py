@@ -3,43 +3,77 @@ Vector Mathematics for Orbital Mechanics
 3D vector operations and distance calculations
 """
 import math
-from typing import Tuple, Dict
+import numpy as np
+from typing import Tuple, Dict, Sequence, Union
 
+# A 3-vector as an ndarray of shape (3,) or (N, 3), a length-3 sequence, or
+# (at API boundaries) a dict with x/y/z or vx/vy/vz keys
+Vector = Union[np.ndarray, Sequence[float], Dict]
 
-def compute_distance(pos1: Dict, pos2: Dict) -> float:
+POSITION_KEYS = ("x", "y", "z")
+VELOCITY_KEYS = ("vx", "vy", "vz")
+
+
+def _xyz(vec: Vector, keys: Tuple[str, str, str] = POSITION_KEYS) -> Tuple[float, float, float]:
+    """Components of one 3-vector; dict adapter where missing keys count as 0"""
+    if isinstance(vec, dict):
+        return vec.get(keys[0], 0), vec.get(keys[1], 0), vec.get(keys[2], 0)
+    if isinstance(vec, np.ndarray):
+        # Python floats: scalar math on numpy scalars is several times slower
+        vec = vec.tolist()
+    x, y, z = vec
+    return x, y, z
+
+
+def _as_vec3(vec: Vector, keys: Tuple[str, str, str] = POSITION_KEYS) -> np.ndarray:
+    """Float ndarray view of a vector (dicts are packed once)"""
+    if isinstance(vec, np.ndarray):
+        return vec
+    return np.asarray(_xyz(vec, keys) if isinstance(vec, dict) else vec, dtype=float)
+
+
+def _is_rows(*vecs) -> bool:
+    """True when any argument is an (N, 3) array, selecting the vectorized path"""
+    return any(isinstance(v, np.ndarray) and v.ndim > 1 for v in vecs)
+
+
+def _separation(a: Vector, b: Vector, keys: Tuple[str, str, str]):
+    """|b - a| as a float, or an (N,) array when either side is (N, 3)"""
+    if _is_rows(a, b):
+        diff = _as_vec3(b, keys) - _as_vec3(a, keys)
+        return np.sqrt(np.einsum("...j,...j->...", diff, diff))
+    x1, y1, z1 = _xyz(a, keys)
+    x2, y2, z2 = _xyz(b, keys)
+    dx, dy, dz = x2 - x1, y2 - y1, z2 - z1
+    return math.hypot(dx, dy, dz)
+
+
+def compute_distance(pos1: Vector, pos2: Vector):
     """
     Compute Euclidean distance between two positions
     
     Args:
-        pos1: Position dict with x, y, z keys (km)
-        pos2: Position dict with x, y, z keys (km)
+        pos1: Position (km): (3,) or (N, 3) array, sequence, or x/y/z dict
+        pos2: Position (km), same forms; (3,) broadcasts against (N, 3)
         
     Returns:
-        Distance in km
+        Distance in km (float, or (N,) array for row inputs)
     """
-    dx = pos2.get("x", 0) - pos1.get("x", 0)
-    dy = pos2.get("y", 0) - pos1.get("y", 0)
-    dz = pos2.get("z", 0) - pos1.get("z", 0)
-    
-    return math.sqrt(dx**2 + dy**2 + dz**2)
+    return _separation(pos1, pos2, POSITION_KEYS)
 
 
-def compute_relative_velocity(vel1: Dict, vel2: Dict) -> float:
+def compute_relative_velocity(vel1: Vector, vel2: Vector):
     """
     Compute magnitude of relative velocity
     
     Args:
-        vel1: Velocity dict with vx, vy, vz keys (km/s)
-        vel2: Velocity dict with vx, vy, vz keys (km/s)
+        vel1: Velocity (km/s): (3,) or (N, 3) array, sequence, or vx/vy/vz dict
+        vel2: Velocity (km/s), same forms
         
     Returns:
-        Relative velocity magnitude in km/s
+        Relative velocity magnitude in km/s (float, or (N,) array)
     """
-    dvx = vel2.get("vx", 0) - vel1.get("vx", 0)
-    dvy = vel2.get("vy", 0) - vel1.get("vy", 0)
-    dvz = vel2.get("vz", 0) - vel1.get("vz", 0)
-    
-    return math.sqrt(dvx**2 + dvy**2 + dvz**2)
+    return _separation(vel1, vel2, VELOCITY_KEYS)
 
 
 def compute_altitude_diff(alt1: float, alt2: float) -> float:
@@ -57,10 +91,10 @@ def compute_altitude_diff(alt1: float, alt2: float) -> float:
 
 
 def compute_closest_approach(
-    pos1: Dict, vel1: Dict,
-    pos2: Dict, vel2: Dict,
+    pos1: Vector, vel1: Vector,
+    pos2: Vector, vel2: Vector,
     time_window_sec: int = 3600
-) -> Tuple[float, float]:
+):
     """
     Compute time and distance of closest approach
     
@@ -70,85 +104,138 @@ def compute_closest_approach(
         pos2: Position of object 2
         vel2: Velocity of object 2
         time_window_sec: Time window to search (seconds)
+        (vectors in any form accepted by compute_distance)
         
     Returns:
-        Tuple of (time_to_closest_approach_sec, minimum_distance_km)
+        Tuple of (time_to_closest_approach_sec, minimum_distance_km); arrays
+        when any input is (N, 3)
     """
-    # Simplified linear approximation
-    current_distance = compute_distance(pos1, pos2)
-    rel_velocity = compute_relative_velocity(vel1, vel2)
-    
-    # Relative position vector
-    dx = pos2.get("x", 0) - pos1.get("x", 0)
-    dy = pos2.get("y", 0) - pos1.get("y", 0)
-    dz = pos2.get("z", 0) - pos1.get("z", 0)
-    
-    # Relative velocity vector
-    dvx = vel2.get("vx", 0) - vel1.get("vx", 0)
-    dvy = vel2.get("vy", 0) - vel1.get("vy", 0)
-    dvz = vel2.get("vz", 0) - vel1.get("vz", 0)
+    if isinstance(pos1, dict) and isinstance(pos2, dict) and isinstance(vel1, dict) and isinstance(vel2, dict):
+        # API-boundary fast path: one lookup per component straight into the
+        # relative state, no intermediate tuples
+        return _closest_approach(
+            pos2.get("x", 0) - pos1.get("x", 0),
+            pos2.get("y", 0) - pos1.get("y", 0),
+            pos2.get("z", 0) - pos1.get("z", 0),
+            vel2.get("vx", 0) - vel1.get("vx", 0),
+            vel2.get("vy", 0) - vel1.get("vy", 0),
+            vel2.get("vz", 0) - vel1.get("vz", 0),
+            time_window_sec
+        )
+    if _is_rows(pos1, vel1, pos2, vel2):
+        rel_pos, rel_vel = np.broadcast_arrays(
+            _as_vec3(pos2) - _as_vec3(pos1),
+            _as_vec3(vel2, VELOCITY_KEYS) - _as_vec3(vel1, VELOCITY_KEYS)
+        )
+        return compute_closest_approach_batch(rel_pos, rel_vel, time_window_sec)
+    x1, y1, z1 = _xyz(pos1)
+    x2, y2, z2 = _xyz(pos2)
+    vx1, vy1, vz1 = _xyz(vel1, VELOCITY_KEYS)
+    vx2, vy2, vz2 = _xyz(vel2, VELOCITY_KEYS)
+    return _closest_approach(x2 - x1, y2 - y1, z2 - z1, vx2 - vx1, vy2 - vy1, vz2 - vz1, time_window_sec)
+
+
+def _closest_approach(dx, dy, dz, dvx, dvy, dvz, time_window_sec):
+    """
+    Linear closest approach from one relative state (object 2 minus object 1)
     
+    Straight float arithmetic in a single pass: no intermediate dicts and
+    no second distance computation. The future separation uses the identity
+    (p2 + v2*t) - (p1 + v1*t) = dp + dv*t, three multiply-adds instead of
+    six (no math.fma before Python 3.13).
+    """
     # Time to closest approach (dot product)
     numerator = -(dx*dvx + dy*dvy + dz*dvz)
-    denominator = dvx**2 + dvy**2 + dvz**2
+    denominator = dvx*dvx + dvy*dvy + dvz*dvz
     
     if denominator < 1e-10:
         # Objects moving in parallel
-        return (0.0, current_distance)
-    
-    time_to_closest = numerator / denominator
+        return (0.0, math.hypot(dx, dy, dz))
     
     # Clamp to time window
-    if time_to_closest < 0:
-        time_to_closest = 0
-    elif time_to_closest > time_window_sec:
-        time_to_closest = time_window_sec
-    
-    # Compute position at closest approach
-    x1_future = pos1.get("x", 0) + vel1.get("vx", 0) * time_to_closest
-    y1_future = pos1.get("y", 0) + vel1.get("vy", 0) * time_to_closest
-    z1_future = pos1.get("z", 0) + vel1.get("vz", 0) * time_to_closest
+    time_to_closest = min(max(numerator / denominator, 0), time_window_sec)
     
-    x2_future = pos2.get("x", 0) + vel2.get("vx", 0) * time_to_closest
-    y2_future = pos2.get("y", 0) + vel2.get("vy", 0) * time_to_closest
-    z2_future = pos2.get("z", 0) + vel2.get("vz", 0) * time_to_closest
-    
-    min_distance = math.sqrt(
-        (x2_future - x1_future)**2 +
-        (y2_future - y1_future)**2 +
-        (z2_future - z1_future)**2
-    )
+    # Separation at closest approach
+    x = dx + dvx * time_to_closest
+    y = dy + dvy * time_to_closest
+    z = dz + dvz * time_to_closest
+    return (time_to_closest, math.hypot(x, y, z))
+
+
+def compute_closest_approach_batch(
+    rel_pos: np.ndarray,
+    rel_vel: np.ndarray,
+    time_window_sec: int = 3600
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized compute_closest_approach for many object pairs
     
-    return (time_to_closest, min_distance)
+    Args:
+        rel_pos: (N, 3) relative positions, object 2 minus object 1 (km)
+        rel_vel: (N, 3) relative velocities, object 2 minus object 1 (km/s)
+        time_window_sec: Time window to search (seconds)
+        
+    Returns:
+        Tuple of (time_to_closest_approach_sec, minimum_distance_km) arrays
+    """
+    numerator = np.einsum("ij,ij->i", rel_pos, rel_vel)
+    np.negative(numerator, out=numerator)
+    denominator = np.einsum("ij,ij->i", rel_vel, rel_vel)
+    
+    # Parallel motion (denominator ~ 0) keeps the current separation at t=0
+    time_to_closest = np.zeros(len(rel_pos))
+    np.divide(numerator, denominator, out=time_to_closest, where=denominator >= 1e-10)
+    np.clip(time_to_closest, 0, time_window_sec, out=time_to_closest)
+    
+    # Separation at closest approach, built in one (N, 3) buffer
+    separation = np.multiply(rel_vel, time_to_closest[:, None])
+    separation += rel_pos
+    min_distance = np.einsum("ij,ij->i", separation, separation)
+    return time_to_closest, np.sqrt(min_distance, out=min_distance)
 
 
-def vector_magnitude(vec: Dict) -> float:
+def vector_magnitude(vec: Vector):
     """
     Compute magnitude of a 3D vector
     
     Args:
-        vec: Vector dict with x, y, z keys
+        vec: (3,) or (N, 3) array, sequence, or dict with x, y, z
+            (or vx, vy, vz) keys
         
     Returns:
-        Magnitude
+        Magnitude (float, or (N,) array)
     """
-    x = vec.get("x", vec.get("vx", 0))
-    y = vec.get("y", vec.get("vy", 0))
-    z = vec.get("z", vec.get("vz", 0))
-    
-    return math.sqrt(x**2 + y**2 + z**2)
+    if isinstance(vec, np.ndarray) and vec.ndim > 1:
+        return np.sqrt(np.einsum("ij,ij->i", vec, vec))
+    if isinstance(vec, dict):
+        x = vec.get("x", vec.get("vx", 0))
+        y = vec.get("y", vec.get("vy", 0))
+        z = vec.get("z", vec.get("vz", 0))
+    else:
+        x, y, z = vec
+    
+    return math.hypot(x, y, z)
 
 
-def normalize_vector(vec: Dict) -> Dict:
+def normalize_vector(vec: Vector):
     """
     Normalize a 3D vector to unit length
     
     Args:
-        vec: Vector dict
+        vec: Vector dict, or (3,) / (N, 3) array
         
     Returns:
-        Normalized vector dict
+        Normalized vector in the same form (zero vectors map to +z)
     """
+    if isinstance(vec, np.ndarray):
+        vec = vec.astype(float)
+        mag = np.atleast_1d(vector_magnitude(vec))
+        rows = vec.reshape(-1, 3)
+        tiny = mag < 1e-10
+        rows[~tiny] /= mag[~tiny, None]
+        rows[tiny] = (0.0, 0.0, 1.0)
+        return vec
+    
     mag = vector_magnitude(vec)
     
     if mag < 1e-10:
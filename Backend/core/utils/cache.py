@@ -0,0 +1,143 @@
+"""
+Response Cache Utilities
+Key builder for fastapi-cache decorated endpoints, conditional GET helpers,
+and the single-flight task registry behind the service-level caches
+"""
+import asyncio
+import hashlib
+import logging
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+import orjson
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+
+def request_key_builder(
+    func: Callable,
+    namespace: Optional[str] = "",
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Optional[tuple] = None,
+    kwargs: Optional[dict] = None
+) -> str:
+    """
+    Build a cache key from the request path and sorted query parameters
+    
+    Each filter variant (severity, acknowledged, limit, object_type, all, ...)
+    gets its own entry, and keys are grouped by namespace so a whole
+    namespace can be cleared at once.
+    """
+    if request is not None:
+        variant = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+    else:
+        variant = f"{args}:{sorted((kwargs or {}).items())}"
+    digest = hashlib.md5(f"{func.__module__}:{func.__name__}:{variant}".encode()).hexdigest()
+    return f"{FastAPICache.get_prefix()}:{namespace}:{digest}"
+
+
+async def invalidate(*namespaces: str) -> None:
+    """Drop every cached response in the given namespaces after a write"""
+    if FastAPICache._backend is None:
+        # response cache not set up (scripts, background jobs)
+        return
+    for namespace in namespaces:
+        await FastAPICache.clear(namespace=namespace)
+
+
+def etag_response(request: Request, payload: Dict[str, Any]) -> Response:
+    """
+    Return the payload with a content ETag, or 304 if the client already has it
+    
+    The hash skips the per-response ``timestamp`` so an unchanged result keeps
+    the same ETag across recomputes and cache expiries.
+    """
+    body = {k: v for k, v in payload.items() if k != "timestamp"}
+    digest = hashlib.blake2b(
+        orjson.dumps(body, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS),
+        digest_size=16
+    ).hexdigest()
+    etag = f'"{digest}"'
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))):
+        return Response(status_code=304, headers={"ETag": etag})
+    return ORJSONResponse(content=payload, headers={"ETag": etag})
+
+
+def etag(func: Callable) -> Callable:
+    """
+    Answer conditional GETs for a @cache decorated endpoint
+    
+    Place between ``@router.get`` and ``@cache``; it relies on the ``request``
+    argument fastapi-cache adds to the endpoint signature.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        result = await func(*args, **kwargs)
+        request = kwargs.get("request")
+        if request is None or isinstance(result, Response):
+            return result
+        conditional = etag_response(request, result)
+        # Keep the Cache-Control fastapi-cache set on the injected response
+        response = kwargs.get("response")
+        if response is not None and "cache-control" in response.headers:
+            conditional.headers["Cache-Control"] = response.headers["cache-control"]
+        return conditional
+    return wrapper
+
+
+class SingleFlight:
+    """
+    One running task per key, shared by every caller asking for that key
+    
+    Used for coalesced fetches (concurrent misses share one round-trip) and
+    stale-while-revalidate refreshes nobody awaits. asyncio keeps tasks only
+    weakly, so strong references are held until each task finishes, and
+    errors of tasks nobody awaited are logged instead of lost.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def start(self, key: Hashable, factory: Callable[[], Awaitable]) -> asyncio.Task:
+        """The task in flight for key, or a new one running factory()"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, factory()))
+            self._inflight[key] = task
+            self._tasks.add(task)
+            task.add_done_callback(self._task_done)
+        return task
+    
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable]) -> Any:
+        """Await the shared task for key"""
+        # shield: one caller disconnecting must not cancel the task for the rest
+        return await asyncio.shield(self.start(key, factory))
+    
+    def forget(self, match: Callable[[Hashable], bool] = None):
+        """
+        Detach in-flight tasks (all, or those whose key matches) so later
+        callers start afresh, e.g. when a write makes them stale; the
+        detached tasks still run to completion
+        """
+        for key in [k for k in self._inflight if match is None or match(k)]:
+            del self._inflight[key]
+    
+    async def _run(self, key: Hashable, work: Awaitable) -> Any:
+        try:
+            return await work
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+    
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"{self.name} failed: {task.exception()}")
@@ -1,8 +1,59 @@
 """
 Standard API Response Utilities
 """
-from typing import Any, Optional, Dict
-from datetime import datetime
+from typing import Any, Optional, Dict, List
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from fastapi.responses import ORJSONResponse
+
+
+# Per-request holder for the response timestamp; filled on first use so
+# every helper called while serving one request formats it only once
+_request_timestamp: ContextVar[Optional[List[Optional[str]]]] = ContextVar("request_timestamp", default=None)
+
+
+def set_request_timestamp() -> Token:
+    """Open a timestamp scope for the current request (see RequestTimestampMiddleware)"""
+    return _request_timestamp.set([None])
+
+
+def _utc_isoformat() -> str:
+    """Current time as offset-aware UTC ISO 8601, the format of every envelope"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_request_timestamp() -> str:
+    """ISO timestamp shared by all responses built in the current request"""
+    holder = _request_timestamp.get()
+    if holder is None:
+        # outside a request scope (scripts, background jobs)
+        return _utc_isoformat()
+    if holder[0] is None:
+        holder[0] = _utc_isoformat()
+    return holder[0]
+
+
+class RequestTimestampMiddleware:
+    """Pure ASGI middleware giving each HTTP request its own timestamp scope"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = set_request_timestamp()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_timestamp.reset(token)
+
+
+# Key-ordered bases for the envelopes; dict.copy() of a small prebuilt dict
+# is cheaper than building the literal and keeps the key order stable
+_SUCCESS_TEMPLATE = {"success": True, "message": "", "timestamp": ""}
+_ERROR_TEMPLATE = {"success": False, "error": "", "timestamp": ""}
 
 
 def success_response(
@@ -19,13 +70,12 @@ def success_response(
         meta: Additional metadata
         
     Returns:
-        Formatted response dict
+        Formatted response dict (left unencoded; the app's default
+        ORJSONResponse serializes it exactly once)
     """
-    response = {
-        "success": True,
-        "message": message,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
+    response = _SUCCESS_TEMPLATE.copy()
+    response["message"] = message
+    response["timestamp"] = get_request_timestamp()
     
     if data is not None:
         response["data"] = data
@@ -36,6 +86,17 @@ def success_response(
     return response
 
 
+def encoded_response(payload: Dict) -> ORJSONResponse:
+    """
+    Wrap a response dict so orjson serializes it directly
+    
+    Returning a dict makes FastAPI walk it with jsonable_encoder before the
+    response class runs; large nested analysis payloads skip that pass.
+    numpy scalars and arrays are serialized natively (OPT_SERIALIZE_NUMPY).
+    """
+    return ORJSONResponse(content=payload)
+
+
 def error_response(
     error: str,
     detail: Optional[str] = None,
@@ -52,11 +113,9 @@ def error_response(
     Returns:
         Formatted error dict
     """
-    response = {
-        "success": False,
-        "error": error,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
+    response = _ERROR_TEMPLATE.copy()
+    response["error"] = error
+    response["timestamp"] = get_request_timestamp()
     
     if detail:
         response["detail"] = detail
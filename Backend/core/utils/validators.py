@@ -73,7 +73,8 @@ class ManeuverPlan(BaseModel):
     @validator('direction_vector')
     def validate_unit_vector(cls, v):
         """Ensure direction vector is roughly normalized"""
-        magnitude = sum(x**2 for x in v) ** 0.5
+        # exactly 3 components (enforced by the field constraints)
+        magnitude = (v[0] * v[0] + v[1] * v[1] + v[2] * v[2]) ** 0.5
         if magnitude < 0.9 or magnitude > 1.1:
             raise ValueError("Direction vector must be approximately unit length")
         return v
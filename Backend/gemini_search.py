@@ -3,31 +3,119 @@ Gemini API with Google Search Grounding
 Provides live data fetching for satellite information
 """
 import google.generativeai as genai
+import google.ai.generativelanguage as glm
+import asyncio
 import os
+import hashlib
+import json
 import logging
-from fastapi import APIRouter, HTTPException
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Set
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+GEMINI_MODEL = "gemini-2.5-flash"
+RESPONSE_TTL_SECONDS = 600.0
+RESPONSE_CACHE_SIZE = 2048
+CLIENT_POOL_SIZE = 64
+
+# API key -> async Gemini client; reused so each key keeps one open channel
+_client_pool: "OrderedDict[str, glm.GenerativeServiceAsyncClient]" = OrderedDict()
+# Channel shutdowns of evicted clients, referenced until they finish
+_closing_clients: Set[asyncio.Task] = set()
+
+# (API key, satellite data, normalized question) digest -> (stored_at, response body)
+_response_cache: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+
 class ChatRequest(BaseModel):
     satellite_data: dict
     user_message: str
     api_key: str
 
+def _response_key(api_key: str, satellite_data: dict, user_message: str) -> str:
+    """
+    Digest of the API key, the satellite data and the question (case and
+    outer whitespace ignored)
+    
+    The key is part of it so an answer paid for with one key is never
+    served to a caller with another (or an invalid) key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(api_key.encode())
+    digest.update(b"\0")
+    digest.update(json.dumps(satellite_data, sort_keys=True, default=str).encode())
+    digest.update(b"\0")
+    digest.update(user_message.strip().lower().encode())
+    return digest.hexdigest()
+
+
+def _cached_response(key: str) -> Optional[dict]:
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= RESPONSE_TTL_SECONDS:
+        del _response_cache[key]
+        return None
+    _response_cache.move_to_end(key)
+    return entry[1]
+
+
+def _store_response(key: str, body: dict):
+    _response_cache[key] = (time.monotonic(), body)
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+def _client_for(api_key: str) -> glm.GenerativeServiceAsyncClient:
+    """
+    Pooled async client for an API key
+    
+    genai.configure() is process-global and drops its clients on every
+    call, so each request used to open a new channel (and concurrent
+    requests could swap keys under each other); a per-key client avoids both.
+    Clients evicted from the pool have their channel closed in the background.
+    Must be called from the event loop.
+    """
+    client = _client_pool.get(api_key)
+    if client is None:
+        client = glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+        _client_pool[api_key] = client
+        while len(_client_pool) > CLIENT_POOL_SIZE:
+            _, evicted = _client_pool.popitem(last=False)
+            task = asyncio.ensure_future(evicted.transport.close())
+            _closing_clients.add(task)
+            task.add_done_callback(_closing_clients.discard)
+    else:
+        _client_pool.move_to_end(api_key)
+    return client
+
+
 @router.post("/api/gemini-chat")
-async def gemini_chat(request: ChatRequest):
+async def gemini_chat(request: ChatRequest, response: Response, no_cache: bool = False):
     """
     Chat endpoint with Google Search grounding for live data
+    
+    Answers are reused for RESPONSE_TTL_SECONDS when the same question is
+    asked about the same satellite data with the same API key (X-Cache: HIT);
+    ?no_cache=1 always asks Gemini.
     """
+    cache_key = _response_key(request.api_key, request.satellite_data, request.user_message)
+    if not no_cache:
+        cached = _cached_response(cache_key)
+        if cached is not None:
+            response.headers["X-Cache"] = "HIT"
+            return cached
+    response.headers["X-Cache"] = "MISS"
+    
     try:
         logger.info(f"Gemini chat request received for satellite: {request.satellite_data.get('name', 'Unknown')}")
         
-        # Configure Gemini with the provided API key
-        genai.configure(api_key=request.api_key)
-        
         # Build satellite context from provided data
         satellite_context = build_satellite_context(request.satellite_data)
         
@@ -41,77 +129,116 @@ Provide detailed, accurate, and helpful information about this satellite based o
         # Initialize model WITHOUT Google Search grounding for now (due to API restrictions)
         # Google Search grounding may not be available in all regions/tiers
         # Using gemini-2.5-flash (stable, available on this API key)
-        logger.info("Initializing Gemini model without search grounding")
-        model = genai.GenerativeModel('gemini-2.5-flash')
+        # The satellite context goes in as the system instruction so every turn
+        # about the same satellite shares an identical prefix, which Gemini 2.5
+        # reuses through its implicit prompt cache; only the user turn is new
+        # The request goes straight to the pooled client for the caller's key
+        # (GenerativeModel would use the process-global client)
+        logger.info("Calling Gemini without search grounding")
+        content_request = glm.GenerateContentRequest(
+            model=f"models/{GEMINI_MODEL}",
+            system_instruction=glm.Content(parts=[glm.Part(text=system_prompt)]),
+            contents=[glm.Content(role="user", parts=[glm.Part(text=request.user_message)])]
+        )
         
-        # Generate response
-        full_prompt = system_prompt + "\n\nUser question: " + request.user_message
-        logger.info(f"Generating content for prompt length: {len(full_prompt)}")
-        response = model.generate_content(full_prompt)
+        # Generate response without blocking the event loop
+        logger.info(f"Generating content for prompt length: {len(system_prompt) + len(request.user_message)}")
+        raw = await _client_for(request.api_key).generate_content(content_request)
+        # Wrapped for the SDK's .text (raises when the answer was blocked)
+        result = genai.types.GenerateContentResponse.from_response(raw)
         
         logger.info("Response generated successfully")
         
-        return {
-            "response": response.text,
+        body = {
+            "response": result.text,
             "has_live_data": False,  # No search capability for now
             "sources": None
         }
+        _store_response(cache_key, body)
+        return body
         
     except Exception as e:
         logger.error(f"Gemini API error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Gemini API error: {str(e)}")
 
 
+# build_satellite_context inputs, in the positional order _context_from_fields takes them
+CONTEXT_FIELDS = (
+    "name", "sat_name", "sat_id", "norad_id", "altitude_km", "altitude",
+    "latitude", "longitude", "inclination_deg", "inclination",
+    "velocity_kmps", "velocity", "status", "launch_date", "country",
+    "purpose", "mass",
+)
+
+
 def build_satellite_context(sat_data: dict) -> str:
-    """Build satellite context from available data, excluding unknowns"""
-    context_lines = []
-    
-    # Helper to check if value is valid
-    def is_valid(val):
-        if val is None:
-            return False
-        if isinstance(val, str) and val.lower() in ['unknown', 'n/a', 'data not available', '']:
-            return False
-        return True
-    
-    # Add fields if they exist and are valid
-    if is_valid(sat_data.get('name') or sat_data.get('sat_name')):
-        context_lines.append(f"- Name: {sat_data.get('name') or sat_data.get('sat_name')}")
-    
-    if is_valid(sat_data.get('sat_id')):
-        context_lines.append(f"- NORAD ID: {sat_data.get('sat_id')}")
-    elif is_valid(sat_data.get('norad_id')):
-        context_lines.append(f"- NORAD ID: {sat_data.get('norad_id')}")
-    
-    if is_valid(sat_data.get('altitude_km') or sat_data.get('altitude')):
-        alt = sat_data.get('altitude_km') or sat_data.get('altitude')
-        context_lines.append(f"- Altitude: {alt} km")
-    
-    if is_valid(sat_data.get('latitude')) and is_valid(sat_data.get('longitude')):
-        context_lines.append(f"- Position: {sat_data.get('latitude')}°N, {sat_data.get('longitude')}°E")
-    
-    if is_valid(sat_data.get('inclination_deg') or sat_data.get('inclination')):
-        inc = sat_data.get('inclination_deg') or sat_data.get('inclination')
-        context_lines.append(f"- Inclination: {inc}°")
-    
-    if is_valid(sat_data.get('velocity_kmps') or sat_data.get('velocity')):
-        vel = sat_data.get('velocity_kmps') or sat_data.get('velocity')
-        context_lines.append(f"- Velocity: {vel} km/s")
-    
-    if is_valid(sat_data.get('status')):
-        context_lines.append(f"- Status: {sat_data.get('status')}")
-    
-    if is_valid(sat_data.get('launch_date')):
-        context_lines.append(f"- Launch Date: {sat_data.get('launch_date')}")
-    
-    if is_valid(sat_data.get('country')):
-        context_lines.append(f"- Country: {sat_data.get('country')}")
+    """Build satellite context from available data, excluding unknowns
     
-    if is_valid(sat_data.get('purpose')):
-        context_lines.append(f"- Purpose: {sat_data.get('purpose')}")
+    Memoized on the relevant fields, so multi-turn chats about the same
+    satellite assemble the string once.
+    """
+    fields = tuple(sat_data.get(k) for k in CONTEXT_FIELDS)
+    # types are part of the key: 0 == 0.0 == False but they format differently
+    field_types = tuple(map(type, fields))
+    try:
+        return _context_from_fields(fields, field_types)
+    except TypeError:
+        # unhashable field value (nested dict/list): build without the cache
+        return _context_from_fields.__wrapped__(fields, field_types)
+
+
+_PLACEHOLDERS = frozenset({'unknown', 'n/a', 'data not available', ''})
+
+
+def _is_valid(val) -> bool:
+    """False for missing values and placeholder strings"""
+    if val is None:
+        return False
+    if isinstance(val, str) and val.lower() in _PLACEHOLDERS:
+        return False
+    return True
+
+
+def _pick(*values):
+    """`a or b or ...` over one field's alternate keys, or None if that value is not valid"""
+    for val in values:
+        if val:
+            break
+    return val if _is_valid(val) else None
+
+
+@lru_cache(maxsize=4096)
+def _context_from_fields(fields: tuple, field_types: tuple) -> str:
+    (name, sat_name, sat_id, norad_id, altitude_km, altitude, latitude, longitude,
+     inclination_deg, inclination, velocity_kmps, velocity, status, launch_date,
+     country, purpose, mass) = fields
+    context_lines = []
     
-    if is_valid(sat_data.get('mass')):
-        context_lines.append(f"- Mass: {sat_data.get('mass')} kg")
+    # Add fields if they exist and are valid (each value is checked once)
+    if (val := _pick(name, sat_name)) is not None:
+        context_lines.append(f"- Name: {val}")
+    if _is_valid(sat_id):
+        context_lines.append(f"- NORAD ID: {sat_id}")
+    elif _is_valid(norad_id):
+        context_lines.append(f"- NORAD ID: {norad_id}")
+    if (val := _pick(altitude_km, altitude)) is not None:
+        context_lines.append(f"- Altitude: {val} km")
+    if _is_valid(latitude) and _is_valid(longitude):
+        context_lines.append(f"- Position: {latitude}°N, {longitude}°E")
+    if (val := _pick(inclination_deg, inclination)) is not None:
+        context_lines.append(f"- Inclination: {val}°")
+    if (val := _pick(velocity_kmps, velocity)) is not None:
+        context_lines.append(f"- Velocity: {val} km/s")
+    if _is_valid(status):
+        context_lines.append(f"- Status: {status}")
+    if _is_valid(launch_date):
+        context_lines.append(f"- Launch Date: {launch_date}")
+    if _is_valid(country):
+        context_lines.append(f"- Country: {country}")
+    if _is_valid(purpose):
+        context_lines.append(f"- Purpose: {purpose}")
+    if _is_valid(mass):
+        context_lines.append(f"- Mass: {mass} kg")
     
     if context_lines:
         return "Satellite Data:\n" + "\n".join(context_lines)
@@ -4,12 +4,19 @@ FastAPI-based space traffic management system
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+import sys
 import uvicorn
 
 from api import satellites, debris, collision_events, maneuvers, alerts, health, satellite_analysis, risk_stream, report
 from config.settings import settings
+from config.supabase_client import supabase_client
+from core.utils.cache import request_key_builder
+from core.utils.response import RequestTimestampMiddleware
 import gemini_search
 
 
@@ -19,7 +26,10 @@ async def lifespan(app: FastAPI):
     print("🚀 Orbit Shield Backend Starting...")
     print(f"📡 Environment: {settings.ENVIRONMENT}")
     print(f"🔧 Debug Mode: {settings.DEBUG}")
+    FastAPICache.init(InMemoryBackend(), prefix="orbit-shield", key_builder=request_key_builder)
+    supabase_client.init_pool()
     yield
+    supabase_client.close()
     print("🛑 Orbit Shield Backend Shutting Down...")
 
 
@@ -28,6 +38,7 @@ app = FastAPI(
     description="Space Traffic Management System - Real-time satellite tracking, collision detection, and maneuver planning",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -40,12 +51,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestTimestampMiddleware)
+# Event and debris lists are large, repetitive JSON; level 6 keeps most of
+# level 9's ratio at a fraction of the CPU. Small bodies are sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
 
 
 # Global Exception Handlers
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -57,7 +72,7 @@ async def http_exception_handler(request, exc):
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "success": False,
@@ -95,6 +110,11 @@ if __name__ == "__main__":
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
+        # uvloop (libuv) has no Windows build; asyncio's loop is used there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        # --reload runs a single process, so workers only apply outside debug
+        workers=None if settings.DEBUG else settings.WORKERS,
         reload=settings.DEBUG
     )
 app.include_router(satellite_analysis.router, prefix="/api/satellite-analysis", tags=["Satellite Analysis"])
@@ -0,0 +1,10 @@
+-- Indexes backing the filtered alert/debris queries in alert_service and debris_service.
+-- Apply in the Supabase SQL editor (or psql) against the project database.
+
+-- alert_service.get_by_satellite: WHERE satellite_id = ? ORDER BY created_at DESC LIMIT n
+CREATE INDEX IF NOT EXISTS idx_alerts_sat_created ON alerts (satellite_id, created_at DESC);
+
+-- debris_service.count_by_type / get_all_debris(object_type=...) and DebrisCreate
+-- write object_type; older debris tables (and the data/debris.csv dump) lack it
+ALTER TABLE debris ADD COLUMN IF NOT EXISTS object_type text NOT NULL DEFAULT 'unknown';
+CREATE INDEX IF NOT EXISTS idx_debris_object_type ON debris (object_type);
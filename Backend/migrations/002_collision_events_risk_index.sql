@@ -0,0 +1,5 @@
+-- Index backing the simulator lookup in collision_service._fetch_simulator_events.
+-- Apply in the Supabase SQL editor (or psql) against the project database.
+
+-- WHERE sat_id = ? ORDER BY risk_level DESC, collision_probability DESC LIMIT 10
+CREATE INDEX IF NOT EXISTS idx_collision_sat_risk ON collision_events (sat_id, risk_level DESC, collision_probability DESC);
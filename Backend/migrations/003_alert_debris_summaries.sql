@@ -0,0 +1,45 @@
+-- Pre-aggregated counts read by alert_service.count_by_severity and
+-- debris_service.count_by_type, so dashboard refreshes read a handful of rows
+-- instead of counting the base tables.
+-- Apply in the Supabase SQL editor (or psql) against the project database.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS alerts_summary AS
+    SELECT severity, acknowledged, count(*)::int AS count
+    FROM alerts
+    GROUP BY severity, acknowledged;
+
+-- Unique index required by REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_summary_key ON alerts_summary (severity, acknowledged);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS debris_counts_by_type AS
+    SELECT object_type, count(*)::int AS count
+    FROM debris
+    GROUP BY object_type;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_debris_counts_by_type_key ON debris_counts_by_type (object_type);
+
+GRANT SELECT ON alerts_summary, debris_counts_by_type TO anon, authenticated, service_role;
+
+-- Refresh on a short schedule rather than from write triggers: REFRESH needs
+-- ownership of the view (a trigger runs as the writing API role and would
+-- fail), and one refresh per statement would serialize concurrent bulk
+-- inserts. Counts may lag writes by up to a minute.
+-- Requires the pg_cron extension (Database -> Extensions in Supabase).
+DROP TRIGGER IF EXISTS trg_refresh_alerts_summary ON alerts;
+DROP TRIGGER IF EXISTS trg_refresh_debris_counts_by_type ON debris;
+DROP FUNCTION IF EXISTS refresh_alerts_summary();
+DROP FUNCTION IF EXISTS refresh_debris_counts_by_type();
+
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+
+-- cron.schedule with a job name replaces an existing job of that name
+SELECT cron.schedule(
+    'refresh_alerts_summary',
+    '* * * * *',
+    'REFRESH MATERIALIZED VIEW CONCURRENTLY alerts_summary'
+);
+SELECT cron.schedule(
+    'refresh_debris_counts_by_type',
+    '* * * * *',
+    'REFRESH MATERIALIZED VIEW CONCURRENTLY debris_counts_by_type'
+);
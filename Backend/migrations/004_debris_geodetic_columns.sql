@@ -0,0 +1,19 @@
+-- Geodetic position derived from the stored Cartesian state, so
+-- debris_service.get_all_debris reads latitude/longitude/altitude_km
+-- directly instead of recomputing asin/atan2 per row in Python.
+-- Apply in the Supabase SQL editor (or psql) against the project database
+-- before deploying: DebrisService.LIST_COLUMNS selects these columns.
+
+ALTER TABLE debris
+    ADD COLUMN IF NOT EXISTS latitude double precision GENERATED ALWAYS AS (
+        COALESCE(degrees(asin(
+            LEAST(1.0, GREATEST(-1.0, deb_y / NULLIF(sqrt(deb_x*deb_x + deb_y*deb_y + deb_z*deb_z), 0)))
+        )), 0)
+    ) STORED,
+    ADD COLUMN IF NOT EXISTS longitude double precision GENERATED ALWAYS AS (
+        COALESCE(degrees(atan2(deb_z, deb_x)), 0)
+    ) STORED,
+    -- Earth radius 6371 km, as in settings.EARTH_RADIUS_KM
+    ADD COLUMN IF NOT EXISTS altitude_km double precision GENERATED ALWAYS AS (
+        sqrt(deb_x*deb_x + deb_y*deb_y + deb_z*deb_z) - 6371.0
+    ) STORED;
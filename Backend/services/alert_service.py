@@ -3,9 +3,10 @@ Alert Service
 Business logic for alert management
 """
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from config.supabase_client import supabase_client
 from config.local_cache import local_cache
+import asyncio
 import uuid
 
 
@@ -13,15 +14,22 @@ class AlertService:
     """Service for alert generation and management"""
     
     TABLE_NAME = "alerts"
+    SUMMARY_VIEW = "alerts_summary"
+    SEVERITY_LEVELS = ("critical", "high", "medium", "low")
+    HIGH_PRIORITY_SEVERITIES = frozenset({"high", "critical"})
+    # Columns the alert list shows; metadata and audit fields come with the
+    # single-alert read
+    LIST_COLUMNS = "id,alert_type,severity,title,message,satellite_id,acknowledged,created_at"
     
     async def create_alert(self, alert_data: Dict) -> Dict:
         """Create new alert"""
+        now = datetime.now(timezone.utc).isoformat()
         alert = {
             **alert_data,
             "id": str(uuid.uuid4()),
             "acknowledged": False,
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "created_at": now,
+            "updated_at": now
         }
         
         result = await supabase_client.insert(self.TABLE_NAME, alert)
@@ -29,13 +37,28 @@ class AlertService:
         local_cache.upsert(self.TABLE_NAME, alert)
         return result or alert
     
+    async def bulk_create(self, alerts_data: List[Dict]) -> List[Dict]:
+        """Create many alerts with chunked bulk inserts"""
+        now = datetime.now(timezone.utc).isoformat()
+        alerts = [
+            {
+                **data,
+                "id": str(uuid.uuid4()),
+                "acknowledged": False,
+                "created_at": now,
+                "updated_at": now
+            }
+            for data in alerts_data
+        ]
+        return await supabase_client.insert_many(self.TABLE_NAME, alerts)
+    
     async def get_all_alerts(
         self,
         severity: Optional[str] = None,
         acknowledged: Optional[bool] = None,
         limit: int = 50
     ) -> List[Dict]:
-        """Get alerts with optional filtering"""
+        """Get newest alerts with optional filtering (filtered, sorted and limited in the DB)"""
         filters = {}
         
         if severity:
@@ -44,11 +67,69 @@ class AlertService:
         if acknowledged is not None:
             filters["acknowledged"] = acknowledged
         
-        alerts = await supabase_client.select(self.TABLE_NAME, filters=filters, limit=limit)
+        alerts = await supabase_client.select(
+            self.TABLE_NAME,
+            filters=filters,
+            columns=self.LIST_COLUMNS,
+            order="created_at.desc",
+            limit=limit
+        )
         if not alerts:
             alerts = local_cache.get_all(self.TABLE_NAME, limit=limit)
         return alerts
     
+    async def count_by_severity(self, acknowledged: Optional[bool] = False) -> Dict[str, int]:
+        """Count alerts per severity from the alerts_summary view (one small read; refreshed every minute)"""
+        rows = await supabase_client.select_remote(
+            self.SUMMARY_VIEW,
+            filters={"acknowledged": acknowledged} if acknowledged is not None else None,
+            columns="severity,count"
+        )
+        if rows is not None:
+            counts = dict.fromkeys(self.SEVERITY_LEVELS, 0)
+            for row in rows:
+                if row["severity"] in counts:
+                    counts[row["severity"]] += row["count"]
+            return counts
+        
+        # View unavailable: fall back to per-severity server-side counts,
+        # issued concurrently
+        filter_sets = []
+        for severity in self.SEVERITY_LEVELS:
+            filters = {"severity": severity}
+            if acknowledged is not None:
+                filters["acknowledged"] = acknowledged
+            filter_sets.append(filters)
+        totals = await asyncio.gather(*(
+            supabase_client.count(self.TABLE_NAME, filters=filters) for filters in filter_sets
+        ))
+        return dict(zip(self.SEVERITY_LEVELS, totals))
+    
+    async def get_by_satellite(self, satellite_id: str, limit: int = 100) -> List[Dict]:
+        """Get most recent alerts for a satellite (served by idx_alerts_sat_created)"""
+        return await supabase_client.select(
+            self.TABLE_NAME,
+            filters={"satellite_id": satellite_id},
+            order="created_at.desc",
+            limit=limit
+        )
+    
+    async def get_recent_high_priority(self, limit: int = 10) -> List[Dict]:
+        """Get most recent high/critical alerts, sorted and limited in the DB"""
+        return await supabase_client.select(
+            self.TABLE_NAME,
+            filters={"severity": {"in": self.HIGH_PRIORITY_SEVERITIES}},
+            order="created_at.desc",
+            limit=limit
+        )
+    
+    async def count_high_priority(self) -> int:
+        """Count all high/critical alerts"""
+        return await supabase_client.count(
+            self.TABLE_NAME,
+            filters={"severity": {"in": self.HIGH_PRIORITY_SEVERITIES}}
+        )
+    
     async def get_alert_by_id(self, alert_id: str) -> Optional[Dict]:
         """Get specific alert by ID from database"""
         alert = await supabase_client.select_by_id(self.TABLE_NAME, alert_id)
@@ -60,10 +141,11 @@ class AlertService:
     
     async def acknowledge_alert(self, alert_id: str) -> Dict:
         """Mark alert as acknowledged"""
+        now = datetime.now(timezone.utc).isoformat()
         update_data = {
             "acknowledged": True,
-            "acknowledged_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "acknowledged_at": now,
+            "updated_at": now
         }
         
         result = await supabase_client.update(self.TABLE_NAME, alert_id, update_data)
@@ -2,114 +2,348 @@
 Debris Service
 Business logic for space debris tracking
 """
-from typing import Optional, List, Dict
-from datetime import datetime
+from typing import Optional, List, Dict, AsyncIterator, Awaitable, Callable, NamedTuple
+from datetime import datetime, timezone
 from config.supabase_client import supabase_client
 from config.local_cache import local_cache
 from config.sql_loader import load_debris_from_sql
+from core.orbital.coord_transforms import EARTH_RADIUS_KM, latlonalt_to_state, latlonalt_to_state_batch
+from core.utils.cache import invalidate as invalidate_responses
+import numpy as np
+import asyncio
+import logging
+import math
+import time
 import uuid
 import random
 
 
+logger = logging.getLogger(__name__)
+
+
+class DebrisArrays(NamedTuple):
+    """Column (SoA) view of debris with a full state vector"""
+    records: List[Dict]        # debris dicts, row-aligned with the arrays
+    positions: np.ndarray      # (N, 3) x, y, z in km
+    velocities: np.ndarray     # (N, 3) vx, vy, vz in km/s
+    total: int                 # debris fetched before dropping rows without coordinates
+    sq_norms: np.ndarray       # (N,) |position|^2, reused by every nearest-debris query
+
+
 class DebrisService:
     """Service for debris CRUD and tracking operations"""
     
     TABLE_NAME = "debris"
+    COUNTS_VIEW = "debris_counts_by_type"
+    # latitude/longitude/altitude_km are generated columns (migration 004)
+    LIST_COLUMNS = "id,deb_x,deb_y,deb_z,deb_vx,deb_vy,deb_vz,latitude,longitude,altitude_km,altitude,size_estimate,mass_estimate,source,status"
+    STATE_FIELDS = ("x", "y", "z", "vx", "vy", "vz")
+    # Debris orbits change on far longer timescales than this
+    LIST_TTL_SECONDS = 30.0
+    OFFLOAD_MIN_ROWS = 512  # rows above which enrichment runs in a worker thread
+    
+    def __init__(self):
+        # limit -> (debris list the arrays were built from, DebrisArrays)
+        self._arrays_cache: Dict[Optional[int], tuple] = {}
+        # limit -> (fetched_at, enriched debris list)
+        self._list_cache: Dict[Optional[int], tuple] = {}
+        self._list_lock = asyncio.Lock()
+        # invalidate() of caches built from debris (collision screening)
+        self._dependents: List[Callable[[], Awaitable[None]]] = []
+    
+    def add_dependent(self, invalidate: Callable[[], Awaitable[None]]):
+        """Register a cache to invalidate along with every debris write"""
+        self._dependents.append(invalidate)
+    
+    async def invalidate(self):
+        """Drop cached debris lists, arrays and responses after a debris write"""
+        self._list_cache.clear()
+        self._arrays_cache.clear()
+        await invalidate_responses("debris")
+        for invalidate_dependent in self._dependents:
+            await invalidate_dependent()
+    
+    async def get_all_debris_cached(self, limit: Optional[int] = 100) -> List[Dict]:
+        """
+        get_all_debris shared across requests for LIST_TTL_SECONDS
+        
+        The enriched list (with x/y/z) is kept, so hits skip both the fetch
+        and the coordinate math; concurrent misses wait for one fetch.
+        Callers must not mutate the returned dicts.
+        """
+        cached = self._list_cache.get(limit)
+        if cached is not None and time.monotonic() - cached[0] < self.LIST_TTL_SECONDS:
+            return cached[1]
+        async with self._list_lock:
+            cached = self._list_cache.get(limit)
+            if cached is not None and time.monotonic() - cached[0] < self.LIST_TTL_SECONDS:
+                return cached[1]
+            debris_list = await self.get_all_debris(limit=limit)
+            self._list_cache[limit] = (time.monotonic(), debris_list)
+        return debris_list
     
-    async def get_all_debris(self, limit: Optional[int] = 100) -> List[Dict]:
-        """Get all debris from Supabase"""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Fetching debris from Supabase with limit={limit}")
+    async def get_all_debris_soa(self, limit: Optional[int] = 1000) -> DebrisArrays:
+        """
+        Get debris as row-aligned position/velocity arrays
         
-        # Request only necessary columns to mitigate PostgREST JSON generation errors
+        Built from the get_all_debris_cached list and rebuilt only when that
+        list is refetched, so the arrays never outlive the list's TTL; they
+        are shared by the analysis endpoints. Rows missing any of
+        x/y/z/vx/vy/vz are dropped with a single vectorized finiteness check.
+        """
+        debris_list = await self.get_all_debris_cached(limit=limit)
+        cached = self._arrays_cache.get(limit)
+        if cached is not None and cached[0] is debris_list:
+            return cached[1]
+        arrays = self._build_arrays(debris_list)
+        self._arrays_cache[limit] = (debris_list, arrays)
+        return arrays
+    
+    def _build_arrays(self, debris_list: List[Dict]) -> DebrisArrays:
+        state = np.array(
+            [[d.get(f) for f in self.STATE_FIELDS] for d in debris_list],
+            dtype=float
+        ).reshape(-1, len(self.STATE_FIELDS))
+        valid = np.isfinite(state).all(axis=1)
+        positions = np.ascontiguousarray(state[valid, :3])
+        return DebrisArrays(
+            records=[d for d, ok in zip(debris_list, valid) if ok],
+            positions=positions,
+            velocities=np.ascontiguousarray(state[valid, 3:]),
+            total=len(debris_list),
+            sq_norms=np.einsum("ij,ij->i", positions, positions)
+        )
+    
+    async def get_all_debris(self, limit: Optional[int] = 100, object_type: Optional[str] = None) -> List[Dict]:
+        """Get all debris from Supabase, optionally filtered by object type"""
+        logger.info(f"Fetching debris from Supabase with limit={limit} object_type={object_type}")
+        
+        filters = {"object_type": object_type} if object_type else None
+        
+        # Request only necessary columns to mitigate PostgREST JSON generation errors.
+        # Both callers cache the result (list_debris's response cache and
+        # get_all_debris_cached), so the select memo would only add staleness
         debris_list = await supabase_client.select(
             self.TABLE_NAME,
+            filters=filters,
             limit=limit,
-            columns="id,deb_x,deb_y,deb_z,deb_vx,deb_vy,deb_vz,altitude,size_estimate,mass_estimate,source,status"
+            columns=self.LIST_COLUMNS,
+            memoize=False
         )
         logger.info(f"Retrieved {len(debris_list)} debris from Supabase")
 
+        # An empty filtered result is an answer; the file dump carries no object_type
+        if not debris_list and object_type:
+            return []
+        
         # Fallback to file loader if empty
         if not debris_list:
-            logger.warning("No debris found in Supabase – attempting local file load fallback")
-            file_debris = load_debris_from_sql()
-            if file_debris:
-                logger.info(f"Loaded {len(file_debris)} debris from local files; seeding cache")
-                for d in file_debris:
-                    # ensure id exists
-                    if not d.get('id'):
-                        d['id'] = str(uuid.uuid4())
-                    local_cache.upsert(self.TABLE_NAME, d)
-                debris_list = file_debris
-            else:
-                logger.warning("Local debris loader also returned empty; returning []")
+            debris_list = self._load_file_fallback()
+            if not debris_list:
                 return []
         
         # Enrich with derived position (x,y,z) and velocity vector if available
-        enriched = []
-        for deb in debris_list:
-            # Map Supabase coordinate fields (deb_x, deb_y, etc.) to expected fields (x, y, etc.)
-            if 'x' not in deb and 'deb_x' in deb:
-                deb['x'] = deb['deb_x']
-            if 'y' not in deb and 'deb_y' in deb:
-                deb['y'] = deb['deb_y']
-            if 'z' not in deb and 'deb_z' in deb:
-                deb['z'] = deb['deb_z']
-            if 'vx' not in deb and 'deb_vx' in deb:
-                deb['vx'] = deb['deb_vx']
-            if 'vy' not in deb and 'deb_vy' in deb:
-                deb['vy'] = deb['deb_vy']
-            if 'vz' not in deb and 'deb_vz' in deb:
-                deb['vz'] = deb['deb_vz']
-            # Map size_estimate to size_estimate_m for compatibility
-            if 'size_estimate_m' not in deb and 'size_estimate' in deb:
-                deb['size_estimate_m'] = deb['size_estimate']
-            
-            try:
-                # If we have deb_x/y/z but no lat/lon, calculate lat/lon from Cartesian
-                if (deb.get('latitude') is None or deb.get('longitude') is None) and deb.get('deb_x') is not None:
-                    import math
-                    x = float(deb['deb_x'])
-                    y = float(deb['deb_y'])
-                    z = float(deb['deb_z'])
-                    
-                    # Convert Cartesian to spherical (lat/lon/alt)
-                    r = math.sqrt(x*x + y*y + z*z)
-                    lat_rad = math.asin(y / r) if r > 0 else 0
-                    lon_rad = math.atan2(z, x) if r > 0 else 0
-                    
-                    deb['latitude'] = math.degrees(lat_rad)
-                    deb['longitude'] = math.degrees(lon_rad)
-                    if deb.get('altitude_km') is None:
-                        deb['altitude_km'] = r - 6371.0  # Earth radius
-                
-                # Now if we have lat/lon, ensure we also have x/y/z in the expected format
-                lat = deb.get("latitude")
-                lon = deb.get("longitude")
-                alt = deb.get("altitude_km") or deb.get("altitude")
-                if lat is not None and lon is not None and alt is not None:
-                    import math
-                    r = 6371.0 + float(alt)
-                    lat_r = math.radians(float(lat))
-                    lon_r = math.radians(float(lon))
-                    # Only set x/y/z if not already set from deb_x/y/z
-                    if deb.get("x") is None:
-                        deb["x"] = r * math.cos(lat_r) * math.cos(lon_r)
-                        deb["y"] = r * math.sin(lat_r)
-                        deb["z"] = r * math.cos(lat_r) * math.sin(lon_r)
-                    v_mag = deb.get("velocity_kmps") or deb.get("velocity") or random.uniform(7.2, 7.8)
-                    # Simple tangential velocity approximation
-                    if deb.get("vx") is None:
-                        deb["vx"] = -float(v_mag) * math.sin(lon_r)
-                        deb["vy"] = float(v_mag) * math.cos(lon_r)
-                        deb["vz"] = 0.0
-            except Exception as e:
-                import logging
-                logging.warning(f"Failed to calculate coordinates for debris {deb.get('id')}: {e}")
-                pass
-            enriched.append(deb)
-        return enriched
+        return await self._enrich_offloaded(debris_list)
+    
+    async def iter_debris(self, page_size: int = 1000, object_type: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Yield enriched debris page by page
+        
+        Keeps memory bounded for full-catalog exports: only one page of
+        page_size rows is held at a time (pages bypass the select memo).
+        An empty unfiltered catalog falls back to the local files, as in
+        get_all_debris.
+        """
+        filters = {"object_type": object_type} if object_type else None
+        offset = 0
+        while True:
+            page = await supabase_client.select(
+                self.TABLE_NAME,
+                filters=filters,
+                limit=page_size,
+                offset=offset,
+                columns=self.LIST_COLUMNS,
+                order="id.asc",
+                memoize=False
+            )
+            if not page and offset == 0 and not object_type:
+                file_debris = self._load_file_fallback()
+                for start in range(0, len(file_debris), page_size):
+                    for deb in await self._enrich_offloaded(file_debris[start:start + page_size]):
+                        yield deb
+                return
+            for deb in await self._enrich_offloaded(page):
+                yield deb
+            if len(page) < page_size:
+                break
+            offset += page_size
+    
+    def _load_file_fallback(self) -> List[Dict]:
+        """Debris from the local data files, seeded into the local cache ([] if none)"""
+        logger.warning("No debris found in Supabase – attempting local file load fallback")
+        file_debris = load_debris_from_sql()
+        if not file_debris:
+            logger.warning("Local debris loader also returned empty; returning []")
+            return []
+        logger.info(f"Loaded {len(file_debris)} debris from local files; seeding cache")
+        for d in file_debris:
+            # ensure id exists
+            if not d.get('id'):
+                d['id'] = str(uuid.uuid4())
+        local_cache.upsert_many(self.TABLE_NAME, file_debris)
+        return file_debris
+    
+    async def _enrich_offloaded(self, debris_list: List[Dict]) -> List[Dict]:
+        """_enrich_many, in a worker thread for lists of OFFLOAD_MIN_ROWS or more"""
+        if len(debris_list) >= self.OFFLOAD_MIN_ROWS:
+            return await asyncio.to_thread(self._enrich_many, debris_list)
+        return self._enrich_many(debris_list)
+    
+    def _enrich_many(self, debris_list: List[Dict]) -> List[Dict]:
+        """
+        _enrich_debris over a whole list with the trig done in NumPy
+        
+        Field mapping stays per row; the Cartesian -> lat/lon and
+        lat/lon -> Cartesian/velocity conversions each run as one vectorized
+        pass over the rows that need them. Rows with unusable values are
+        left unconverted, as _enrich_debris does.
+        """
+        try:
+            for deb in debris_list:
+                self._map_fields(deb)
+            self._fill_geodetic(debris_list)
+            self._fill_cartesian(debris_list)
+        except Exception as e:
+            # e.g. non-numeric strings: redo row by row, which isolates the bad rows
+            logger.warning(f"Vectorized debris enrichment failed ({e}); enriching row by row")
+            return [self._enrich_debris(deb) for deb in debris_list]
+        return debris_list
+    
+    @staticmethod
+    def _map_fields(deb: Dict):
+        """Map Supabase fields (deb_x, deb_y, ...) to the expected names (x, y, ...)"""
+        if 'x' not in deb and 'deb_x' in deb:
+            deb['x'] = deb['deb_x']
+        if 'y' not in deb and 'deb_y' in deb:
+            deb['y'] = deb['deb_y']
+        if 'z' not in deb and 'deb_z' in deb:
+            deb['z'] = deb['deb_z']
+        if 'vx' not in deb and 'deb_vx' in deb:
+            deb['vx'] = deb['deb_vx']
+        if 'vy' not in deb and 'deb_vy' in deb:
+            deb['vy'] = deb['deb_vy']
+        if 'vz' not in deb and 'deb_vz' in deb:
+            deb['vz'] = deb['deb_vz']
+        # Map size_estimate to size_estimate_m for compatibility
+        if 'size_estimate_m' not in deb and 'size_estimate' in deb:
+            deb['size_estimate_m'] = deb['size_estimate']
+    
+    @staticmethod
+    def _fill_geodetic(debris_list: List[Dict]):
+        """lat/lon (and altitude_km if unset) from deb_x/y/z where lat/lon are missing"""
+        rows = [
+            d for d in debris_list
+            if (d.get('latitude') is None or d.get('longitude') is None) and d.get('deb_x') is not None
+        ]
+        if not rows:
+            return
+        xyz = np.array([(d['deb_x'], d.get('deb_y'), d.get('deb_z')) for d in rows], dtype=float)
+        ok = np.isfinite(xyz).all(axis=1)
+        x, y, z = xyz.T
+        r = np.sqrt(x*x + y*y + z*z)
+        positive = r > 0
+        lat = np.degrees(np.arcsin(np.divide(y, r, out=np.zeros_like(r), where=positive)))
+        lon = np.degrees(np.where(positive, np.arctan2(z, x), 0.0))
+        for d, valid, la, lo, radius in zip(rows, ok.tolist(), lat.tolist(), lon.tolist(), r.tolist()):
+            if not valid:
+                logger.warning(f"Failed to calculate coordinates for debris {d.get('id')}: missing Cartesian component")
+                continue
+            d['latitude'] = la
+            d['longitude'] = lo
+            if d.get('altitude_km') is None:
+                d['altitude_km'] = radius - EARTH_RADIUS_KM
+    
+    @staticmethod
+    def _fill_cartesian(debris_list: List[Dict]):
+        """x/y/z and tangential velocity from lat/lon/alt where they are missing"""
+        rows, alts = [], []
+        for d in debris_list:
+            if d.get("x") is not None and d.get("vx") is not None:
+                continue
+            alt = d.get("altitude_km") or d.get("altitude")
+            if d.get("latitude") is not None and d.get("longitude") is not None and alt is not None:
+                rows.append(d)
+                alts.append(alt)
+        if not rows:
+            return
+        # Speeds only matter for rows still missing a velocity
+        v_mag = [
+            (d.get("velocity_kmps") or d.get("velocity") or random.uniform(7.2, 7.8)) if d.get("vx") is None else 0.0
+            for d in rows
+        ]
+        state = latlonalt_to_state_batch(
+            np.array([d["latitude"] for d in rows], dtype=float),
+            np.array([d["longitude"] for d in rows], dtype=float),
+            np.array(alts, dtype=float),
+            np.array(v_mag, dtype=float)
+        )
+        for d, (x, y, z, vx, vy, vz) in zip(rows, state.tolist()):
+            # Only set x/y/z if not already set from deb_x/y/z
+            if d.get("x") is None:
+                d["x"], d["y"], d["z"] = x, y, z
+            # Simple tangential velocity approximation
+            if d.get("vx") is None:
+                d["vx"], d["vy"], d["vz"] = vx, vy, vz
+    
+    def _enrich_debris(self, deb: Dict) -> Dict:
+        """Map Supabase fields and derive lat/lon/alt, x/y/z and velocity"""
+        self._map_fields(deb)
+
+        try:
+            # If we have deb_x/y/z but no lat/lon, calculate lat/lon from Cartesian
+            if (deb.get('latitude') is None or deb.get('longitude') is None) and deb.get('deb_x') is not None:
+                x = float(deb['deb_x'])
+                y = float(deb['deb_y'])
+                z = float(deb['deb_z'])
+
+                # Convert Cartesian to spherical (lat/lon/alt)
+                r = math.sqrt(x*x + y*y + z*z)
+                lat_rad = math.asin(y / r) if r > 0 else 0
+                lon_rad = math.atan2(z, x) if r > 0 else 0
+
+                deb['latitude'] = math.degrees(lat_rad)
+                deb['longitude'] = math.degrees(lon_rad)
+                if deb.get('altitude_km') is None:
+                    deb['altitude_km'] = r - EARTH_RADIUS_KM
+
+            # Now if we have lat/lon, ensure we also have x/y/z in the expected format
+            lat = deb.get("latitude")
+            lon = deb.get("longitude")
+            alt = deb.get("altitude_km") or deb.get("altitude")
+            if lat is not None and lon is not None and alt is not None:
+                v_mag = deb.get("velocity_kmps") or deb.get("velocity") or random.uniform(7.2, 7.8)
+                x, y, z, vx, vy, vz = latlonalt_to_state(float(lat), float(lon), float(alt), float(v_mag))
+                # Only set x/y/z if not already set from deb_x/y/z
+                if deb.get("x") is None:
+                    deb["x"], deb["y"], deb["z"] = x, y, z
+                # Simple tangential velocity approximation
+                if deb.get("vx") is None:
+                    deb["vx"], deb["vy"], deb["vz"] = vx, vy, vz
+        except Exception as e:
+            logger.warning(f"Failed to calculate coordinates for debris {deb.get('id')}: {e}")
+            pass
+        return deb
+    
+    async def count_by_type(self, object_type: str) -> int:
+        """Count debris of a given type from the debris_counts_by_type view (refreshed every minute)"""
+        rows = await supabase_client.select_remote(
+            self.COUNTS_VIEW,
+            filters={"object_type": object_type},
+            columns="count"
+        )
+        if rows is not None:
+            return rows[0]["count"] if rows else 0
+        return await supabase_client.count(self.TABLE_NAME, filters={"object_type": object_type})
     
     async def get_debris_by_id(self, debris_id: str) -> Optional[Dict]:
         """Get debris by ID from database"""
@@ -139,50 +373,64 @@ class DebrisService:
             lon = debris.get("longitude")
             alt = debris.get("altitude_km") or debris.get("altitude")
             if lat is not None and lon is not None and alt is not None:
-                import math
-                r = 6371.0 + float(alt)
-                lat_r = math.radians(float(lat))
-                lon_r = math.radians(float(lon))
-                debris["x"] = r * math.cos(lat_r) * math.cos(lon_r)
-                debris["y"] = r * math.sin(lat_r)
-                debris["z"] = r * math.cos(lat_r) * math.sin(lon_r)
                 v_mag = debris.get("velocity_kmps") or debris.get("velocity") or random.uniform(7.2, 7.8)
-                debris["vx"] = -float(v_mag) * math.sin(lon_r)
-                debris["vy"] = float(v_mag) * math.cos(lon_r)
-                debris["vz"] = 0.0
+                (debris["x"], debris["y"], debris["z"],
+                 debris["vx"], debris["vy"], debris["vz"]) = latlonalt_to_state(float(lat), float(lon), float(alt), float(v_mag))
         except Exception:
             pass
         return debris
     
     async def create_debris(self, data: Dict) -> Dict:
         """Create new debris entry"""
+        now = datetime.now(timezone.utc).isoformat()
         debris_data = {
             **data,
             "id": str(uuid.uuid4()),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "created_at": now,
+            "updated_at": now
         }
         
         result = await supabase_client.insert(self.TABLE_NAME, debris_data)
         local_cache.upsert_debris(debris_data)
+        await self.invalidate()
         return result or debris_data
     
+    async def bulk_create(self, debris_data: List[Dict]) -> List[Dict]:
+        """Create many debris entries with chunked bulk inserts"""
+        now = datetime.now(timezone.utc).isoformat()
+        debris = [
+            {
+                **data,
+                "id": str(uuid.uuid4()),
+                "created_at": now,
+                "updated_at": now
+            }
+            for data in debris_data
+        ]
+        inserted = await supabase_client.insert_many(self.TABLE_NAME, debris)
+        await self.invalidate()
+        return inserted
+    
     async def update_debris(self, debris_id: str, data: Dict) -> Optional[Dict]:
-        """Update debris entry"""
+        """Update debris entry; returns None if no row matched the ID"""
         update_data = {
             **data,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.now(timezone.utc).isoformat()
         }
         
+        # UPDATE ... RETURNING: an empty result means the debris does not exist
         result = await supabase_client.update(self.TABLE_NAME, debris_id, update_data)
-        local_cache.upsert_debris({"id": debris_id, **update_data})
-        return result or {"id": debris_id, **update_data}
+        if result:
+            local_cache.upsert_debris({"id": debris_id, **update_data})
+            await self.invalidate()
+        return result
     
     async def delete_debris(self, debris_id: str) -> bool:
-        """Delete debris entry"""
+        """Delete debris entry; returns False if no row matched the ID"""
         deleted = await supabase_client.delete(self.TABLE_NAME, debris_id)
         if deleted:
             local_cache.delete(self.TABLE_NAME, debris_id)
+            await self.invalidate()
         return deleted
     
     def _get_mock_debris(self) -> List[Dict]:
@@ -3,7 +3,7 @@ Maneuver Service
 Business logic for maneuver planning using RL agent
 """
 from typing import List, Dict
-from datetime import datetime
+from datetime import datetime, timezone
 from config.supabase_client import supabase_client
 from core.ai.rl_maneuver_agent import suggest_maneuver, suggest_multi_burn_maneuver, evaluate_maneuver_safety
 import uuid
@@ -47,7 +47,7 @@ class ManeuverService:
             **maneuver,
             "safety_evaluation": safety_eval,
             "status": "pending",
-            "created_at": datetime.utcnow().isoformat()
+            "created_at": datetime.now(timezone.utc).isoformat()
         }
         
         # Store in database
@@ -70,18 +70,20 @@ class ManeuverService:
         
         maneuvers = suggest_multi_burn_maneuver(satellite_state, num_burns=3)
         
-        maneuver_plans = []
-        for i, maneuver in enumerate(maneuvers):
-            plan = {
+        # One timestamp for the whole sequence, stored in a single bulk insert
+        now = datetime.now(timezone.utc).isoformat()
+        maneuver_plans = [
+            {
                 "id": str(uuid.uuid4()),
                 "satellite_id": satellite_id,
                 "sequence_number": i + 1,
                 **maneuver,
                 "status": "pending",
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": now
             }
-            await supabase_client.insert(self.TABLE_NAME, plan)
-            maneuver_plans.append(plan)
+            for i, maneuver in enumerate(maneuvers)
+        ]
+        await supabase_client.insert_many(self.TABLE_NAME, maneuver_plans)
         
         return maneuver_plans
     
@@ -97,7 +99,7 @@ class ManeuverService:
         """Update maneuver execution status"""
         update_data = {
             "status": status,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.now(timezone.utc).isoformat()
         }
         
         result = await supabase_client.update(self.TABLE_NAME, maneuver_id, update_data)
@@ -2,28 +2,128 @@
 Satellite Service
 Business logic for satellite operations
 """
-from typing import Optional, List, Dict
-from datetime import datetime
+from typing import Optional, List, Dict, AsyncIterator, Awaitable, Callable
+from datetime import datetime, timezone
 from config.supabase_client import supabase_client
 from config.local_cache import local_cache
 from config.sql_loader import load_satellites_from_sql
-from core.orbital.propagate_tle import tle_to_position
+from core.orbital.propagate_tle import position_epoch, tle_to_position_cached, tle_to_state_batch
+from core.orbital.coord_transforms import latlonalt_to_state, latlonalt_to_state_batch, state_to_latlonalt
 from core.orbital.vector_math import compute_distance
+from core.utils.cache import SingleFlight
+import numpy as np
+import asyncio
+import logging
+import math
+import time
 import uuid
 
 
+logger = logging.getLogger(__name__)
+
+# Supabase column -> name the API and the frontend expect
+_ALIASES = (
+    ("sat_name", "name"),
+    ("sat_x", "x"), ("sat_y", "y"), ("sat_z", "z"),
+    ("sat_vx", "vx"), ("sat_vy", "vy"), ("sat_vz", "vz"),
+)
+
+
+def _as_float(value) -> float:
+    """value as a float, or NaN when it is not numeric (validation before the trig, not around it)"""
+    if value.__class__ is float:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
 class SatelliteService:
     """Service for satellite CRUD and tracking operations"""
     
     TABLE_NAME = "satellites"
+    # Short: positions are TLE-propagated to "now" on every fetch
+    SNAPSHOT_TTL_SECONDS = 10.0
+    # Past the TTL a snapshot is still served this long while one background
+    # task re-propagates it
+    SNAPSHOT_STALE_SECONDS = 30.0
+    OFFLOAD_MIN_ROWS = 512  # rows above which enrichment runs in a worker thread
+    # Stored x/y/z/vx/vy/vz written this recently are used without re-propagating
+    STORED_STATE_MAX_AGE_SECONDS = 60.0
+    STATE_FIELDS = ("x", "y", "z", "vx", "vy", "vz")
+    
+    def __init__(self):
+        # limit -> (fetched_at, satellites)
+        self._snapshot_cache: Dict[Optional[int], tuple] = {}
+        # Background snapshot refreshes, keyed by limit
+        self._snapshot_refreshes = SingleFlight("Background satellite snapshot refresh")
+        # Bumped by invalidate() so refreshes started before a write are not stored
+        self._snapshot_generation = 0
+        # get_all_satellites runs, keyed by (limit, status, low precision)
+        self._fetches = SingleFlight("Satellite fetch")
+        # invalidate() of caches built from satellites (collision screening)
+        self._dependents: List[Callable[[], Awaitable[None]]] = []
+    
+    def add_dependent(self, invalidate: Callable[[], Awaitable[None]]):
+        """Register a cache to invalidate along with every satellite write"""
+        self._dependents.append(invalidate)
+    
+    async def invalidate(self):
+        """Drop cached satellite snapshots and dependent caches after a satellite write"""
+        self._snapshot_cache.clear()
+        self._snapshot_generation += 1
+        # fetches already in flight may predate the write; later callers start afresh
+        self._fetches.forget()
+        for invalidate_dependent in self._dependents:
+            await invalidate_dependent()
+    
+    async def get_all_satellites_cached(self, limit: Optional[int] = 100) -> List[Dict]:
+        """
+        get_all_satellites shared across requests (stale-while-revalidate)
+        
+        Snapshots younger than SNAPSHOT_TTL_SECONDS are served as-is; older
+        ones, up to SNAPSHOT_STALE_SECONDS, are still served immediately
+        while a background task refreshes them. Only missing or expired
+        snapshots make the caller wait, and concurrent misses share one
+        get_all_satellites call. Callers must not mutate the returned dicts.
+        """
+        cached = self._snapshot_cache.get(limit)
+        if cached is not None:
+            age = time.monotonic() - cached[0]
+            if age < self.SNAPSHOT_TTL_SECONDS:
+                return cached[1]
+            if age < self.SNAPSHOT_STALE_SECONDS:
+                self._snapshot_refreshes.start(limit, lambda: self._fetch_snapshot(limit))
+                return cached[1]
+        return await self._fetch_snapshot(limit)
+    
+    async def _fetch_snapshot(self, limit: Optional[int]) -> List[Dict]:
+        generation = self._snapshot_generation
+        satellites = await self.get_all_satellites(limit=limit)
+        if generation == self._snapshot_generation:
+            self._snapshot_cache[limit] = (time.monotonic(), satellites)
+        return satellites
+    
+    async def get_all_satellites(self, limit: Optional[int] = 100, status: Optional[str] = None, precision: str = "full") -> List[Dict]:
+        """
+        Get all satellites from Supabase, optionally filtered by status
+        
+        precision="low" derives x/y/z/velocity from whole-degree lat/lon via
+        lookup tables (within 90 km; for the globe view).
+        
+        Concurrent calls with the same arguments share one fetch and TLE
+        propagation (single-flight) and receive the same list, so callers
+        must not mutate the returned dicts.
+        """
+        key = (limit, status, precision == "low")
+        return await self._fetches.run(key, lambda: self._fetch_uncoalesced(*key))
     
-    async def get_all_satellites(self, limit: Optional[int] = 100) -> List[Dict]:
-        """Get all satellites from Supabase"""
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Fetching satellites from Supabase with limit={limit}")
+    async def _fetch_uncoalesced(self, limit: Optional[int], status: Optional[str], low_precision: bool) -> List[Dict]:
+        logger.info(f"Fetching satellites from Supabase with limit={limit} status={status}")
         
-        satellites = await supabase_client.select(self.TABLE_NAME, limit=limit)
+        filters = {"status": status} if status else None
+        satellites = await supabase_client.select(self.TABLE_NAME, filters=filters, limit=limit)
         logger.info(f"Retrieved {len(satellites)} satellites from Supabase")
         
         # If still no data, return empty list (no fallback)
@@ -32,161 +132,273 @@ class SatelliteService:
             return []
         
         # Update positions for each satellite
-        for sat in satellites:
-            # Normalize naming: map Supabase 'sat_name' to 'name' for frontend
-            if 'name' not in sat and 'sat_name' in sat:
-                sat['name'] = sat['sat_name']
-            
-            # Map Supabase coordinate fields (sat_x, sat_y, etc.) to expected fields (x, y, etc.)
-            if 'x' not in sat and 'sat_x' in sat:
-                sat['x'] = sat['sat_x']
-            if 'y' not in sat and 'sat_y' in sat:
-                sat['y'] = sat['sat_y']
-            if 'z' not in sat and 'sat_z' in sat:
-                sat['z'] = sat['sat_z']
-            if 'vx' not in sat and 'sat_vx' in sat:
-                sat['vx'] = sat['sat_vx']
-            if 'vy' not in sat and 'sat_vy' in sat:
-                sat['vy'] = sat['sat_vy']
-            if 'vz' not in sat and 'sat_vz' in sat:
-                sat['vz'] = sat['sat_vz']
-            
-            # In Supabase, sat_name IS the NORAD ID, not a separate field
-            # Use sat_name or name as the NORAD ID for TLE propagation
-            norad_id = sat.get("norad_id") or sat.get("sat_name") or sat.get("name")
-            
-            # Update position from TLE if we have a satellite identifier
-            if norad_id:
-                lat, lon, alt = tle_to_position(str(norad_id))
-                sat["latitude"] = lat
-                sat["longitude"] = lon
-                sat["altitude_km"] = alt
-                # Store the norad_id for reference
-                if "norad_id" not in sat:
-                    sat["norad_id"] = norad_id
-            
-            # Always calculate x,y,z,vx,vy,vz if we have lat/lon/alt
-            lat = sat.get("latitude")
-            lon = sat.get("longitude")
-            alt = sat.get("altitude_km") or sat.get("altitude")
-            
-            if lat is not None and lon is not None and alt is not None:
-                try:
-                    import math
-                    r = 6371.0 + float(alt)
-                    lat_r = math.radians(float(lat))
-                    lon_r = math.radians(float(lon))
-                    sat["x"] = r * math.cos(lat_r) * math.cos(lon_r)
-                    sat["y"] = r * math.sin(lat_r)
-                    sat["z"] = r * math.cos(lat_r) * math.sin(lon_r)
-                    v_mag = sat.get("velocity_kmps") or sat.get("velocity") or 7.5
-                    # Simple tangential velocity approximation in local horizontal plane
-                    sat["vx"] = -float(v_mag) * math.sin(lon_r)
-                    sat["vy"] = float(v_mag) * math.cos(lon_r)
-                    sat["vz"] = 0.0
-                except Exception as e:
-                    # If coordinate calculation fails, set defaults to avoid crashes
-                    import logging
-                    logging.warning(f"Failed to calculate coordinates for satellite {sat.get('id')}: {e}")
-                    sat.setdefault("x", 0.0)
-                    sat.setdefault("y", 0.0)
-                    sat.setdefault("z", 0.0)
-                    sat.setdefault("vx", 0.0)
-                    sat.setdefault("vy", 0.0)
-                    sat.setdefault("vz", 0.0)
+        return await self._enrich_offloaded(satellites, low_precision)
+    
+    async def iter_satellites(self, page_size: int = 1000, status: Optional[str] = None) -> AsyncIterator[Dict]:
+        """
+        Yield enriched satellites page by page
         
-        return satellites
+        Keeps memory bounded for full-catalog exports: only one page of
+        page_size rows is held at a time (pages bypass the select memo).
+        """
+        filters = {"status": status} if status else None
+        offset = 0
+        while True:
+            page = await supabase_client.select(
+                self.TABLE_NAME,
+                filters=filters,
+                limit=page_size,
+                offset=offset,
+                order="id.asc",
+                memoize=False
+            )
+            for sat in await self._enrich_offloaded(page):
+                yield sat
+            if len(page) < page_size:
+                break
+            offset += page_size
     
-    async def get_satellite_by_id(self, satellite_id: str) -> Optional[Dict]:
-        """Get satellite by ID from database"""
-        satellite = await supabase_client.select_by_id(self.TABLE_NAME, satellite_id)
-        if not satellite:
-            satellite = local_cache.get_by_id(self.TABLE_NAME, satellite_id)
-            if not satellite:
-                return None
+    async def _enrich_offloaded(self, satellites: List[Dict], low_precision: bool = False) -> List[Dict]:
+        """
+        _enrich_many, in a worker thread for large lists
         
-        # Map Supabase coordinate fields (sat_x, sat_y, etc.) to expected fields (x, y, etc.)
-        if 'x' not in satellite and 'sat_x' in satellite:
-            satellite['x'] = satellite['sat_x']
-        if 'y' not in satellite and 'sat_y' in satellite:
-            satellite['y'] = satellite['sat_y']
-        if 'z' not in satellite and 'sat_z' in satellite:
-            satellite['z'] = satellite['sat_z']
-        if 'vx' not in satellite and 'sat_vx' in satellite:
-            satellite['vx'] = satellite['sat_vx']
-        if 'vy' not in satellite and 'sat_vy' in satellite:
-            satellite['vy'] = satellite['sat_vy']
-        if 'vz' not in satellite and 'sat_vz' in satellite:
-            satellite['vz'] = satellite['sat_vz']
+        Keeps the event loop serving other requests while a full catalog is
+        propagated; small lists stay inline where a thread hop costs more
+        than the work.
+        """
+        if len(satellites) >= self.OFFLOAD_MIN_ROWS:
+            return await asyncio.to_thread(self._enrich_many, satellites, low_precision)
+        return self._enrich_many(satellites, low_precision)
+    
+    def _enrich_many(self, satellites: List[Dict], low_precision: bool = False) -> List[Dict]:
+        """
+        _enrich_satellite over a whole list with the trig done in NumPy
         
-        # Update current position
+        Field mapping stays per row; rows with a fresh stored state keep it.
+        For the rest, one batch call propagates every satellite with an
+        identifier straight to lat/lon/alt and its Cartesian state; only
+        rows without one convert their stored lat/lon/alt, in one
+        vectorized pass.
+        """
+        try:
+            # Bound once: these run per row on lists of thousands
+            map_fields, has_fresh_state, use_stored_state = self._map_fields, self._has_fresh_state, self._use_stored_state
+            stale = []
+            add_stale = stale.append
+            now = time.time()
+            for sat in satellites:
+                map_fields(sat)
+                if has_fresh_state(sat, now):
+                    use_stored_state(sat)
+                else:
+                    add_stale(sat)
+            self._fill_cartesian(self._propagate_many(stale, low_precision), low_precision)
+        except Exception as e:
+            # e.g. non-numeric strings: redo row by row, which isolates the bad rows
+            logger.warning(f"Vectorized satellite enrichment failed ({e}); enriching row by row")
+            return [self._enrich_satellite(sat) for sat in satellites]
+        return satellites
+    
+    @staticmethod
+    def _map_fields(sat: Dict):
+        """Map Supabase fields (sat_name, sat_x, ...) to the expected names (name, x, ...)"""
+        for src, dst in _ALIASES:
+            if dst not in sat and src in sat:
+                sat[dst] = sat[src]
+    
+    @classmethod
+    def _has_fresh_state(cls, sat: Dict, now: Optional[float] = None) -> bool:
+        """True when the row carries a numeric state vector updated within STORED_STATE_MAX_AGE_SECONDS of now"""
+        get = sat.get
+        if not all(isinstance(get(k), (int, float)) for k in cls.STATE_FIELDS):
+            return False
+        updated_at = get("updated_at")
+        if isinstance(updated_at, (int, float)):
+            # local cache rows store epoch seconds
+            updated_ts = float(updated_at)
+        elif isinstance(updated_at, str):
+            try:
+                updated = datetime.fromisoformat(updated_at)
+            except ValueError:
+                return False
+            if updated.tzinfo is None:
+                updated = updated.replace(tzinfo=timezone.utc)
+            updated_ts = updated.timestamp()
+        else:
+            return False
+        return (now if now is not None else time.time()) - updated_ts < cls.STORED_STATE_MAX_AGE_SECONDS
+    
+    @staticmethod
+    def _use_stored_state(sat: Dict):
+        """Keep the stored state vector; derive lat/lon/alt from it where missing"""
+        if sat.get("latitude") is None or sat.get("longitude") is None:
+            lat, lon, alt = state_to_latlonalt(sat["x"], sat["y"], sat["z"])
+            sat["latitude"] = lat
+            sat["longitude"] = lon
+            if sat.get("altitude_km") is None:
+                sat["altitude_km"] = alt
+        norad_id = sat.get("norad_id") or sat.get("sat_name") or sat.get("name")
+        if norad_id and "norad_id" not in sat:
+            sat["norad_id"] = norad_id
+    
+    @staticmethod
+    def _propagate(sat: Dict):
+        """Current latitude/longitude/altitude from TLE when the satellite has an identifier"""
         # In Supabase, sat_name IS the NORAD ID, not a separate field
         # Use sat_name or name as the NORAD ID for TLE propagation
-        norad_id = satellite.get("norad_id") or satellite.get("sat_name") or satellite.get("name")
+        norad_id = sat.get("norad_id") or sat.get("sat_name") or sat.get("name")
         
+        # Update position from TLE if we have a satellite identifier
         if norad_id:
-            lat, lon, alt = tle_to_position(str(norad_id))
-            satellite["latitude"] = lat
-            satellite["longitude"] = lon
-            satellite["altitude_km"] = alt
+            lat, lon, alt = tle_to_position_cached(str(norad_id))
+            sat["latitude"] = lat
+            sat["longitude"] = lon
+            sat["altitude_km"] = alt
             # Store the norad_id for reference
-            if "norad_id" not in satellite:
-                satellite["norad_id"] = norad_id
+            if "norad_id" not in sat:
+                sat["norad_id"] = norad_id
+    
+    @staticmethod
+    def _propagate_many(satellites: List[Dict], low_precision: bool = False) -> List[Dict]:
+        """
+        _propagate plus the Cartesian state for a whole list, in one tle_to_state_batch call
+        
+        Returns the rows without an identifier, which still need _fill_cartesian.
+        """
+        rows, norad_ids, speeds, unpropagated = [], [], [], []
+        add_row, add_id, add_speed, add_unpropagated = rows.append, norad_ids.append, speeds.append, unpropagated.append
+        for sat in satellites:
+            get = sat.get
+            norad_id = get("norad_id") or get("sat_name") or get("name")
+            if norad_id:
+                add_row((sat, norad_id))
+                add_id(str(norad_id))
+                add_speed(get("velocity_kmps") or get("velocity") or 7.5)
+            else:
+                add_unpropagated(sat)
+        if not rows:
+            return unpropagated
+        v_mag = np.array([_as_float(v) for v in speeds])
+        speed_ok = np.isfinite(v_mag)
+        v_mag[~speed_ok] = 0.0
+        # Same epoch as _propagate, so list and detail views agree
+        lat, lon, alt, state = tle_to_state_batch(norad_ids, v_mag, current_time=position_epoch(), low_precision=low_precision)
+        for (sat, norad_id), v_ok, la, lo, al, row_state in zip(
+            rows, speed_ok.tolist(), lat.tolist(), lon.tolist(), alt.tolist(), state.tolist()
+        ):
+            sat["latitude"] = la
+            sat["longitude"] = lo
+            sat["altitude_km"] = al
+            SatelliteService._set_state(sat, row_state, speed_ok=v_ok)
+            # Store the norad_id for reference
+            if "norad_id" not in sat:
+                sat["norad_id"] = norad_id
+        return unpropagated
+    
+    @staticmethod
+    def _fill_cartesian(satellites: List[Dict], low_precision: bool = False):
+        """x/y/z and tangential velocity from lat/lon/alt for every row that has them"""
+        rows, geodetic = [], []
+        add_row, add_geodetic = rows.append, geodetic.append
+        for sat in satellites:
+            get = sat.get
+            lat, lon = get("latitude"), get("longitude")
+            alt = get("altitude_km") or get("altitude")
+            if lat is not None and lon is not None and alt is not None:
+                add_row(sat)
+                add_geodetic((
+                    _as_float(lat), _as_float(lon), _as_float(alt),
+                    _as_float(get("velocity_kmps") or get("velocity") or 7.5)
+                ))
+        if not rows:
+            return
+        geodetic = np.array(geodetic)
+        position_ok = np.isfinite(geodetic[:, :3]).all(axis=1)
+        speed_ok = np.isfinite(geodetic[:, 3])
+        geodetic[~speed_ok, 3] = 0.0
+        # The conversion runs unguarded, on rows with a valid position only
+        states = iter(latlonalt_to_state_batch(*geodetic[position_ok].T, low_precision=low_precision).tolist())
+        for sat, p_ok, v_ok in zip(rows, position_ok.tolist(), speed_ok.tolist()):
+            SatelliteService._set_state(sat, next(states) if p_ok else None, p_ok, v_ok)
+    
+    @classmethod
+    def _set_state(cls, sat: Dict, state: Optional[List[float]], position_ok: bool = True, speed_ok: bool = True):
+        """
+        Write a computed x, y, z, vx, vy, vz into the row
+        
+        Parts derived from non-numeric fields are skipped and default to 0.0
+        instead, so consumers do not crash.
+        """
+        if position_ok:
+            sat["x"], sat["y"], sat["z"] = state[0], state[1], state[2]
+            if speed_ok:
+                sat["vx"], sat["vy"], sat["vz"] = state[3], state[4], state[5]
+                return
+        logger.warning(f"Failed to calculate coordinates for satellite {sat.get('id')}: non-numeric position or speed")
+        for field in cls.STATE_FIELDS[(3 if position_ok else 0):]:
+            sat.setdefault(field, 0.0)
+    
+    def _enrich_satellite(self, sat: Dict) -> Dict:
+        """Map Supabase fields and propagate the current position from TLE"""
+        self._map_fields(sat)
+        if self._has_fresh_state(sat):
+            self._use_stored_state(sat)
+            return sat
+        self._propagate(sat)
         
         # Always calculate x,y,z,vx,vy,vz if we have lat/lon/alt
-        lat = satellite.get("latitude")
-        lon = satellite.get("longitude")
-        alt = satellite.get("altitude_km") or satellite.get("altitude")
+        lat = sat.get("latitude")
+        lon = sat.get("longitude")
+        alt = sat.get("altitude_km") or sat.get("altitude")
         
         if lat is not None and lon is not None and alt is not None:
-            try:
-                import math
-                r = 6371.0 + float(alt)
-                lat_r = math.radians(float(lat))
-                lon_r = math.radians(float(lon))
-                satellite["x"] = r * math.cos(lat_r) * math.cos(lon_r)
-                satellite["y"] = r * math.sin(lat_r)
-                satellite["z"] = r * math.cos(lat_r) * math.sin(lon_r)
-                v_mag = satellite.get("velocity_kmps") or satellite.get("velocity") or 7.5
-                satellite["vx"] = -float(v_mag) * math.sin(lon_r)
-                satellite["vy"] = float(v_mag) * math.cos(lon_r)
-                satellite["vz"] = 0.0
-            except Exception as e:
-                # If coordinate calculation fails, set defaults to avoid crashes
-                import logging
-                logging.warning(f"Failed to calculate coordinates for satellite {satellite.get('id')}: {e}")
-                satellite.setdefault("x", 0.0)
-                satellite.setdefault("y", 0.0)
-                satellite.setdefault("z", 0.0)
-                satellite.setdefault("vx", 0.0)
-                satellite.setdefault("vy", 0.0)
-                satellite.setdefault("vz", 0.0)
+            position = (_as_float(lat), _as_float(lon), _as_float(alt))
+            if not all(map(math.isfinite, position)):
+                self._set_state(sat, None, position_ok=False)
+                return sat
+            v_mag = _as_float(sat.get("velocity_kmps") or sat.get("velocity") or 7.5)
+            speed_ok = math.isfinite(v_mag)
+            # Simple tangential velocity approximation in local horizontal plane
+            state = latlonalt_to_state(*position, v_mag if speed_ok else 0.0)
+            self._set_state(sat, state, speed_ok=speed_ok)
+        return sat
+    
+    async def get_satellite_by_id(self, satellite_id: str) -> Optional[Dict]:
+        """Get satellite by ID from database"""
+        satellite = await supabase_client.select_by_id(self.TABLE_NAME, satellite_id)
+        if not satellite:
+            satellite = local_cache.get_by_id(self.TABLE_NAME, satellite_id)
+            if not satellite:
+                return None
         
-        return satellite
+        return self._enrich_satellite(satellite)
     
     async def create_satellite(self, data: Dict) -> Dict:
         """Create new satellite"""
+        now = datetime.now(timezone.utc).isoformat()
         satellite_data = {
             **data,
             "id": str(uuid.uuid4()),
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat()
+            "created_at": now,
+            "updated_at": now
         }
         
         result = await supabase_client.insert(self.TABLE_NAME, satellite_data)
         # Local cache write-through already handled in client; ensure present
         local_cache.upsert_satellite(satellite_data)
+        await self.invalidate()
         return result or satellite_data
     
     async def update_satellite(self, satellite_id: str, data: Dict) -> Optional[Dict]:
         """Update satellite"""
         update_data = {
             **data,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": datetime.now(timezone.utc).isoformat()
         }
         
         result = await supabase_client.update(self.TABLE_NAME, satellite_id, update_data)
         local_cache.upsert_satellite({"id": satellite_id, **update_data})
+        await self.invalidate()
         return result or {"id": satellite_id, **update_data}
     
     async def delete_satellite(self, satellite_id: str) -> bool:
@@ -194,6 +406,7 @@ class SatelliteService:
         deleted = await supabase_client.delete(self.TABLE_NAME, satellite_id)
         if deleted:
             local_cache.delete(self.TABLE_NAME, satellite_id)
+            await self.invalidate()
         return deleted
     
     def _get_mock_satellites(self) -> List[Dict]: